@@ -4,11 +4,16 @@
 负责协调多个能力模板，生成完整的时间序列数据集。
 """
 
+import os
+import copy
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
 from datetime import datetime, timedelta
-from core.relationships import get_template_class, CapabilityTemplate
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from core.relationships import get_template_class, CapabilityTemplate, RandomStreams
 
 
 class DataGenerator:
@@ -22,6 +27,8 @@ class DataGenerator:
     DEFAULT_TIME_INTERVAL = 5.0  # 默认时间间隔（秒）
     DEFAULT_HISTORY_POINTS = 10000  # 默认历史数据点数
     DEFAULT_FUTURE_POINTS = 120  # 默认未来数据点数（10分钟）
+    DEFAULT_MAX_WORKERS = 1  # 默认并行线程数（1表示串行生成）
+    DEFAULT_CHUNK_SIZE = 100000  # 流式生成默认每块点数
     
     def __init__(self, config: Dict[str, Any]):
         """
@@ -33,6 +40,8 @@ class DataGenerator:
                 - history_points: 历史数据点数，默认10000
                 - future_points: 未来数据点数，默认120
                 - start_time: 起始时间（可选）
+                - seed: 随机种子（可选），指定后生成结果可重复
+                - max_workers: 并行生成的线程数，默认1（串行），小于等于0表示使用全部CPU核数
                 - templates: 能力模板配置列表
         """
         self.config = config
@@ -40,13 +49,18 @@ class DataGenerator:
         self.history_points = config.get('history_points', self.DEFAULT_HISTORY_POINTS)
         self.future_points = config.get('future_points', self.DEFAULT_FUTURE_POINTS)
         self.start_time = config.get('start_time', datetime(2024, 1, 1, 0, 0, 0))
+        self.seed = config.get('seed')
+        self.max_workers = config.get('max_workers', self.DEFAULT_MAX_WORKERS)
         
         # 加载能力模板
         self.templates: Dict[str, CapabilityTemplate] = {}
         self._load_templates()
         
-        # 生成时间点
-        self.time_points = self._generate_time_points()
+        # 时间点（首次访问time_points时生成，流式生成时按块计算，不需要完整时间轴）
+        self._time_points: Optional[np.ndarray] = None
+        
+        # 已生成的数据（generate只执行一次，历史/未来数据都是它的视图）
+        self._data: Optional[pd.DataFrame] = None
     
     def _load_templates(self):
         """加载能力模板"""
@@ -59,9 +73,34 @@ class DataGenerator:
             template = template_class(template_config.get('config', {}))
             self.templates[template_name] = template
     
-    def _generate_time_points(self) -> np.ndarray:
-        """生成时间点数组"""
-        total_points = self.history_points + self.future_points
+    @property
+    def time_points(self) -> np.ndarray:
+        """完整的时间点数组（秒为单位的时间戳）"""
+        if self._time_points is None:
+            self._time_points = self._generate_time_points()
+        return self._time_points
+    
+    @property
+    def total_points(self) -> int:
+        """总数据点数（历史 + 未来）"""
+        return self.history_points + self.future_points
+    
+    def _generate_time_points(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        生成时间点数组
+        
+        第i个时间点为 start_timestamp + i * time_interval，
+        按块生成时每个点的值与完整生成时相同。
+        
+        Args:
+            start: 起始索引（包含）
+            stop: 结束索引（不包含），默认为总点数
+        
+        Returns:
+            时间点数组（秒为单位的时间戳）
+        """
+        if stop is None:
+            stop = self.total_points
         
         # 生成时间戳（秒为单位）
         if isinstance(self.start_time, str):
@@ -70,11 +109,7 @@ class DataGenerator:
             start_dt = self.start_time
         
         start_timestamp = start_dt.timestamp()
-        time_points = np.arange(
-            start_timestamp,
-            start_timestamp + total_points * self.time_interval,
-            self.time_interval
-        )[:total_points]
+        time_points = start_timestamp + np.arange(start, stop) * float(self.time_interval)
         
         return time_points
     
@@ -82,97 +117,369 @@ class DataGenerator:
         """
         解析模板依赖关系，返回生成顺序
         
+        使用Kahn算法（反向邻接表 + 双端队列），复杂度O(V+E)。
+        依赖既可以引用模板的输出名称，也可以引用模板名称；
+        不由任何模板产生的依赖视为外部依赖，不参与排序。
+        
         Returns:
             模板名称的生成顺序列表
+        
+        Raises:
+            ValueError: 存在循环依赖时抛出异常，消息中包含循环路径
         """
-        # 构建依赖图
-        dependencies = {}
-        for name, template in self.templates.items():
-            dependencies[name] = template.get_dependencies()
+        upstream, dependents = self._build_dependency_graph()
         
         # 拓扑排序
-        in_degree = {name: 0 for name in self.templates.keys()}
-        for name, deps in dependencies.items():
-            for dep in deps:
-                # 检查依赖是否在模板中
-                if dep in self.templates:
-                    in_degree[name] += 1
-        
-        # 找到所有依赖的源数据（不在模板中的）
-        external_deps = set()
-        for deps in dependencies.values():
-            for dep in deps:
-                if dep not in self.templates:
-                    external_deps.add(dep)
-        
-        # 生成顺序
+        in_degree = {name: len(deps) for name, deps in upstream.items()}
+        queue = deque(name for name, degree in in_degree.items() if degree == 0)
         order = []
-        queue = [name for name, degree in in_degree.items() if degree == 0]
         
         while queue:
-            name = queue.pop(0)
+            name = queue.popleft()
             order.append(name)
             
             # 更新依赖该模板的其他模板的入度
-            for other_name, deps in dependencies.items():
-                if name in deps and other_name not in order:
-                    in_degree[other_name] -= 1
-                    if in_degree[other_name] == 0:
-                        queue.append(other_name)
+            for other_name in dependents[name]:
+                in_degree[other_name] -= 1
+                if in_degree[other_name] == 0:
+                    queue.append(other_name)
         
         # 检查是否有循环依赖
         if len(order) < len(self.templates):
-            remaining = set(self.templates.keys()) - set(order)
-            raise ValueError(f"检测到循环依赖或缺失依赖: {remaining}")
+            cycle = self._find_cycle(upstream, set(self.templates) - set(order))
+            raise ValueError(f"检测到循环依赖: {' -> '.join(cycle)}")
         
         return order
     
-    def generate(self) -> pd.DataFrame:
+    def _build_dependency_graph(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """
+        构建模板依赖图
+        
+        Returns:
+            (upstream, dependents)：upstream[name]为name依赖的模板，
+            dependents[name]为依赖name的模板
+        """
+        producers = self._get_producers()
+        
+        upstream: Dict[str, List[str]] = {name: [] for name in self.templates}
+        dependents: Dict[str, List[str]] = {name: [] for name in self.templates}
+        for name, template in self.templates.items():
+            seen = set()
+            for dep in template.get_dependencies():
+                producer = producers.get(dep)
+                if producer is None or producer in seen:
+                    # 外部依赖或重复依赖
+                    continue
+                seen.add(producer)
+                upstream[name].append(producer)
+                dependents[producer].append(name)
+        
+        return upstream, dependents
+    
+    def _resolve_levels(self, order: List[str]) -> List[List[str]]:
+        """
+        按依赖层级对生成顺序分组
+        
+        第0层是没有依赖的模板，第k层模板只依赖前k层的模板，
+        同一层内的模板互不依赖，可以并行生成。
+        
+        Args:
+            order: _resolve_dependencies返回的生成顺序
+        
+        Returns:
+            各层的模板名称列表（层内保持order中的顺序）
+        """
+        upstream, _ = self._build_dependency_graph()
+        
+        depth: Dict[str, int] = {}
+        levels: List[List[str]] = []
+        for name in order:
+            level = max((depth[dep] + 1 for dep in upstream[name]), default=0)
+            depth[name] = level
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(name)
+        
+        return levels
+    
+    def _create_rngs(self) -> Dict[str, RandomStreams]:
+        """
+        为每个模板创建独立的随机数流
+        
+        随机数流按模板名称从同一个SeedSequence派生，
+        与模板在配置中的顺序、生成顺序、线程调度和分块方式无关。
+        
+        Returns:
+            模板名称到随机数流的映射
+        """
+        root = RandomStreams(self.seed)
+        return {name: root.spawn(name) for name in self.templates}
+    
+    def _get_producers(self) -> Dict[str, str]:
+        """
+        获取数据名称到模板名称的映射
+        
+        Returns:
+            字典，键为输出名称或模板名称，值为产生该数据的模板名称
+        """
+        producers = {name: name for name in self.templates}
+        for name, template in self.templates.items():
+            producers[template.get_output_name()] = name
+        return producers
+    
+    @staticmethod
+    def _find_cycle(upstream: Dict[str, List[str]], remaining: set) -> List[str]:
+        """
+        在拓扑排序后剩余的模板中找出一条循环路径
+        
+        剩余模板的入度都不为0，因此每个剩余模板至少有一个剩余的上游模板，
+        沿上游方向走下去必然回到已访问的模板。
+        
+        Args:
+            upstream: 每个模板依赖的模板列表
+            remaining: 拓扑排序后剩余的模板名称集合
+        
+        Returns:
+            按数据流方向排列的循环路径，首尾是同一个模板
+        """
+        name = next(name for name in upstream if name in remaining)
+        path = []
+        visited = {}
+        while name not in visited:
+            visited[name] = len(path)
+            path.append(name)
+            name = next(dep for dep in upstream[name] if dep in remaining)
+        cycle = path[visited[name]:] + [name]
+        cycle.reverse()
+        return cycle
+    
+    def generate(self, max_workers: Optional[int] = None) -> pd.DataFrame:
         """
         生成完整的数据集
         
+        结果会被缓存：重复调用generate、get_history_data、get_future_data
+        都返回同一份数据，不会重新生成。需要重新生成时先调用clear_cache。
+        返回的DataFrame是共享的，修改前请先copy。
+        
+        max_workers大于1时按依赖层级并行生成：同一层的模板在线程池中执行
+        （NumPy运算会释放GIL）。每个模板使用独立的随机数流，
+        串行和并行的结果相同。
+        
+        Args:
+            max_workers: 并行线程数（可选，默认使用配置中的max_workers）
+        
+        Returns:
+            DataFrame，包含timeStamp列和所有生成的数据列
+        """
+        if self._data is None:
+            self._data = self._generate(max_workers)
+        return self._data
+    
+    def clear_cache(self):
+        """清除已生成的数据，下次调用generate时重新生成"""
+        self._data = None
+    
+    def copy(self) -> 'DataGenerator':
+        """
+        创建共享已加载模板的新生成器（不包含已生成的数据）
+        
+        模板在加载时完成配置验证和表达式编译，生成时只读，可以在多个生成器之间共享，
+        复制生成器不需要重新加载模板。
+        
+        Returns:
+            新的数据生成器
+        """
+        generator = copy.copy(self)
+        generator._time_points = None
+        generator._data = None
+        return generator
+    
+    def _generate(self, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """
+        执行数据生成（不使用缓存）
+        
+        Args:
+            max_workers: 并行线程数（可选，默认使用配置中的max_workers）
+        
         Returns:
             DataFrame，包含timeStamp列和所有生成的数据列
         """
         # 解析依赖关系，确定生成顺序
         generation_order = self._resolve_dependencies()
+        rngs = self._create_rngs()
+        time_points = self.time_points
+        
+        with self._create_executor(max_workers) as executor:
+            generated_data = self._run_templates(
+                generation_order,
+                lambda name, template, other_data: template.generate(time_points, other_data, rng=rngs[name]),
+                executor
+            )
+        
+        return self._build_dataframe(time_points, generated_data)
+    
+    def generate_chunks(self, chunk_size: Optional[int] = None,
+                        max_workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[str, int, int], None]] = None) -> Iterator[pd.DataFrame]:
+        """
+        流式生成数据，按时间顺序逐块返回
+        
+        每块最多chunk_size行，块之间传递滞后缓冲区和随机数状态，
+        所有块拼接后与相同种子下generate的结果完全相同。
+        内存占用只与块大小和最大滞后有关，与总点数无关。
+        流式生成的结果不会被缓存。
+        
+        Args:
+            chunk_size: 每块点数，默认DEFAULT_CHUNK_SIZE（至少为2）
+            max_workers: 并行线程数（可选，默认使用配置中的max_workers）
+            progress_callback: 进度回调（可选），每个模板完成一块后在调用线程中调用，
+                参数为(模板名称, 该模板已生成点数, 总点数)
+        
+        Yields:
+            DataFrame，包含timeStamp列和所有生成的数据列
+        """
+        if chunk_size is None:
+            chunk_size = self.DEFAULT_CHUNK_SIZE
+        if chunk_size < 2:
+            raise ValueError("chunk_size必须大于等于2")
+        
+        generation_order = self._resolve_dependencies()
+        rngs = self._create_rngs()
+        states = {name: self.templates[name].create_stream_state(rngs[name]) for name in generation_order}
+        
+        with self._create_executor(max_workers) as executor:
+            for start in range(0, self.total_points, chunk_size):
+                stop = min(start + chunk_size, self.total_points)
+                time_points = self._generate_time_points(start, stop)
+                on_template_done = None
+                if progress_callback is not None:
+                    on_template_done = lambda name: progress_callback(name, stop, self.total_points)
+                generated_data = self._run_templates(
+                    generation_order,
+                    lambda name, template, other_data: template.generate_chunk(time_points, other_data, states[name]),
+                    executor,
+                    on_template_done
+                )
+                yield self._build_dataframe(time_points, generated_data)
+    
+    def _create_executor(self, max_workers: Optional[int] = None):
+        """
+        创建并行生成使用的线程池
+        
+        Args:
+            max_workers: 并行线程数（可选，默认使用配置中的max_workers）
         
+        Returns:
+            线程池上下文；串行生成时返回值为None的上下文
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        if max_workers <= 0:
+            max_workers = os.cpu_count() or 1
+        if max_workers > 1 and len(self.templates) > 1:
+            return ThreadPoolExecutor(max_workers=max_workers)
+        return nullcontext()
+    
+    def _run_templates(self, generation_order: List[str],
+                       run: Callable[[str, CapabilityTemplate, Optional[Dict[str, np.ndarray]]], np.ndarray],
+                       executor: Optional[ThreadPoolExecutor],
+                       on_template_done: Optional[Callable[[str], None]] = None) -> Dict[str, np.ndarray]:
+        """
+        按生成顺序执行所有模板
+        
+        提供线程池时按层并行生成：在主线程中准备依赖数据，
+        层内生成完成后再统一写入。
+        
+        Args:
+            generation_order: 生成顺序
+            run: 执行单个模板的函数，参数为(模板名称, 模板, 依赖数据)
+            executor: 线程池（None表示串行生成）
+            on_template_done: 单个模板完成后的回调（可选），参数为模板名称
+        
+        Returns:
+            输出名称到数据数组的映射
+        """
         # 存储生成的数据
         generated_data: Dict[str, np.ndarray] = {}
         
-        # 按顺序生成数据
-        for template_name in generation_order:
-            template = self.templates[template_name]
-            
-            # 准备依赖数据
-            other_data = {}
-            for dep_name in template.get_dependencies():
-                if dep_name in generated_data:
-                    other_data[dep_name] = generated_data[dep_name]
-                else:
-                    # 外部依赖，需要从配置中获取或使用默认值
-                    raise ValueError(f"缺少外部依赖数据: {dep_name}")
-            
-            # 生成数据
-            data = template.generate(self.time_points, other_data if other_data else None)
+        if executor is not None:
+            # 按层并行生成
+            for level in self._resolve_levels(generation_order):
+                futures = []
+                for template_name in level:
+                    template = self.templates[template_name]
+                    other_data = self._collect_dependencies(template, generated_data)
+                    futures.append((template_name, template, executor.submit(run, template_name, template, other_data)))
+                for template_name, template, future in futures:
+                    generated_data[template.get_output_name()] = future.result()
+                    if on_template_done is not None:
+                        on_template_done(template_name)
+        else:
+            # 按顺序生成数据
+            for template_name in generation_order:
+                template = self.templates[template_name]
+                other_data = self._collect_dependencies(template, generated_data)
+                generated_data[template.get_output_name()] = run(template_name, template, other_data)
+                if on_template_done is not None:
+                    on_template_done(template_name)
+        
+        return generated_data
+    
+    def _build_dataframe(self, time_points: np.ndarray,
+                         generated_data: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """
+        构建DataFrame（列顺序与模板在配置中的顺序一致，与生成顺序无关）
+        """
+        df_data = {'timeStamp': time_points}
+        for template in self.templates.values():
             output_name = template.get_output_name()
-            generated_data[output_name] = data
+            df_data[output_name] = generated_data[output_name]
         
-        # 构建DataFrame
-        df_data = {'timeStamp': self.time_points}
-        df_data.update(generated_data)
+        return pd.DataFrame(df_data)
+    
+    def _collect_dependencies(self, template: CapabilityTemplate,
+                              generated_data: Dict[str, np.ndarray]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        准备模板的依赖数据
         
-        df = pd.DataFrame(df_data)
+        Args:
+            template: 能力模板
+            generated_data: 已生成的数据
         
-        return df
+        Returns:
+            依赖数据字典，无依赖时返回None
+        """
+        other_data = {}
+        for dep_name in template.get_dependencies():
+            if dep_name in generated_data:
+                other_data[dep_name] = generated_data[dep_name]
+            else:
+                # 外部依赖，需要从配置中获取或使用默认值
+                raise ValueError(f"缺少外部依赖数据: {dep_name}")
+        return other_data if other_data else None
     
     def get_history_data(self) -> pd.DataFrame:
-        """获取历史数据部分（前10000点）"""
-        df = self.generate()
-        return df.iloc[:self.history_points].copy()
+        """获取历史数据部分（前10000点，generate结果的行切片）"""
+        return self._slice_rows(0, self.history_points)
     
     def get_future_data(self) -> pd.DataFrame:
-        """获取未来数据部分（后120点）"""
-        df = self.generate()
-        return df.iloc[self.history_points:].copy()
+        """获取未来数据部分（后120点，generate结果的行切片）"""
+        return self._slice_rows(self.history_points, None)
+    
+    def _slice_rows(self, start: int, stop: Optional[int]) -> pd.DataFrame:
+        """
+        取generate结果的行切片
+        
+        pandas启用写时复制（pandas 3.x始终启用）时返回视图，修改切片不会改动缓存的结果；
+        未启用时（pandas 2.x默认）返回副本。
+        """
+        rows = self.generate().iloc[start:stop]
+        return rows if _copy_on_write_enabled() else rows.copy()
+
+
+def _copy_on_write_enabled() -> bool:
+    """pandas是否启用了写时复制"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
 
@@ -6,7 +6,7 @@
 注意：当前版本只支持ExpressionTemplate，旧的模板类型（TimePatternTemplate、LagFollowTemplate等）已被移除。
 """
 
-from core.relationships.base import CapabilityTemplate
+from core.relationships.base import CapabilityTemplate, RandomStreams
 from core.relationships.expression import ExpressionTemplate
 
 # 模板类型注册表（只支持ExpressionTemplate）
@@ -48,6 +48,7 @@ def register_template(template_type: str, template_class):
 
 __all__ = [
     'CapabilityTemplate',
+    'RandomStreams',
     'ExpressionTemplate',
     'get_template_class',
     'register_template',
@@ -5,12 +5,140 @@
 通过组合不同的能力模板，可以生成复杂的数据关系。
 """
 
+import copy
+import zlib
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import numpy as np
 import pandas as pd
 
 
+class RandomStreams:
+    """
+    按名称划分的独立随机数流
+    
+    每个名称的生成器由SeedSequence和名称派生（与首次使用的先后顺序无关），
+    第一次使用时创建，之后一直使用同一个生成器。
+    模板中每个取随机数的位置（表达式中的random调用、噪声等）使用各自的流，
+    因此整段生成、分块生成和并行生成得到的随机数完全相同。
+    """
+    
+    def __init__(self, seed: Union[None, int, np.random.SeedSequence] = None):
+        """
+        初始化随机数流
+        
+        Args:
+            seed: 随机种子或SeedSequence（None表示使用系统熵）
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            self._seed_sequence = seed
+        else:
+            self._seed_sequence = np.random.SeedSequence(seed)
+        self._streams: Dict[str, np.random.Generator] = {}
+        self._prefix = ''
+    
+    def get(self, name: str) -> np.random.Generator:
+        """
+        获取指定名称的随机数生成器
+        
+        Args:
+            name: 流名称
+        
+        Returns:
+            随机数生成器
+        """
+        key = self._prefix + name
+        if key not in self._streams:
+            self._streams[key] = np.random.default_rng(derive_seed_sequence(self._seed_sequence, key))
+        return self._streams[key]
+    
+    def spawn(self, name: str) -> 'RandomStreams':
+        """
+        按名称派生独立的随机数流对象（不与当前对象共享流）
+        
+        Args:
+            name: 名称
+        
+        Returns:
+            新的随机数流对象
+        """
+        return RandomStreams(derive_seed_sequence(self._seed_sequence, self._prefix + name))
+    
+    def scope(self, prefix: str) -> 'RandomStreams':
+        """
+        获取带名称前缀的子视图（与当前对象共享所有流）
+        
+        Args:
+            prefix: 名称前缀
+        
+        Returns:
+            子视图
+        """
+        scoped = copy.copy(self)
+        scoped._prefix = self._prefix + prefix
+        return scoped
+
+
+def derive_seed_sequence(seed_sequence: np.random.SeedSequence, name: str) -> np.random.SeedSequence:
+    """
+    按名称派生子SeedSequence
+    
+    子序列的spawn_key为父序列的spawn_key加上名称的CRC32，
+    同一父序列和名称总是得到相同的子序列。
+    
+    Args:
+        seed_sequence: 父SeedSequence
+        name: 名称
+    
+    Returns:
+        子SeedSequence
+    """
+    return np.random.SeedSequence(
+        seed_sequence.entropy,
+        spawn_key=tuple(seed_sequence.spawn_key) + (zlib.crc32(name.encode('utf-8')),),
+        pool_size=seed_sequence.pool_size
+    )
+
+
+class SingleRandomStream:
+    """
+    单一随机数流
+    
+    所有名称都返回同一个生成器，用于兼容直接传入np.random.Generator
+    或使用np.random全局状态的调用方式。
+    """
+    
+    def __init__(self, rng: Any = None):
+        """
+        Args:
+            rng: np.random.Generator，None表示使用np.random全局状态
+        """
+        self._rng = rng if rng is not None else np.random
+    
+    def get(self, name: str) -> Any:
+        """获取随机数生成器（忽略名称）"""
+        return self._rng
+    
+    def scope(self, prefix: str) -> 'SingleRandomStream':
+        """获取子视图（即自身）"""
+        return self
+
+
+def as_random_streams(rng: Any = None) -> Union[RandomStreams, SingleRandomStream]:
+    """
+    将rng参数统一为随机数流对象
+    
+    Args:
+        rng: RandomStreams、SingleRandomStream、np.random.Generator或None
+    
+    Returns:
+        随机数流对象
+    """
+    if isinstance(rng, (RandomStreams, SingleRandomStream)):
+        return rng
+    return SingleRandomStream(rng)
+
+
 class CapabilityTemplate(ABC):
     """
     能力模板基类
@@ -42,7 +170,8 @@ class CapabilityTemplate(ABC):
     
     @abstractmethod
     def generate(self, time_points: np.ndarray, 
-                 other_data: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+                 other_data: Optional[Dict[str, np.ndarray]] = None,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """
         生成数据
         
@@ -50,12 +179,54 @@ class CapabilityTemplate(ABC):
             time_points: 时间点数组（秒为单位的时间戳）
             other_data: 其他数据字典，用于依赖关系（如滞后跟随、多项式关系等）
                        键为数据名称，值为对应的数据数组
+            rng: 随机数生成器（可选），可以是RandomStreams或np.random.Generator。
+                 DataGenerator为每个模板分配独立的RandomStreams，
+                 模板中所有随机数都应从rng中获取，以保证结果与执行顺序无关
         
         Returns:
             生成的数据数组，长度与time_points相同
         """
         pass
     
+    def create_stream_state(self, rng: Any = None) -> Any:
+        """
+        创建流式（分块）生成的状态对象
+        
+        支持流式生成的模板需要重写此方法和generate_chunk。
+        
+        Args:
+            rng: 随机数生成器（同generate）
+        
+        Returns:
+            跨块保存的状态对象
+        
+        Raises:
+            NotImplementedError: 模板不支持流式生成
+        """
+        raise NotImplementedError(f"{self.__class__.__name__}不支持流式生成")
+    
+    def generate_chunk(self, time_points: np.ndarray,
+                       other_data: Optional[Dict[str, np.ndarray]],
+                       state: Any) -> np.ndarray:
+        """
+        生成一个时间块的数据
+        
+        按时间顺序依次调用，state在块之间传递滞后缓冲区和随机数状态，
+        所有块拼接后的结果与一次性调用generate相同。
+        
+        Args:
+            time_points: 当前块的时间点数组
+            other_data: 当前块的依赖数据
+            state: create_stream_state返回的状态对象
+        
+        Returns:
+            当前块的数据数组
+        
+        Raises:
+            NotImplementedError: 模板不支持流式生成
+        """
+        raise NotImplementedError(f"{self.__class__.__name__}不支持流式生成")
+    
     def get_dependencies(self) -> List[str]:
         """
         获取该能力模板依赖的其他数据名称列表
@@ -132,11 +303,12 @@ class CompositeCapabilityTemplate(CapabilityTemplate):
         return list(set(dependencies))
     
     def generate(self, time_points: np.ndarray, 
-                 other_data: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+                 other_data: Optional[Dict[str, np.ndarray]] = None,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """生成组合数据"""
         results = []
         for template in self.templates:
-            result = template.generate(time_points, other_data)
+            result = template.generate(time_points, other_data, rng=rng)
             results.append((result, template.weight))
         
         if self.combination_mode == 'linear':
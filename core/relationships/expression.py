@@ -8,8 +8,30 @@
 
 import numpy as np
 import ast
-from typing import Dict, Any, Optional, List
-from core.relationships.base import CapabilityTemplate
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Callable, Union
+from core.relationships.base import CapabilityTemplate, as_random_streams
+
+
+# 编译表达式缓存的最大条目数
+EXPRESSION_CACHE_SIZE = 1024
+
+# 表达式中可用的数学函数和常量
+EXPRESSION_NAMESPACE = {
+    'sqrt': np.sqrt,
+    'log': np.log,
+    'exp': np.exp,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'abs': np.abs,
+    'max': np.maximum,
+    'min': np.minimum,
+    'power': np.power,
+    'sign': np.sign,
+    'pi': np.pi,
+    'e': np.e,
+}
 
 
 class SafeExpressionEvaluator:
@@ -36,6 +58,12 @@ class SafeExpressionEvaluator:
         'random_normal': None,  # 特殊处理
     }
     
+    # 常量（编译期直接折叠，不从变量字典中读取）
+    CONSTANTS = {
+        'pi': np.pi,
+        'e': np.e,
+    }
+    
     # 允许的运算符
     ALLOWED_OPS = {
         ast.Add: np.add,
@@ -48,13 +76,17 @@ class SafeExpressionEvaluator:
         ast.UAdd: lambda x: x,  # 正号，不做任何操作
     }
     
-    def evaluate(self, expression: str, variables: Dict[str, Any]) -> np.ndarray:
+    def evaluate(self, expression: str, variables: Dict[str, Any], rng: Any = None) -> np.ndarray:
         """
         安全地执行表达式
         
+        表达式会先通过compile_expression编译（按表达式文本缓存），
+        同一表达式重复求值时不再重复解析和验证AST。
+        
         Args:
             expression: Python数学表达式字符串
             variables: 变量字典，如 {'x1': array1, 'x2': array2, 't': time_array, ...}
+            rng: 随机数生成器或RandomStreams（可选，默认使用np.random全局状态）
         
         Returns:
             计算结果数组
@@ -62,18 +94,38 @@ class SafeExpressionEvaluator:
         Raises:
             ValueError: 表达式错误或包含不允许的操作
         """
+        return compile_expression(expression)(variables, rng)
+    
+    def compile(self, expression: str) -> 'CompiledExpression':
+        """
+        编译表达式
+        
+        解析并验证AST，然后将其转换为闭包树。返回的CompiledExpression
+        可以反复调用，每次调用只执行NumPy运算。
+        
+        Args:
+            expression: Python数学表达式字符串
+        
+        Returns:
+            编译后的表达式对象
+        
+        Raises:
+            ValueError: 表达式错误或包含不允许的操作
+        """
+        # random/random_normal调用位置计数（每个调用位置使用独立的随机数流）
+        self._random_sites = 0
         try:
             # 解析AST
             tree = ast.parse(expression, mode='eval')
             # 验证AST（只允许数学运算）
             self._validate_ast(tree)
-            # 执行AST
-            result = self._eval_ast(tree.body, variables)
-            return result
+            # 编译AST
+            func = _as_closure(self._compile_ast(tree.body))
         except ValueError as e:
             raise e
         except Exception as e:
-            raise ValueError(f"表达式计算错误: {str(e)}")
+            raise ValueError(f"表达式编译错误: {str(e)}")
+        return CompiledExpression(expression, func)
     
     def _validate_ast(self, node):
         """
@@ -115,90 +167,196 @@ class SafeExpressionEvaluator:
         else:
             raise ValueError(f"不允许的AST节点: {type(node).__name__}")
     
-    def _eval_ast(self, node, variables: Dict[str, Any]) -> np.ndarray:
+    def _compile_ast(self, node) -> Union['_Constant', Callable[[Dict[str, Any], Optional[int], Any], Any]]:
         """
-        执行AST节点
+        将AST节点编译为闭包
+        
+        每个闭包的签名为 func(variables, array_length, rng)，array_length是
+        变量字典中第一个数组的长度（没有数组时为None），rng是随机数流对象，
+        每个random/random_normal调用位置按编号从中取各自的生成器。
+        
+        编译时做常量折叠：数值常量、CONSTANTS中的常量，以及只由常量构成的
+        运算和函数调用（random/random_normal除外）在编译期直接算出，
+        返回_Constant。标量保持为标量，由NumPy广播参与数组运算。
         
         Args:
-            node: AST节点
-            variables: 变量字典
+            node: AST节点（已通过验证）
         
         Returns:
-            计算结果数组
+            执行该节点的闭包，或折叠后的_Constant
         """
         if isinstance(node, ast.Constant):
             value = node.value
-            # 如果是标量，转换为数组
+            # 数值常量统一转为float
             if isinstance(value, (int, float)):
-                # 获取数组长度（从variables中任意一个数组获取）
-                array_length = len(next(iter(variables.values()))) if variables else 1
-                return np.full(array_length, value, dtype=float)
-            return value
-        elif isinstance(node, ast.Num):  # Python < 3.8
-            value = node.n
-            array_length = len(next(iter(variables.values()))) if variables else 1
-            return np.full(array_length, value, dtype=float)
+                return _Constant(float(value))
+            return lambda variables, array_length, rng: value
         elif isinstance(node, ast.Name):
-            if node.id not in variables:
-                raise ValueError(f"未定义的变量: {node.id}")
-            value = variables[node.id]
-            # 如果是函数，返回函数本身（用于函数调用）
-            if callable(value):
-                return value
-            # 如果是标量，转换为数组
-            if isinstance(value, (int, float)):
-                array_length = len(next(iter([v for v in variables.values() if isinstance(v, np.ndarray)]))) if variables else 1
-                return np.full(array_length, value, dtype=float)
-            return value
+            name = node.id
+            if name in self.CONSTANTS:
+                return _Constant(self.CONSTANTS[name])
+            
+            def eval_name(variables, array_length, rng):
+                if name not in variables:
+                    raise ValueError(f"未定义的变量: {name}")
+                return variables[name]
+            return eval_name
         elif isinstance(node, ast.BinOp):
-            left = self._eval_ast(node.left, variables)
-            right = self._eval_ast(node.right, variables)
+            left = self._compile_ast(node.left)
+            right = self._compile_ast(node.right)
             op = self.ALLOWED_OPS[type(node.op)]
-            return op(left, right)
+            if isinstance(left, _Constant) and isinstance(right, _Constant):
+                return _Constant(op(left.value, right.value))
+            left = _as_closure(left)
+            right = _as_closure(right)
+            return lambda variables, array_length, rng: op(left(variables, array_length, rng),
+                                                      right(variables, array_length, rng))
         elif isinstance(node, ast.UnaryOp):
-            operand = self._eval_ast(node.operand, variables)
+            operand = self._compile_ast(node.operand)
             op = self.ALLOWED_OPS[type(node.op)]
-            return op(operand)
+            if isinstance(operand, _Constant):
+                return _Constant(op(operand.value))
+            operand = _as_closure(operand)
+            return lambda variables, array_length, rng: op(operand(variables, array_length, rng))
         elif isinstance(node, ast.Call):
             func_name = node.func.id
-            if func_name not in self.ALLOWED_FUNCTIONS:
-                raise ValueError(f"不允许的函数: {func_name}")
-            
-            args = [self._eval_ast(arg, variables) for arg in node.args]
+            args = [self._compile_ast(arg) for arg in node.args]
             
             # 特殊处理random函数
             if func_name == 'random':
-                # 获取数组长度（从variables中任意一个数组获取）
-                array_length = None
-                for v in variables.values():
-                    if isinstance(v, np.ndarray):
-                        array_length = len(v)
-                        break
-                if array_length is None:
-                    raise ValueError("无法确定数组长度，random函数需要至少一个数组变量")
-                return np.random.random(array_length)
+                stream_name = self._next_random_site()
+                
+                def eval_random(variables, array_length, rng):
+                    if array_length is None:
+                        raise ValueError("无法确定数组长度，random函数需要至少一个数组变量")
+                    return rng.get(stream_name).random(array_length)
+                return eval_random
             elif func_name == 'random_normal':
-                # 获取数组长度
-                array_length = None
-                for v in variables.values():
-                    if isinstance(v, np.ndarray):
-                        array_length = len(v)
-                        break
-                if array_length is None:
-                    raise ValueError("无法确定数组长度，random_normal函数需要至少一个数组变量")
-                mean = float(args[0]) if len(args) > 0 else 0.0
-                std = float(args[1]) if len(args) > 1 else 1.0
-                return np.random.normal(mean, std, array_length)
+                stream_name = self._next_random_site()
+                args = [_as_closure(arg) for arg in args]
+                
+                def eval_random_normal(variables, array_length, rng):
+                    if array_length is None:
+                        raise ValueError("无法确定数组长度，random_normal函数需要至少一个数组变量")
+                    values = [arg(variables, array_length, rng) for arg in args]
+                    mean = float(values[0]) if len(values) > 0 else 0.0
+                    std = float(values[1]) if len(values) > 1 else 1.0
+                    return rng.get(stream_name).normal(mean, std, array_length)
+                return eval_random_normal
             
             # 普通函数
             func = self.ALLOWED_FUNCTIONS[func_name]
             if func is None:
                 raise ValueError(f"函数 {func_name} 需要特殊处理，但处理逻辑未实现")
-            return func(*args)
+            if all(isinstance(arg, _Constant) for arg in args):
+                return _Constant(func(*[arg.value for arg in args]))
+            args = [_as_closure(arg) for arg in args]
+            return lambda variables, array_length, rng: func(*[arg(variables, array_length, rng) for arg in args])
         else:
             raise ValueError(f"不支持的AST节点: {type(node).__name__}")
 
 
+    def _next_random_site(self) -> str:
+        """分配下一个随机数调用位置的流名称"""
+        stream_name = f'random{self._random_sites}'
+        self._random_sites += 1
+        return stream_name
+
+
+class _Constant:
+    """编译期折叠得到的常量"""
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def _as_closure(compiled: Union[_Constant, Callable]) -> Callable[[Dict[str, Any], Optional[int], Any], Any]:
+    """将编译结果统一为闭包（常量直接返回标量值）"""
+    if isinstance(compiled, _Constant):
+        value = compiled.value
+        return lambda variables, array_length, rng: value
+    return compiled
+
+
+class CompiledExpression:
+    """
+    编译后的表达式
+    
+    由SafeExpressionEvaluator.compile生成，持有已验证AST对应的闭包树。
+    调用时只需传入变量字典。
+    """
+    
+    def __init__(self, expression: str, func: Callable[[Dict[str, Any], Optional[int], Any], Any]):
+        """
+        初始化编译后的表达式
+        
+        Args:
+            expression: 原始表达式字符串
+            func: 根节点闭包
+        """
+        self.expression = expression
+        self._func = func
+    
+    def __call__(self, variables: Dict[str, Any], rng: Any = None) -> np.ndarray:
+        """
+        执行表达式
+        
+        Args:
+            variables: 变量字典
+            rng: 随机数生成器或RandomStreams（可选，默认使用np.random全局状态）
+        
+        Returns:
+            计算结果数组
+        
+        Raises:
+            ValueError: 表达式执行错误
+        """
+        # 获取数组长度（从variables中第一个数组获取）
+        array_length = None
+        for value in variables.values():
+            if isinstance(value, np.ndarray):
+                array_length = len(value)
+                break
+        
+        rng = as_random_streams(rng)
+        
+        try:
+            result = self._func(variables, array_length, rng)
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise ValueError(f"表达式计算错误: {str(e)}")
+        
+        # 结果为标量时（如表达式只包含常量），扩展为数组
+        if np.ndim(result) == 0 and not callable(result):
+            result = np.full(array_length or 1, result, dtype=float)
+        return result
+    
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.expression!r})"
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(expression: str) -> CompiledExpression:
+    """
+    编译表达式（进程级LRU缓存，按表达式文本缓存）
+    
+    相同的表达式只解析和验证一次。编译失败不会被缓存。
+    
+    Args:
+        expression: Python数学表达式字符串
+    
+    Returns:
+        编译后的表达式对象
+    
+    Raises:
+        ValueError: 表达式错误或包含不允许的操作
+    """
+    return SafeExpressionEvaluator().compile(expression)
+
+
 class ExpressionTemplate(CapabilityTemplate):
     """
     表达式模板（完全统一）
@@ -232,8 +390,19 @@ class ExpressionTemplate(CapabilityTemplate):
         },
         'noise_level': 0.05,
     }
+    
+    滞后配置（sources中的每一项）：
+    - lag_seconds为数值：固定滞后，不是时间间隔整数倍时按线性插值取值
+    - lag_seconds为字符串：滞后表达式，可使用 t 和未滞后的源数据 x1, x2, ...，
+      逐点计算滞后时间，如 {'source_name': 'F.feed', 'lag_seconds': '30 + 20 * sin(2 * pi * t / 3600)'}
+    - lag_source：用另一个位号的数据作为逐点滞后时间（秒），
+      如 {'source_name': 'F.feed', 'lag_source': 'F.dead_time'}
+    - max_lag_seconds（可选）：时变滞后的上限，流式生成时按此保留源数据的历史
     """
     
+    # 滞后点数与整数的差小于该值时按整数滞后处理
+    LAG_POINTS_TOLERANCE = 1e-9
+    
     def validate_config(self):
         """验证配置"""
         if 'calculation' not in self.config:
@@ -245,6 +414,9 @@ class ExpressionTemplate(CapabilityTemplate):
         if not isinstance(expression, str) or not expression.strip():
             raise ValueError("expression必须是非空字符串")
         
+        # 编译表达式（解析和验证只在这里做一次，generate时直接调用）
+        self.compiled_expression = compile_expression(expression)
+        
         # 如果有sources，验证sources配置
         if 'sources' in self.config:
             sources = self.config['sources']
@@ -257,20 +429,40 @@ class ExpressionTemplate(CapabilityTemplate):
                     raise ValueError(f"source[{i}]必须是一个字典")
                 if 'source_name' not in source:
                     raise ValueError(f"source[{i}]缺少'source_name'")
+                max_lag_seconds = source.get('max_lag_seconds', 0)
+                if not isinstance(max_lag_seconds, (int, float)) or max_lag_seconds < 0:
+                    raise ValueError(f"source[{i}]的'max_lag_seconds'必须是非负数")
+                if 'lag_source' in source:
+                    if 'lag_seconds' in source:
+                        raise ValueError(f"source[{i}]不能同时指定'lag_seconds'和'lag_source'")
+                    if not isinstance(source['lag_source'], str) or not source['lag_source']:
+                        raise ValueError(f"source[{i}]的'lag_source'必须是非空字符串")
+                    continue
                 if 'lag_seconds' not in source:
                     raise ValueError(f"source[{i}]缺少'lag_seconds'")
                 lag_seconds = source.get('lag_seconds', 0)
-                if not isinstance(lag_seconds, (int, float)) or lag_seconds < 0:
-                    raise ValueError(f"source[{i}]的'lag_seconds'必须是非负数")
+                if isinstance(lag_seconds, str):
+                    if not lag_seconds.strip():
+                        raise ValueError(f"source[{i}]的'lag_seconds'表达式不能为空")
+                    # 验证滞后表达式
+                    compile_expression(lag_seconds)
+                elif not isinstance(lag_seconds, (int, float)) or lag_seconds < 0:
+                    raise ValueError(f"source[{i}]的'lag_seconds'必须是非负数或表达式")
     
     def get_dependencies(self) -> List[str]:
         """获取依赖的数据名称列表"""
         if 'sources' in self.config:
-            return [source['source_name'] for source in self.config['sources']]
+            dependencies = []
+            for source in self.config['sources']:
+                for name in (source['source_name'], source.get('lag_source')):
+                    if name is not None and name not in dependencies:
+                        dependencies.append(name)
+            return dependencies
         return []
     
     def generate(self, time_points: np.ndarray, 
-                 other_data: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+                 other_data: Optional[Dict[str, np.ndarray]] = None,
+                 rng: Any = None) -> np.ndarray:
         """
         生成数据
         
@@ -280,8 +472,45 @@ class ExpressionTemplate(CapabilityTemplate):
         3. 依赖生成：处理sources（应用滞后），构建变量字典（x1, x2, x3）
         4. 执行表达式
         5. 添加噪声
+        
+        random()、random_normal()和噪声都从rng中取随机数，未提供时使用np.random全局状态。
+        一次性生成等价于只有一个块的流式生成。
         """
-        expression = self.config['calculation']['expression']
+        state = self.create_stream_state(rng)
+        return self.generate_chunk(time_points, other_data, state)
+    
+    def create_stream_state(self, rng: Any = None) -> 'ExpressionStreamState':
+        """
+        创建流式生成的状态对象
+        
+        Args:
+            rng: 随机数生成器或RandomStreams（可选）
+        
+        Returns:
+            跨块保存的状态对象
+        """
+        return ExpressionStreamState(as_random_streams(rng))
+    
+    def generate_chunk(self, time_points: np.ndarray,
+                       other_data: Optional[Dict[str, np.ndarray]],
+                       state: 'ExpressionStreamState') -> np.ndarray:
+        """
+        生成一个时间块的数据
+        
+        state中保存每个源数据最近的历史（用于跨块滞后）和各随机数流，
+        所有块拼接后的结果与一次性生成相同。
+        
+        Args:
+            time_points: 当前块的时间点数组
+            other_data: 当前块的依赖数据
+            state: create_stream_state返回的状态对象
+        
+        Returns:
+            当前块的数据数组
+        """
+        streams = state.random_streams
+        if state.time_interval is None:
+            state.time_interval = self._get_time_interval(time_points)
         
         # 判断是独立生成还是依赖生成
         has_sources = 'sources' in self.config and len(self.config.get('sources', [])) > 0
@@ -294,10 +523,9 @@ class ExpressionTemplate(CapabilityTemplate):
                 raise ValueError("依赖生成模式需要other_data参数")
             
             # 处理每个source（应用滞后）
-            processed_sources = []
+            raw_sources = []
             for source in sources:
                 source_name = source['source_name']
-                lag_seconds = source.get('lag_seconds', 0)
                 
                 if source_name not in other_data:
                     raise ValueError(f"缺少依赖数据: {source_name}")
@@ -307,13 +535,66 @@ class ExpressionTemplate(CapabilityTemplate):
                 if not isinstance(raw_data, np.ndarray):
                     raw_data = np.array(raw_data)
                 
-                # 应用滞后
-                if lag_seconds > 0:
-                    processed_data = self._apply_lag(raw_data, time_points, lag_seconds)
+                raw_sources.append(raw_data)
+            
+            # 计算每个source的滞后点数（整数、小数或逐点数组）
+            lag_points_list = [
+                self._resolve_lag_points(source, time_points, raw_sources, other_data,
+                                         state.time_interval, streams.scope(f'lag{i}.'))
+                for i, source in enumerate(sources)
+            ]
+            
+            # 每个源数据需要保留的历史点数（第一个块时确定，之后保持不变）
+            if state.keep_points is None:
+                state.keep_points = self._get_keep_points(sources, lag_points_list, state.time_interval)
+            
+            # 每个源数据只拼接一次缓冲区（历史 + 当前块），各滞后都从该缓冲区取值
+            buffers = {}
+            for source, raw_data, lag_points in zip(sources, raw_sources, lag_points_list):
+                source_name = source['source_name']
+                keep_points = state.keep_points.get(source_name, 0)
+                if keep_points == 0 or len(raw_data) == 0 or source_name in buffers:
+                    continue
+                history = state.history.get(source_name)
+                if history is None:
+                    # 第一个块：用首值填充（滞后索引小于0时使用源数据的第一个值）
+                    buffers[source_name] = self._pad_leading(raw_data, keep_points)
                 else:
-                    processed_data = raw_data.copy()
-                
-                processed_sources.append(processed_data)
+                    buffers[source_name] = np.concatenate((history, raw_data))
+            
+            # 应用滞后
+            processed_sources = []
+            for i, (source, raw_data, lag_points) in enumerate(zip(sources, raw_sources, lag_points_list)):
+                source_name = source['source_name']
+                if len(raw_data) == 0:
+                    processed_sources.append(raw_data)
+                elif isinstance(lag_points, np.ndarray):
+                    # 时变滞后
+                    keep_points = state.keep_points.get(source_name, 0)
+                    if keep_points == 0:
+                        buffer = raw_data
+                    else:
+                        buffer = buffers[source_name]
+                    buffer_start = state.start_index - (len(buffer) - len(raw_data))
+                    processed_sources.append(
+                        self._variable_lag(buffer, buffer_start, state.start_index, lag_points, i)
+                    )
+                elif lag_points == 0:
+                    # 无滞后，直接使用源数据
+                    processed_sources.append(raw_data)
+                else:
+                    pad_points = state.keep_points[source_name]
+                    buffer = buffers[source_name]
+                    if isinstance(lag_points, int):
+                        processed_sources.append(self._lag_view(buffer, pad_points, lag_points, len(raw_data)))
+                    else:
+                        processed_sources.append(
+                            self._fractional_lag(buffer, pad_points, lag_points, len(raw_data))
+                        )
+            
+            # 保存历史，供下一个块使用
+            for source_name, buffer in buffers.items():
+                state.history[source_name] = buffer[len(buffer) - state.keep_points[source_name]:].copy()
             
             # 构建变量字典（x1, x2, x3, ...）
             variables = {}
@@ -331,27 +612,11 @@ class ExpressionTemplate(CapabilityTemplate):
             }
         
         # 添加数学函数和常量
-        # 注意：函数需要在执行时动态生成，因为需要知道数组长度
-        variables.update({
-            'sqrt': np.sqrt,
-            'log': np.log,
-            'exp': np.exp,
-            'sin': np.sin,
-            'cos': np.cos,
-            'tan': np.tan,
-            'abs': np.abs,
-            'max': np.maximum,
-            'min': np.minimum,
-            'power': np.power,
-            'sign': np.sign,
-            'pi': np.pi,
-            'e': np.e,
-        })
-        
-        # 执行表达式
+        variables.update(EXPRESSION_NAMESPACE)
+        
+        # 执行表达式（使用validate_config中编译好的表达式）
         try:
-            evaluator = SafeExpressionEvaluator()
-            data = evaluator.evaluate(expression, variables)
+            data = self.compiled_expression(variables, streams.scope('expr.'))
             
             # 确保结果是numpy数组
             if not isinstance(data, np.ndarray):
@@ -361,6 +626,11 @@ class ExpressionTemplate(CapabilityTemplate):
             if len(data) != len(time_points):
                 raise ValueError(f"表达式结果长度({len(data)})与时间点长度({len(time_points)})不匹配")
             
+            # 结果不能与输入数据共享内存（如表达式只是 x1 或 t）
+            if any(np.may_share_memory(data, value) for value in variables.values()
+                   if isinstance(value, np.ndarray)):
+                data = data.copy()
+            
         except ValueError as e:
             raise e
         except Exception as e:
@@ -369,51 +639,201 @@ class ExpressionTemplate(CapabilityTemplate):
         # 添加噪声
         noise_level = self.config.get('noise_level', 0.0)
         if noise_level > 0:
-            noise = np.random.normal(0, abs(data) * noise_level, size=len(data))
+            noise = streams.get('noise').normal(0, abs(data) * noise_level, size=len(data))
             data = data + noise
         
+        state.start_index += len(time_points)
+        
         return data
     
-    def _apply_lag(self, data: np.ndarray, time_points: np.ndarray, lag_seconds: float) -> np.ndarray:
+    def _resolve_lag_points(self, source: Dict[str, Any], time_points: np.ndarray,
+                            raw_sources: List[np.ndarray],
+                            other_data: Dict[str, np.ndarray],
+                            time_interval: Optional[float],
+                            rng: Any = None) -> Union[int, float, np.ndarray]:
         """
-        应用滞后
+        计算source的滞后点数
         
         Args:
-            data: 原始数据数组
-            time_points: 时间点数组（秒为单位的时间戳）
-            lag_seconds: 滞后时间（秒）
+            source: source配置
+            time_points: 时间点数组
+            raw_sources: 未滞后的源数据列表（用于滞后表达式中的 x1, x2, ...）
+            other_data: 其他数据字典（用于lag_source）
+            time_interval: 时间间隔（秒），无法确定时为None
+            rng: 随机数生成器（用于滞后表达式）
         
         Returns:
-            滞后后的数据数组
+            滞后点数（整数、小数或逐点数组）
+        """
+        if 'lag_source' in source:
+            lag_name = source['lag_source']
+            if lag_name not in other_data:
+                raise ValueError(f"缺少滞后数据: {lag_name}")
+            lag_seconds = np.asarray(other_data[lag_name], dtype=float)
+        else:
+            lag_seconds = source.get('lag_seconds', 0)
+            if isinstance(lag_seconds, str):
+                variables = {f'x{i+1}': data for i, data in enumerate(raw_sources)}
+                variables['t'] = time_points
+                variables.update(EXPRESSION_NAMESPACE)
+                lag_seconds = compile_expression(lag_seconds)(variables, rng)
+        
+        if isinstance(lag_seconds, np.ndarray) and len(lag_seconds) != len(time_points):
+            raise ValueError(f"滞后数据长度({len(lag_seconds)})与时间点长度({len(time_points)})不匹配")
+        
+        return self._get_lag_points(time_interval, lag_seconds)
+    
+    @staticmethod
+    def _get_time_interval(time_points: np.ndarray) -> Optional[float]:
+        """
+        获取时间间隔
+        
+        Args:
+            time_points: 时间点数组（秒为单位的时间戳）
         
-        说明：
-            滞后意味着：output[i] = input[i - lag_points]
-            例如：如果lag_seconds=30，time_interval=5，则lag_points=6
-            那么 output[6] = input[0], output[7] = input[1], ...
-            对于 i < lag_points 的情况，使用 input[0]
+        Returns:
+            时间间隔（秒），只有一个时间点或间隔无效时返回None
         """
         if len(time_points) < 2:
-            # 如果只有一个时间点，无法计算时间间隔，直接返回
-            return data.copy()
+            # 如果只有一个时间点，无法计算时间间隔
+            return None
         
         time_interval = time_points[1] - time_points[0]
         if time_interval <= 0:
-            # 时间间隔无效，直接返回
-            return data.copy()
+            # 时间间隔无效
+            return None
+        
+        return time_interval
+    
+    def _get_lag_points(self, time_interval: Optional[float],
+                        lag_seconds: Union[float, np.ndarray]) -> Union[int, float, np.ndarray]:
+        """
+        将滞后时间换算为滞后点数
+        
+        Args:
+            time_interval: 时间间隔（秒），None表示无法确定
+            lag_seconds: 滞后时间（秒），标量或逐点数组
+        
+        Returns:
+            滞后点数：整数倍时为int，否则为float；逐点滞后返回数组
+            （负值和NaN按0处理）。时间间隔无法确定时返回0
+        """
+        if time_interval is None:
+            return 0
+        
+        if isinstance(lag_seconds, np.ndarray):
+            lag_points = np.nan_to_num(lag_seconds / time_interval, nan=0.0)
+            return np.maximum(lag_points, 0.0)
         
-        lag_points = int(round(lag_seconds / time_interval))
+        lag_points = float(lag_seconds) / time_interval
+        if lag_points <= 0:
+            return 0
+        rounded = int(round(lag_points))
+        if abs(lag_points - rounded) < self.LAG_POINTS_TOLERANCE:
+            return rounded
+        return lag_points
+    
+    def _get_keep_points(self, sources: List[Dict[str, Any]],
+                         lag_points_list: List[Union[int, float, np.ndarray]],
+                         time_interval: Optional[float]) -> Dict[str, int]:
+        """
+        计算每个源数据需要保留的历史点数
+        
+        固定滞后取最大滞后点数（向上取整），时变滞后取max_lag_seconds对应的点数。
+        
+        Returns:
+            源数据名称到历史点数的映射
+        """
+        keep_points: Dict[str, int] = {}
+        for source, lag_points in zip(sources, lag_points_list):
+            if isinstance(lag_points, np.ndarray):
+                max_lag_seconds = source.get('max_lag_seconds', 0)
+                points = int(np.ceil(max_lag_seconds / time_interval)) if time_interval else 0
+            else:
+                points = int(np.ceil(lag_points))
+            source_name = source['source_name']
+            keep_points[source_name] = max(keep_points.get(source_name, 0), points)
+        return keep_points
+    
+    @staticmethod
+    def _pad_leading(data: np.ndarray, pad_points: int) -> np.ndarray:
+        """
+        在数据前面填充pad_points个首值，返回长度为len(data)+pad_points的缓冲区
+        """
+        padded = np.empty(len(data) + pad_points, dtype=data.dtype)
+        padded[:pad_points] = data[0]
+        padded[pad_points:] = data
+        return padded
+    
+    @staticmethod
+    def _lag_view(padded: np.ndarray, pad_points: int, lag_points: int, length: int) -> np.ndarray:
+        """
+        从填充缓冲区中取出滞后lag_points点的视图（lag_points不能大于pad_points）
+        """
+        lag_points = min(lag_points, pad_points)
+        start = pad_points - lag_points
+        return padded[start:start + length]
+    
+    @classmethod
+    def _fractional_lag(cls, padded: np.ndarray, pad_points: int, lag_points: float, length: int) -> np.ndarray:
+        """
+        小数点滞后：在相邻两个整数滞后视图之间线性插值（pad_points不小于ceil(lag_points)）
+        """
+        lower = int(np.floor(lag_points))
+        fraction = lag_points - lower
+        near = cls._lag_view(padded, pad_points, lower, length)
+        far = cls._lag_view(padded, pad_points, lower + 1, length)
+        return near + fraction * (far - near)
+    
+    @staticmethod
+    def _variable_lag(buffer: np.ndarray, buffer_start: int, start: int,
+                      lag_points: np.ndarray, source_index: int = 0) -> np.ndarray:
+        """
+        时变滞后：output[i] = input(i - lag_points[i])，按线性插值取值
         
-        if lag_points == 0:
-            # 无滞后，直接返回
-            return data.copy()
+        时间轴是等间隔的，直接由索引计算插值位置（与np.interp结果相同），复杂度O(n)。
+        索引都是整个时间轴上的全局索引，分块生成时与一次性生成的计算完全相同。
         
-        lagged_data = np.zeros_like(data)
-        for i in range(len(data)):
-            source_idx = i - lag_points
-            if source_idx < 0:
-                # 如果滞后索引小于0，使用源数据的第一个值
-                source_idx = 0
-            lagged_data[i] = data[source_idx]
+        Args:
+            buffer: 源数据缓冲区（历史 + 当前块）
+            buffer_start: buffer[0]对应的全局索引（可以为负，负索引部分是首值填充）
+            start: 当前块第一个点的全局索引
+            lag_points: 当前块的逐点滞后点数（非负）
+            source_index: source序号（用于错误信息）
         
-        return lagged_data
+        Returns:
+            滞后后的数据数组
+        """
+        length = len(lag_points)
+        positions = np.arange(start, start + length, dtype=float) - lag_points
+        np.clip(positions, 0.0, None, out=positions)
+        lower = positions.astype(np.intp)
+        if length > 0 and lower.min() < buffer_start:
+            raise ValueError(f"source[{source_index}]的时变滞后超过了保留的历史长度，请配置'max_lag_seconds'")
+        fraction = positions - lower
+        lower -= buffer_start
+        upper = np.minimum(lower + 1, len(buffer) - 1)
+        near = buffer[lower]
+        return near + fraction * (buffer[upper] - near)
+
 
+class ExpressionStreamState:
+    """
+    ExpressionTemplate流式生成的跨块状态
+    
+    保存当前块的全局起始索引、时间间隔、每个源数据的历史（用于跨块滞后）
+    以及各随机数流。
+    """
+    
+    def __init__(self, random_streams: Any):
+        """
+        初始化状态
+        
+        Args:
+            random_streams: 随机数流对象（RandomStreams或SingleRandomStream）
+        """
+        self.random_streams = random_streams
+        self.start_index = 0
+        self.time_interval: Optional[float] = None
+        self.keep_points: Optional[Dict[str, int]] = None
+        self.history: Dict[str, np.ndarray] = {}
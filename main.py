@@ -1,18 +1,32 @@
 """
 数据工厂主程序入口
 
-提供数据生成、导出、可视化等功能。
+提供数据生成、导出、预览和性能测试的命令行工具：
+
+    python main.py                                  # 批量生成input目录下所有配置的数据到output目录
+    python main.py generate [配置文件或目录...] [-o 输出目录]
+    python main.py export 配置文件 输出文件 [--type full|history]
+    python main.py preview 配置文件或数据文件
+    python main.py bench [配置文件或目录...] [--repeat 次数]
+    python main.py --import-report 子命令 ...        # 执行子命令并报告各模块的导入耗时
+
+各子命令只在需要时导入依赖（数据生成、pandas、PyQt6等），
+generate、export和bench不导入PyQt6和pyqtgraph，可以在没有图形界面的服务器上运行。
 """
 
-import yaml
+import argparse
+import subprocess
+import sys
+import time
 from pathlib import Path
 from datetime import datetime
-from core.generators.data_generator import DataGenerator
-from template.template_manager import TemplateManager
-from output.data_exporter import DataExporter
-from visualization.data_viewer import show_data_viewer
-from utils.logger import get_logger
-import sys
+from typing import Dict, List, Optional
+
+DEFAULT_INPUT_DIR = 'input'  # 默认输入配置文件目录
+DEFAULT_OUTPUT_DIR = 'output'  # 默认输出数据目录
+CONFIG_EXTENSIONS = ('.yaml', '.yml', '.json')  # 配置文件扩展名
+IMPORT_REPORT_TOP = 15  # 导入耗时报告显示的模块数
+WATCHED_PACKAGES = ('PyQt6', 'pyqtgraph', 'pandas', 'scipy', 'sanic', 'sqlalchemy')  # 导入报告中单独列出是否加载的包
 
 
 def load_config(config_path: str) -> dict:
@@ -28,7 +42,8 @@ def load_config(config_path: str) -> dict:
     with open(config_path, 'r', encoding='utf-8') as f:
         # 根据文件扩展名判断格式
         if config_path.endswith('.yaml') or config_path.endswith('.yml'):
-            config = yaml.safe_load(f)
+            from utils.yaml_loader import load_yaml
+            config = load_yaml(f)
         else:
             # 兼容JSON格式
             import json
@@ -45,6 +60,8 @@ def generate_data(config_path: str, output_path: str = None, preview: bool = Fal
         output_path: 输出文件路径（可选）
         preview: 是否预览数据
     """
+    from core.generators.data_generator import DataGenerator
+    from utils.logger import get_logger
     logger = get_logger()
     
     # 加载配置
@@ -64,15 +81,13 @@ def generate_data(config_path: str, output_path: str = None, preview: bool = Fal
     # 预览数据
     if preview:
         logger.info("打开数据预览窗口...")
-        from PyQt6.QtWidgets import QApplication
-        app = QApplication.instance()
-        if app is None:
-            app = QApplication(sys.argv)
-        viewer = show_data_viewer(df)
-        sys.exit(app.exec())
+        show_preview(df)
     
     # 导出数据
     if output_path:
+        from template.template_manager import TemplateManager
+        from output.data_exporter import DataExporter
+        
         # 创建模板管理器
         template_config = config.get('template', {})
         template_manager = TemplateManager(template_config)
@@ -100,57 +115,299 @@ def generate_data(config_path: str, output_path: str = None, preview: bool = Fal
         full_output_path = output_file.parent / f"{output_file.stem}_{timestamp}{output_file.suffix}"
         full_actual_path = exporter.export(full_df, str(full_output_path), add_timestamp=False)
         logger.info(f"完整数据已导出到: {full_actual_path} (共 {len(full_df)} 行，包含未来 {generator.future_points} 点)")
+        
+        # 记录各列统计摘要
+        logger.info("数据摘要:")
+        exporter.log_summary(full_df)
     else:
         logger.info("未指定输出路径，数据未导出")
 
 
-if __name__ == '__main__':
-    # 配置参数
-    input_dir = 'input'  # 输入配置文件目录
-    output_dir = 'output'  # 输出数据目录
-    preview = False  # 是否预览数据（True表示预览，False表示导出）
+def show_preview(df, stats=None):
+    """
+    打开数据预览窗口（阻塞到窗口关闭后退出程序）
+    
+    Args:
+        df: 要显示的DataFrame
+        stats: 各数值列的统计（可选）
+    """
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from visualization.data_viewer import DataViewer
+    except ImportError as e:
+        raise SystemExit(f"预览数据需要安装PyQt6和pyqtgraph: {e}")
     
-    # 遍历input目录下的所有配置文件
-    from pathlib import Path
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv)
+    viewer = DataViewer()
+    viewer.set_data(df, stats=stats)
+    viewer.show()
+    sys.exit(app.exec())
+
+
+def find_config_files(paths: Optional[List[str]] = None) -> List[Path]:
+    """
+    查找配置文件
     
-    input_path = Path(input_dir)
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+    Args:
+        paths: 配置文件或目录列表（可选，不提供时使用input目录）；目录中查找所有YAML和YML文件
+    
+    Returns:
+        配置文件路径列表
+    """
+    config_files = []
+    for path in map(Path, paths or [DEFAULT_INPUT_DIR]):
+        if path.is_dir():
+            config_files.extend(sorted(list(path.glob('*.yaml')) + list(path.glob('*.yml'))))
+        else:
+            config_files.append(path)
+    return config_files
+
+
+def cmd_generate(args) -> int:
+    """
+    generate子命令：为每个配置文件生成历史数据和完整数据两个CSV文件
+    
+    Returns:
+        退出码（有配置文件失败时为1）
+    """
+    from utils.logger import get_logger
+    logger = get_logger()
     
-    # 获取所有YAML和YML文件
-    config_files = list(input_path.glob('*.yaml')) + list(input_path.glob('*.yml'))
+    output_path = Path(args.output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
     
+    config_files = find_config_files(args.configs)
     if not config_files:
-        logger = get_logger()
-        logger.warning(f"在 {input_dir} 目录下没有找到配置文件")
-        print(f"在 {input_dir} 目录下没有找到配置文件")
-    else:
-        logger = get_logger()
-        logger.info(f"找到 {len(config_files)} 个配置文件，开始批量生成数据...")
-        print(f"找到 {len(config_files)} 个配置文件，开始批量生成数据...")
-        
-        for config_file in config_files:
-            try:
-                # 生成输出文件名（使用配置文件名，去掉扩展名）
-                base_name = config_file.stem
-                
-                # 生成数据
-                logger.info(f"处理配置文件: {config_file.name}")
-                print(f"处理配置文件: {config_file.name}")
+        logger.warning(f"没有找到配置文件: {', '.join(args.configs or [DEFAULT_INPUT_DIR])}")
+        print(f"没有找到配置文件: {', '.join(args.configs or [DEFAULT_INPUT_DIR])}")
+        return 1
+    
+    logger.info(f"找到 {len(config_files)} 个配置文件，开始批量生成数据...")
+    print(f"找到 {len(config_files)} 个配置文件，开始批量生成数据...")
+    
+    failed = 0
+    for config_file in config_files:
+        try:
+            # 生成输出文件名（使用配置文件名，去掉扩展名）
+            base_name = config_file.stem
+            
+            logger.info(f"处理配置文件: {config_file.name}")
+            print(f"处理配置文件: {config_file.name}")
+            
+            output_file = output_path / f"{base_name}.csv"
+            generate_data(str(config_file), str(output_file))
+            
+            logger.info(f"  ✓ 完成: {base_name}")
+            print(f"  ✓ 完成: {base_name}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"  ✗ 失败: {config_file.name} - {e}")
+            print(f"  ✗ 失败: {config_file.name} - {e}")
+            import traceback
+            traceback.print_exc()
+    
+    logger.info("批量生成完成")
+    print("批量生成完成")
+    return 1 if failed else 0
+
+
+def cmd_export(args) -> int:
+    """
+    export子命令：流式生成并导出单个CSV文件（内存占用与总点数无关）
+    
+    Returns:
+        退出码
+    """
+    from core.generators.data_generator import DataGenerator
+    from template.template_manager import TemplateManager
+    from output.data_exporter import DataExporter
+    
+    config = load_config(args.config)
+    generator = DataGenerator(config.get('generator', {}))
+    exporter = DataExporter(TemplateManager(config.get('template', {})))
+    
+    output_points = generator.history_points if args.type == 'history' else generator.total_points
+    
+    def iter_chunks():
+        """逐块生成数据，只输出前output_points行"""
+        written = 0
+        for chunk in generator.generate_chunks():
+            chunk = chunk.iloc[:output_points - written]
+            written += len(chunk)
+            yield chunk
+            if written >= output_points:
+                break
+    
+    actual_path = exporter.export_chunks(iter_chunks(), args.output, add_timestamp=args.timestamp)
+    print(f"数据已导出到: {actual_path} (共 {output_points} 行)")
+    return 0
+
+
+def cmd_preview(args) -> int:
+    """
+    preview子命令：预览配置生成的数据，或已生成的数据文件（CSV、.npy、Arrow、Parquet）
+    
+    Returns:
+        退出码
+    """
+    path = Path(args.path)
+    if path.suffix.lower() in CONFIG_EXTENSIONS:
+        generate_data(str(path), preview=True)
+        return 0
+    
+    from visualization.data_loader import load_data_file, load_file_stats
+    df = load_data_file(str(path))
+    show_preview(df, load_file_stats(str(path), df))
+    return 0
+
+
+def cmd_bench(args) -> int:
+    """
+    bench子命令：测试每个配置的解析、生成和CSV格式化耗时（取多次运行的最小值）
+    
+    Returns:
+        退出码（有配置文件失败时为1）
+    """
+    start = time.perf_counter()
+    from core.generators.data_generator import DataGenerator
+    from template.template_manager import TemplateManager
+    from output.data_exporter import DataExporter
+    print(f"导入耗时: {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    config_files = find_config_files(args.configs)
+    print(f"{'配置':<40} {'行数':>8} {'列数':>5} {'解析ms':>9} {'生成ms':>9} {'格式化ms':>9} {'行/秒':>12}")
+    
+    failed = 0
+    for config_file in config_files:
+        try:
+            timings: Dict[str, float] = {'parse': float('inf'), 'generate': float('inf'), 'format': float('inf')}
+            for _ in range(max(1, args.repeat)):
+                start = time.perf_counter()
+                config = load_config(str(config_file))
+                generator = DataGenerator(config.get('generator', {}))
+                exporter = DataExporter(TemplateManager(config.get('template', {})))
+                timings['parse'] = min(timings['parse'], time.perf_counter() - start)
                 
-                # 生成数据（不指定output_path，在generate_data函数内部处理）
-                # 但我们需要指定输出路径，所以直接调用generate_data
-                output_file = output_path / f"{base_name}.csv"
-                generate_data(str(config_file), str(output_file), preview)
+                start = time.perf_counter()
+                df = generator.generate()
+                timings['generate'] = min(timings['generate'], time.perf_counter() - start)
                 
-                logger.info(f"  ✓ 完成: {base_name}")
-                print(f"  ✓ 完成: {base_name}")
-            except Exception as e:
-                logger.error(f"  ✗ 失败: {config_file.name} - {e}")
-                print(f"  ✗ 失败: {config_file.name} - {e}")
-                import traceback
-                traceback.print_exc()
-        
-        logger.info("批量生成完成")
-        print("批量生成完成")
+                start = time.perf_counter()
+                for _ in exporter.iter_csv([df]):
+                    pass
+                timings['format'] = min(timings['format'], time.perf_counter() - start)
+            
+            rows_per_second = len(df) / timings['generate'] if timings['generate'] > 0 else float('inf')
+            print(f"{config_file.name:<40} {len(df):>8} {len(df.columns):>5} "
+                  f"{timings['parse'] * 1000:>9.1f} {timings['generate'] * 1000:>9.1f} "
+                  f"{timings['format'] * 1000:>9.1f} {rows_per_second:>12.0f}")
+        except Exception as e:
+            failed += 1
+            print(f"{config_file.name:<40} 失败: {e}")
+    return 1 if failed else 0
+
+
+def run_import_report(argv: List[str]) -> int:
+    """
+    使用python -X importtime执行子命令，并汇总各顶层模块的导入耗时
+    
+    Args:
+        argv: 子命令及其参数
+    
+    Returns:
+        子命令的退出码
+    """
+    command = [sys.executable, '-X', 'importtime', str(Path(__file__).resolve()), *argv]
+    process = subprocess.run(command, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    
+    # 每行格式："import time: 自身耗时 | 累计耗时 | 模块名"（模块名按导入层级缩进，单位为微秒）
+    totals: Dict[str, int] = {}
+    imported = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            print(line, file=sys.stderr)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        imported.add(name.strip().split('.')[0])
+        if len(name) - len(name.lstrip()) > 1:
+            continue  # 只统计顶层导入，子模块的耗时已包含在累计耗时中
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(fields[1])
+    
+    total = sum(totals.values())
+    print(f"\n导入耗时报告（{' '.join(argv) or 'generate'}）：共 {total / 1000:.1f} ms")
+    for package, cumulative in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:IMPORT_REPORT_TOP]:
+        print(f"  {package:<30} {cumulative / 1000:>9.1f} ms")
+    loaded = [package for package in WATCHED_PACKAGES if package in imported]
+    not_loaded = [package for package in WATCHED_PACKAGES if package not in imported]
+    print(f"  已加载: {', '.join(loaded) or '无'}")
+    print(f"  未加载: {', '.join(not_loaded) or '无'}")
+    return process.returncode
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    创建命令行参数解析器
+    
+    Returns:
+        参数解析器
+    """
+    parser = argparse.ArgumentParser(description='数据工厂：生成、导出和预览模拟数据')
+    parser.add_argument('--import-report', action='store_true',
+                        help='执行子命令并报告各模块的导入耗时（使用python -X importtime）')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    generate_parser = subparsers.add_parser('generate', help='为每个配置生成历史数据和完整数据CSV文件')
+    generate_parser.add_argument('configs', nargs='*', help=f'配置文件或目录（默认{DEFAULT_INPUT_DIR}目录）')
+    generate_parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR, help=f'输出目录（默认{DEFAULT_OUTPUT_DIR}）')
+    generate_parser.set_defaults(func=cmd_generate)
+    
+    export_parser = subparsers.add_parser('export', help='流式生成并导出单个CSV文件')
+    export_parser.add_argument('config', help='配置文件')
+    export_parser.add_argument('output', help='输出文件路径')
+    export_parser.add_argument('--type', choices=['full', 'history'], default='full', help='导出类型（默认full）')
+    export_parser.add_argument('--timestamp', action='store_true', help='在文件名中添加时间戳')
+    export_parser.set_defaults(func=cmd_export)
+    
+    preview_parser = subparsers.add_parser('preview', help='在数据查看器中预览配置生成的数据或数据文件（需要PyQt6）')
+    preview_parser.add_argument('path', help='配置文件（.yaml/.yml/.json）或数据文件（.csv/.npy/.arrow/.feather/.parquet）')
+    preview_parser.set_defaults(func=cmd_preview)
+    
+    bench_parser = subparsers.add_parser('bench', help='测试配置的解析、生成和CSV格式化耗时')
+    bench_parser.add_argument('configs', nargs='*', help=f'配置文件或目录（默认{DEFAULT_INPUT_DIR}目录）')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='每个配置的运行次数（取最小值，默认3）')
+    bench_parser.set_defaults(func=cmd_bench)
+    
+    return parser
 
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+    
+    Args:
+        argv: 命令行参数（可选，默认sys.argv[1:]）
+    
+    Returns:
+        退出码
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.import_report:
+        return run_import_report([arg for arg in argv if arg != '--import-report'])
+    
+    # 不指定子命令时，批量生成input目录下所有配置的数据
+    if args.command is None:
+        args = parser.parse_args(['generate'])
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,12 +5,14 @@
 与模板管理模块分离，只负责数据输出逻辑。
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Iterable, Iterator, List, TextIO
 from datetime import datetime
 from template.template_manager import TemplateManager
 from utils.logger import get_logger
+from utils.statistics import ColumnStats, compute_stats
 
 
 class DataExporter:
@@ -18,8 +20,12 @@ class DataExporter:
     数据导出器
     
     负责将数据按照模板配置导出到CSV文件。
+    数据按块整列格式化后写入，内存占用与块大小有关，与总行数无关。
     """
     
+    WRITE_CHUNK_SIZE = 50000  # 每次格式化和写入的行数
+    WRITE_BUFFER_SIZE = 1 << 20  # 文件写入缓冲区大小（字节）
+    
     def __init__(self, template_manager: TemplateManager):
         """
         初始化数据导出器
@@ -42,6 +48,55 @@ class DataExporter:
             output_path: 输出文件路径
             add_timestamp: 是否在文件名中添加时间戳
         
+        Returns:
+            实际输出的文件路径
+        """
+        return self.export_chunks(self._split_chunks(df, self.WRITE_CHUNK_SIZE), output_path, add_timestamp)
+    
+    def get_summary(self, df: pd.DataFrame) -> Dict[str, ColumnStats]:
+        """
+        计算导出数据的摘要（各数值列的最小值、最大值、均值、标准差和NaN数）
+        
+        Args:
+            df: 导出的DataFrame
+        
+        Returns:
+            列名到统计结果的映射（不包含timeStamp列）
+        """
+        return compute_stats(df)
+    
+    def log_summary(self, df: pd.DataFrame) -> Dict[str, ColumnStats]:
+        """
+        计算并记录导出数据的摘要
+        
+        Args:
+            df: 导出的DataFrame
+        
+        Returns:
+            列名到统计结果的映射（不包含timeStamp列）
+        """
+        summary = self.get_summary(df)
+        for col, stats in summary.items():
+            self.logger.info(
+                f"  {col}: 最小值={stats.min:.6g}, 最大值={stats.max:.6g}, "
+                f"均值={stats.mean:.6g}, 标准差={stats.std:.6g}, NaN数={stats.nan_count}"
+            )
+        return summary
+    
+    def export_chunks(self,
+                      chunks: Iterable[pd.DataFrame],
+                      output_path: str,
+                      add_timestamp: bool = True) -> str:
+        """
+        逐块导出数据到CSV文件（适用于流式生成的数据）
+        
+        表头按第一块生成，输出内容与导出所有块拼接后的DataFrame相同。
+        
+        Args:
+            chunks: 按行顺序排列的DataFrame块（列相同）
+            output_path: 输出文件路径
+            add_timestamp: 是否在文件名中添加时间戳
+        
         Returns:
             实际输出的文件路径
         """
@@ -58,30 +113,11 @@ class DataExporter:
         # 确保输出目录存在
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # 格式化数据
-        df_formatted = self.template_manager.format_dataframe(df)
-        
-        # 准备输出内容
-        lines = []
-        
-        # 添加标题行
-        if self.template_manager.has_title_row:
-            column_names = self.template_manager.get_column_names(df_formatted)
-            lines.append(','.join(column_names))
-        
-        # 添加描述行
-        if self.template_manager.has_description_row:
-            column_descriptions = self.template_manager.get_column_descriptions(df_formatted)
-            lines.append(','.join(column_descriptions))
-        
-        # 添加数据行
-        for _, row in df_formatted.iterrows():
-            line = ','.join([str(val) for val in row.values])
-            lines.append(line)
-        
-        # 写入文件
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            f.write('\n'.join(lines))
+        # 写入文件（行之间以换行分隔，末行不带换行）
+        with open(output_file, 'w', encoding='utf-8', newline='',
+                  buffering=self.WRITE_BUFFER_SIZE) as f:
+            for text in self.iter_csv(chunks):
+                f.write(text)
         
         self.logger.info(f"数据已导出到: {output_file}")
         
@@ -105,28 +141,18 @@ class DataExporter:
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # 格式化数据
-        df_formatted = self.template_manager.format_dataframe(df)
-        
         # 打开文件准备写入
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            # 写入标题行
-            if self.template_manager.has_title_row:
-                column_names = self.template_manager.get_column_names(df_formatted)
-                f.write(','.join(column_names) + '\n')
-            
-            # 写入描述行
-            if self.template_manager.has_description_row:
-                column_descriptions = self.template_manager.get_column_descriptions(df_formatted)
-                f.write(','.join(column_descriptions) + '\n')
+        total_rows = len(df)
+        with open(output_file, 'w', encoding='utf-8', newline='',
+                  buffering=self.WRITE_BUFFER_SIZE) as f:
+            # 写入标题行和描述行
+            self._write_header(f, df)
             
             # 增量写入数据
-            total_rows = len(df_formatted)
             for i in range(0, total_rows, chunk_size):
-                chunk = df_formatted.iloc[i:i+chunk_size]
-                for _, row in chunk.iterrows():
-                    line = ','.join([str(val) for val in row.values])
-                    f.write(line + '\n')
+                block = self.format_rows(df.iloc[i:i+chunk_size])
+                if block:
+                    f.write(block + '\n')
                 
                 # 记录进度
                 if (i + chunk_size) % (chunk_size * 10) == 0:
@@ -135,4 +161,126 @@ class DataExporter:
         self.logger.info(f"数据已增量导出到: {output_file}")
         
         return str(output_file)
-
+    
+    def iter_csv(self, chunks: Iterable[pd.DataFrame]) -> Iterator[str]:
+        """
+        逐块生成CSV文本（用于流式输出）
+        
+        所有文本依次拼接后与export_chunks写入的文件内容相同。
+        
+        Args:
+            chunks: 按行顺序排列的DataFrame块（列相同）
+        
+        Yields:
+            CSV文本片段（表头行或一块数据行）
+        """
+        separator = ''
+        for block in self._iter_blocks(chunks):
+            yield separator + block
+            separator = '\n'
+    
+    def _write_header(self, f: TextIO, df: pd.DataFrame) -> None:
+        """
+        写入标题行和描述行（每行以换行结尾）
+        
+        Args:
+            f: 文件对象
+            df: 要导出的DataFrame
+        """
+        for line in self.get_header_lines(df):
+            f.write(line + '\n')
+    
+    def get_header_lines(self, df: pd.DataFrame) -> List[str]:
+        """
+        获取标题行和描述行
+        
+        Args:
+            df: 要导出的DataFrame
+        
+        Returns:
+            按模板配置生成的表头行列表（不含换行符）
+        """
+        lines = []
+        
+        # 添加标题行
+        if self.template_manager.has_title_row:
+            column_names = self.template_manager.get_column_names(df)
+            lines.append(','.join(column_names))
+        
+        # 添加描述行
+        if self.template_manager.has_description_row:
+            column_descriptions = self.template_manager.get_column_descriptions(df)
+            lines.append(','.join(column_descriptions))
+        
+        return lines
+    
+    def format_rows(self, df: pd.DataFrame) -> str:
+        """
+        将数据块格式化为CSV文本（行之间以换行分隔，末行不带换行）
+        
+        时间戳按模板配置格式化，其余列整列转换为字符串，
+        未配置float_format时与逐个单元格str()的结果相同。
+        
+        Args:
+            df: 数据块
+        
+        Returns:
+            CSV文本
+        """
+        df_formatted = self.template_manager.format_dataframe(df)
+        columns = [self._format_column(df_formatted[col].to_numpy()) for col in df_formatted.columns]
+        return '\n'.join(map(','.join, zip(*columns)))
+    
+    def _format_column(self, values: np.ndarray) -> List[str]:
+        """
+        将一列数据转换为字符串列表
+        
+        Args:
+            values: 列数据
+        
+        Returns:
+            字符串列表
+        """
+        float_format = self.template_manager.float_format
+        if values.dtype.kind == 'f':
+            if float_format is not None:
+                return [float_format % value for value in values.tolist()]
+            if values.dtype == np.float64:
+                # Python float的str()与np.float64一致
+                return list(map(str, values.tolist()))
+            return values.astype(str).tolist()
+        if values.dtype.kind in 'iub':
+            return list(map(str, values.tolist()))
+        return [str(value) for value in values]
+    
+    def _split_chunks(self, df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        按行切分DataFrame（空DataFrame也返回一个空块，用于生成表头）
+        
+        Args:
+            df: 要切分的DataFrame
+            chunk_size: 每块行数
+        
+        Yields:
+            DataFrame块（视图）
+        """
+        for i in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[i:i+chunk_size]
+    
+    def _iter_blocks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[str]:
+        """
+        按块生成CSV文本（表头为一块，每个非空数据块为一块）
+        
+        Args:
+            chunks: DataFrame块
+        
+        Yields:
+            不含首尾换行的CSV文本块
+        """
+        first = True
+        for chunk in chunks:
+            if first:
+                yield from self.get_header_lines(chunk)
+                first = False
+            if len(chunk) > 0:
+                yield self.format_rows(chunk)
@@ -3,20 +3,25 @@
 """
 
 import requests
-import json
+import zipfile
+from datetime import datetime
 from pathlib import Path
 
 API_BASE = 'http://localhost:8000'
 
-def batch_generate_via_api(config_ids=None):
+def batch_generate_via_api(config_ids=None, group_id=None):
     """
     通过API批量生成数据
     
+    所有配置在一个批量导出请求中并行生成，结果保存为一个ZIP文件
+    （每个配置包含历史数据和完整数据两个CSV文件）。
+    
     Args:
         config_ids: 配置ID列表（如果为None，则使用所有配置）
+        group_id: 分组ID（可选，提供时导出分组内的所有配置）
     """
     # 获取配置列表
-    if config_ids is None:
+    if config_ids is None and group_id is None:
         try:
             response = requests.get(f'{API_BASE}/api/configs/')
             if response.status_code == 200:
@@ -30,36 +35,31 @@ def batch_generate_via_api(config_ids=None):
             print(f"请确保后端服务已启动：python webserver/app.py")
             return
     
-    # 批量生成
-    for config_id in config_ids:
-        print(f"生成配置 {config_id} 的数据...")
+    # 批量生成并导出
+    body = {'group_id': group_id} if group_id is not None else {'config_ids': config_ids}
+    print(f"批量导出 {len(config_ids) if config_ids else '分组内'} 个配置的数据...")
+    
+    try:
+        response = requests.post(f'{API_BASE}/api/export/batch', json=body, stream=True)
+        if response.status_code != 200:
+            print(f"  失败：{response.status_code} - {response.text}")
+            return
         
-        try:
-            # 生成数据
-            response = requests.post(f'{API_BASE}/api/generate/', json={
-                'config_id': config_id
-            })
-            
-            if response.status_code == 200:
-                result = response.json()
-                full_data = result.get('data', {}).get('full', [])
-                print(f"  成功：共 {len(full_data)} 行数据")
-            else:
-                print(f"  失败：{response.status_code} - {response.text}")
-                continue
-            
-            # 导出数据
-            response = requests.get(f'{API_BASE}/api/export/{config_id}?type=full')
-            if response.status_code == 200:
-                output_file = f'output/config_{config_id}_full.csv'
-                Path('output').mkdir(parents=True, exist_ok=True)
-                with open(output_file, 'wb') as f:
-                    f.write(response.content)
-                print(f"  数据已导出：{output_file}")
-            
-        except Exception as e:
-            print(f"  处理失败：{e}")
-            continue
+        output_file = f"output/batch_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        Path('output').mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'wb') as f:
+            for block in response.iter_content(chunk_size=1024 * 1024):
+                f.write(block)
+        print(f"  数据已导出：{output_file}")
+        
+        # 生成失败的配置在ZIP中是.error.txt文件
+        with zipfile.ZipFile(output_file) as archive:
+            for name in archive.namelist():
+                if name.endswith('.error.txt'):
+                    print(f"  {name[:-len('.error.txt')]} 失败：{archive.read(name).decode('utf-8')}")
+    except Exception as e:
+        print(f"  处理失败：{e}")
+        return
     
     print("批量生成完成")
 
@@ -69,4 +69,7 @@ if __name__ == '__main__':
     
     # 或指定配置ID
     # batch_generate_via_api([1, 2, 3])
+    
+    # 或指定分组
+    # batch_generate_via_api(group_id=1)
 
@@ -4,8 +4,6 @@
 
 import yaml
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import sys
 from datetime import datetime
 
@@ -13,7 +11,7 @@ from datetime import datetime
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from webserver.models import Config
+from webserver.models import SessionLocal, init_db, Config
 
 def import_configs(config_dir='config', group_id=None):
     """
@@ -23,15 +21,20 @@ def import_configs(config_dir='config', group_id=None):
         config_dir: 配置文件目录
         group_id: 分组ID（可选）
     """
-    # 连接数据库
-    engine = create_engine('sqlite:///webserver/database.db')
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    # 连接数据库（与Web服务使用同一个数据库和连接参数）
+    init_db()
+    session = SessionLocal()
     
     try:
         config_path = Path(config_dir)
         yaml_files = list(config_path.glob('*.yaml')) + list(config_path.glob('*.yml'))
         
+        # 已存在的配置名称一次查出
+        config_names = [yaml_file.stem for yaml_file in yaml_files]
+        existing_names = {
+            row.name for row in session.query(Config.name).filter(Config.name.in_(config_names))
+        }
+        
         for yaml_file in yaml_files:
             # 读取YAML文件
             with open(yaml_file, 'r', encoding='utf-8') as f:
@@ -41,10 +44,10 @@ def import_configs(config_dir='config', group_id=None):
             config_name = yaml_file.stem
             
             # 检查是否已存在
-            existing = session.query(Config).filter(Config.name == config_name).first()
-            if existing:
+            if config_name in existing_names:
                 print(f"配置 {config_name} 已存在，跳过")
                 continue
+            existing_names.add(config_name)
             
             # 创建配置
             config = Config(
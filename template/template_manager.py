@@ -4,8 +4,10 @@
 管理CSV输出模板的配置，支持不同的时间格式、标题行配置等。
 """
 
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, List
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 
@@ -24,6 +26,14 @@ class TemplateManager:
     TIME_FORMAT_DATETIME = 'datetime'    # 2024-1-1 00:00:00
     TIME_FORMAT_DATETIME_SLASH = 'datetime_slash'  # 2024/1/1 00:00:05
     
+    # 各时间格式的日期分隔符
+    DATE_SEPARATORS = {
+        TIME_FORMAT_DATETIME: '-',
+        TIME_FORMAT_DATETIME_SLASH: '/',
+    }
+    
+    SECONDS_PER_DAY = 86400
+    
     def __init__(self, config: Dict[str, Any]):
         """
         初始化模板管理器
@@ -35,6 +45,7 @@ class TemplateManager:
                 - has_description_row: 是否有描述行（第二行变量描述）
                 - hide_parameter_descriptions: 是否隐藏参数描述（True使用"未知工况N"，False使用配置的描述）
                 - column_descriptions: 列描述字典（可选）
+                - float_format: 浮点数格式（可选，如'%.6f'，默认与str()输出一致）
         """
         self.config = config
         self.time_format = config.get('time_format', self.TIME_FORMAT_DATETIME)
@@ -42,6 +53,7 @@ class TemplateManager:
         self.has_description_row = config.get('has_description_row', True)
         self.hide_parameter_descriptions = config.get('hide_parameter_descriptions', True)  # 默认隐藏
         self.column_descriptions = config.get('column_descriptions', {})
+        self.float_format = config.get('float_format')
     
     def format_timestamp(self, timestamp: float) -> str:
         """
@@ -64,6 +76,82 @@ class TemplateManager:
         else:
             raise ValueError(f"不支持的时间格式: {self.time_format}")
     
+    def format_timestamps(self, timestamps: np.ndarray) -> List[str]:
+        """
+        批量格式化时间戳
+        
+        结果与逐个调用format_timestamp相同（按本地时区显示）。
+        每个不同的日期前缀和时分秒只渲染一次，再按索引拼接。
+        
+        Args:
+            timestamps: Unix时间戳数组
+        
+        Returns:
+            格式化后的时间字符串列表
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        
+        if self.time_format == self.TIME_FORMAT_TIMESTAMP:
+            return list(map(str, timestamps.astype(np.int64).tolist()))
+        if self.time_format not in self.DATE_SEPARATORS:
+            raise ValueError(f"不支持的时间格式: {self.time_format}")
+        if len(timestamps) == 0:
+            return []
+        
+        # 与datetime.fromtimestamp一致：先舍入到微秒，strftime再截断到秒
+        seconds = np.floor_divide(np.round(timestamps * 1e6).astype(np.int64), 1000000)
+        local_seconds = seconds + self._get_utc_offsets(seconds)
+        
+        days = np.floor_divide(local_seconds, self.SECONDS_PER_DAY)
+        seconds_of_day = local_seconds - days * self.SECONDS_PER_DAY
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        unique_seconds, second_index = np.unique(seconds_of_day, return_inverse=True)
+        
+        separator = self.DATE_SEPARATORS[self.time_format]
+        date_prefixes = np.array(
+            [str(day).replace('-', separator) + ' ' for day in unique_days.astype('datetime64[D]')],
+            dtype=object
+        )
+        times_of_day = np.array(
+            ['%02d:%02d:%02d' % (sec // 3600, sec // 60 % 60, sec % 60) for sec in unique_seconds.tolist()],
+            dtype=object
+        )
+        
+        return (date_prefixes[day_index] + times_of_day[second_index]).tolist()
+    
+    def _get_utc_offsets(self, seconds: np.ndarray) -> np.ndarray:
+        """
+        获取每个时间戳对应的本地时区UTC偏移（秒）
+        
+        按UTC日分组：一天首尾偏移相同时整天使用同一偏移，
+        否则（夏令时切换日）逐点查询。
+        
+        Args:
+            seconds: 整数秒时间戳数组
+        
+        Returns:
+            UTC偏移数组
+        """
+        days = np.floor_divide(seconds, self.SECONDS_PER_DAY)
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        
+        offsets = np.empty(len(unique_days), dtype=np.int64)
+        varying_days = []
+        for i, day in enumerate(unique_days.tolist()):
+            day_start = day * self.SECONDS_PER_DAY
+            start_offset = time.localtime(day_start).tm_gmtoff
+            end_offset = time.localtime(day_start + self.SECONDS_PER_DAY - 1).tm_gmtoff
+            offsets[i] = start_offset
+            if start_offset != end_offset:
+                varying_days.append(i)
+        
+        result = offsets[day_index]
+        for i in varying_days:
+            positions = np.flatnonzero(day_index == i)
+            result[positions] = [time.localtime(sec).tm_gmtoff for sec in seconds[positions].tolist()]
+        
+        return result
+    
     def get_column_names(self, df: pd.DataFrame) -> list:
         """
         获取列名列表（用于标题行）
@@ -131,7 +219,7 @@ class TemplateManager:
         
         # 格式化时间戳列
         if 'timeStamp' in df_formatted.columns:
-            df_formatted['timeStamp'] = df_formatted['timeStamp'].apply(self.format_timestamp)
+            df_formatted['timeStamp'] = self.format_timestamps(df_formatted['timeStamp'].to_numpy())
         
         return df_formatted
 
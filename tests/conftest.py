@@ -0,0 +1,12 @@
+"""
+测试公共配置
+
+把项目根目录加入模块搜索路径，直接运行pytest时也可以导入core、utils等包。
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
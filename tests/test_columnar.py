@@ -0,0 +1,118 @@
+"""
+列式二进制传输格式测试
+"""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from webserver import columnar
+
+
+def make_columns(rows: int) -> dict:
+    """生成测试列（列名顺序故意不按字母排列）"""
+    rng = np.random.default_rng(0)
+    return {
+        'timeStamp': 1704067200.0 + np.arange(rows) * 5.0,
+        'F.zeta': rng.normal(size=rows),
+        'F.alpha': np.linspace(-1, 1, rows),
+        'F.mid': np.where(np.arange(rows) % 3 == 0, np.nan, 1.5),
+    }
+
+
+def read_header(payload: bytes) -> dict:
+    """读取头部JSON"""
+    _, _, header_length = columnar.PREFIX.unpack_from(payload)
+    return json.loads(payload[columnar.PREFIX.size:columnar.PREFIX.size + header_length])
+
+
+@pytest.mark.parametrize('rows', [0, 1, 3, 1001])
+@pytest.mark.parametrize('precision', ['float64', 'float32'])
+def test_round_trip(rows, precision):
+    """编码后解码得到相同的列顺序、数据类型和数值"""
+    columns = make_columns(rows)
+    metadata = {'total_rows': rows, 'name': '测试'}
+    
+    payload = columnar.encode_columns(columns, metadata, precision=precision)
+    decoded, decoded_metadata = columnar.decode_columns(payload)
+    
+    assert list(decoded) == list(columns)
+    assert decoded_metadata == metadata
+    # timeStamp列始终为float64，其他列为指定精度，均为小端
+    assert decoded['timeStamp'].dtype == np.dtype('<f8')
+    for name, values in columns.items():
+        expected_dtype = columnar.DTYPES['float64'] if name == 'timeStamp' else columnar.DTYPES[precision]
+        assert decoded[name].dtype == expected_dtype
+        np.testing.assert_array_equal(decoded[name], values.astype(expected_dtype))
+
+
+@pytest.mark.parametrize('precision', ['float64', 'float32'])
+def test_alignment(precision):
+    """头部补齐后数据区和每列起始位置都是8字节对齐"""
+    payload = columnar.encode_columns(make_columns(3), precision=precision)
+    header = read_header(payload)
+    _, _, header_length = columnar.PREFIX.unpack_from(payload)
+    data_start = columnar.PREFIX.size + header_length
+    data_start += -data_start % columnar.ALIGNMENT
+    
+    assert data_start % columnar.ALIGNMENT == 0
+    for info in header['columns']:
+        assert info['offset'] % columnar.ALIGNMENT == 0
+    # 奇数行float32列需要补齐
+    last = header['columns'][-1]
+    assert len(payload) == data_start + last['offset'] + last['nbytes'] + (-last['nbytes'] % columnar.ALIGNMENT)
+    
+    decoded, _ = columnar.decode_columns(payload)
+    base = np.frombuffer(payload, dtype=np.uint8).ctypes.data
+    for values in decoded.values():
+        assert (values.ctypes.data - base) % columnar.ALIGNMENT == 0
+
+
+def test_decoded_columns_are_views():
+    """解码结果直接引用payload，不复制数据"""
+    payload = columnar.encode_columns(make_columns(10))
+    decoded, _ = columnar.decode_columns(payload)
+    assert not decoded['F.alpha'].flags.writeable
+    assert decoded['F.alpha'].base is not None
+
+
+def test_version_field():
+    """格式版本写在魔数之后的固定位置"""
+    payload = columnar.encode_columns(make_columns(2))
+    magic, version, _ = columnar.PREFIX.unpack_from(payload)
+    assert magic == columnar.MAGIC
+    assert version == columnar.FORMAT_VERSION
+
+
+def test_unsupported_version_rejected():
+    """格式版本不一致时解码报错"""
+    payload = bytearray(columnar.encode_columns(make_columns(2)))
+    struct.pack_into('<I', payload, 4, columnar.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match='格式版本'):
+        columnar.decode_columns(bytes(payload))
+
+
+@pytest.mark.parametrize('payload', [b'', b'DFC', b'JSON' + bytes(16)])
+def test_invalid_magic_rejected(payload):
+    """不是列式二进制格式的数据"""
+    with pytest.raises(ValueError, match='不是列式二进制格式'):
+        columnar.decode_columns(payload)
+
+
+def test_truncated_payload_rejected():
+    """数据不完整时解码报错"""
+    payload = columnar.encode_columns(make_columns(100))
+    with pytest.raises(ValueError, match='不完整'):
+        columnar.decode_columns(payload[:-8])
+    with pytest.raises(ValueError, match='不完整'):
+        columnar.decode_columns(payload[:columnar.PREFIX.size + 4])
+
+
+def test_encode_errors():
+    """不支持的精度或列长度不一致时编码报错"""
+    with pytest.raises(ValueError, match='精度'):
+        columnar.encode_columns(make_columns(2), precision='float16')
+    with pytest.raises(ValueError, match='长度'):
+        columnar.encode_columns({'timeStamp': np.zeros(3), 'F.a': np.zeros(2)})
@@ -0,0 +1,59 @@
+"""
+数据生成器测试
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from core.generators import data_generator
+from core.generators.data_generator import DataGenerator
+from utils.yaml_loader import load_yaml
+
+INPUT_DIR = Path(__file__).resolve().parent.parent / 'input'
+
+
+def load_generator(file_name: str, **overrides) -> DataGenerator:
+    """加载input目录中的配置，用overrides覆盖generator配置"""
+    with open(INPUT_DIR / file_name, 'r', encoding='utf-8') as f:
+        config = load_yaml(f)
+    return DataGenerator(dict(config.get('generator', {}), **overrides))
+
+
+def test_columns_follow_config_order():
+    """输出列按模板在配置中的顺序排列，不随拓扑排序的生成顺序变化"""
+    generator = load_generator('test_case_08_complex.yaml',
+                               history_points=100, future_points=10, seed=1)
+    expected = ['timeStamp', 'F.light', 'F.power', 'F.temperature', 'F.humidity', 'F.composite']
+    
+    # 生成顺序中humidity在temperature之前，输出列顺序不受影响
+    assert generator._resolve_dependencies() != list(generator.templates)
+    assert list(generator.generate().columns) == expected
+    for chunk in generator.copy().generate_chunks(chunk_size=30):
+        assert list(chunk.columns) == expected
+
+
+def test_history_and_future_slices():
+    """历史和未来数据是generate结果的切片，修改切片不影响缓存的结果"""
+    generator = load_generator('test_case_06_noise.yaml', history_points=100, future_points=10, seed=1)
+    full = generator.generate()
+    expected = full.copy()
+    
+    history = generator.get_history_data()
+    future = generator.get_future_data()
+    assert len(history) == 100 and len(future) == 10
+    assert history.equals(full.iloc[:100]) and future.equals(full.iloc[100:])
+    
+    history.loc[history.index[0], 'F.noisy'] = -1.0
+    future.loc[future.index[0], 'F.noisy'] = -1.0
+    assert generator.generate().equals(expected)
+
+
+def test_slices_are_copies_without_copy_on_write(monkeypatch):
+    """未启用写时复制时（pandas 2.x）返回副本，不与缓存的结果共享内存"""
+    monkeypatch.setattr(data_generator, '_copy_on_write_enabled', lambda: False)
+    generator = load_generator('test_case_06_noise.yaml', history_points=100, future_points=10, seed=1)
+    full = generator.generate()
+    
+    history = generator.get_history_data()
+    assert not np.shares_memory(history['F.noisy'].to_numpy(), full['F.noisy'].to_numpy())
@@ -0,0 +1,155 @@
+"""
+ExpressionTemplate滞后测试
+
+覆盖小数点滞后插值、滞后表达式（时变滞后）、分块与一次性生成的一致性，
+以及时变滞后超过max_lag_seconds时的错误。
+"""
+
+import numpy as np
+import pytest
+
+from core.relationships import ExpressionTemplate
+
+TIME_INTERVAL = 5.0
+START_TIMESTAMP = 1704067200.0  # 2024-01-01 00:00:00 UTC
+
+
+def make_time_points(count: int) -> np.ndarray:
+    """生成等间隔时间点"""
+    return START_TIMESTAMP + np.arange(count) * TIME_INTERVAL
+
+
+def make_template(*sources, expression: str = 'x1') -> ExpressionTemplate:
+    """创建依赖生成模式的模板"""
+    return ExpressionTemplate({
+        'output_name': 'F.out',
+        'sources': list(sources),
+        'calculation': {'expression': expression},
+    })
+
+
+def generate_in_chunks(template: ExpressionTemplate, time_points: np.ndarray,
+                       other_data: dict, chunk_size: int) -> np.ndarray:
+    """按块生成并拼接结果"""
+    state = template.create_stream_state(np.random.default_rng(0))
+    chunks = []
+    for start in range(0, len(time_points), chunk_size):
+        stop = start + chunk_size
+        chunk_data = {name: values[start:stop] for name, values in other_data.items()}
+        chunks.append(template.generate_chunk(time_points[start:stop], chunk_data, state))
+    return np.concatenate(chunks)
+
+
+def expected_lag(source: np.ndarray, lag_points) -> np.ndarray:
+    """output[i] = source(i - lag_points[i])，线性插值，滞后位置小于0时取首值"""
+    index = np.arange(len(source), dtype=float)
+    return np.interp(np.clip(index - lag_points, 0.0, None), index, source)
+
+
+def test_fractional_lag_interpolates():
+    """滞后点数不是整数时在相邻两点之间线性插值"""
+    time_points = make_time_points(50)
+    source = np.arange(50, dtype=float) ** 2
+    template = make_template({'source_name': 'F.src', 'lag_seconds': 12.5})
+    
+    result = template.generate(time_points, {'F.src': source})
+    
+    np.testing.assert_allclose(result, expected_lag(source, 2.5))
+    # 线性数据上小数点滞后等于整体平移
+    ramp = np.arange(50, dtype=float)
+    np.testing.assert_allclose(template.generate(time_points, {'F.src': ramp}),
+                               np.maximum(ramp - 2.5, 0.0))
+
+
+def test_integer_lag_shifts():
+    """滞后时间是时间间隔的整数倍时整体平移，开头使用首值"""
+    time_points = make_time_points(20)
+    source = np.arange(20, dtype=float) + 1
+    template = make_template({'source_name': 'F.src', 'lag_seconds': 15})
+    
+    result = template.generate(time_points, {'F.src': source})
+    
+    assert np.array_equal(result[:3], [1.0, 1.0, 1.0])
+    assert np.array_equal(result[3:], source[:-3])
+
+
+def test_lag_seconds_expression():
+    """lag_seconds为表达式时逐点计算滞后，并按线性插值取值"""
+    time_points = make_time_points(200)
+    source = np.sin(np.arange(200) / 7.0)
+    lag_expression = '20 + 12.5 * sin(2 * pi * t / 600)'
+    template = make_template({'source_name': 'F.src', 'lag_seconds': lag_expression})
+    
+    result = template.generate(time_points, {'F.src': source})
+    
+    lag_seconds = 20 + 12.5 * np.sin(2 * np.pi * time_points / 600)
+    np.testing.assert_allclose(result, expected_lag(source, lag_seconds / TIME_INTERVAL))
+
+
+def test_lag_source():
+    """lag_source指定的数据作为逐点滞后时间"""
+    time_points = make_time_points(100)
+    source = np.cos(np.arange(100) / 5.0)
+    lag_seconds = np.linspace(0, 40, 100)
+    template = make_template({'source_name': 'F.src', 'lag_source': 'F.lag'})
+    
+    result = template.generate(time_points, {'F.src': source, 'F.lag': lag_seconds})
+    
+    np.testing.assert_allclose(result, expected_lag(source, lag_seconds / TIME_INTERVAL))
+
+
+@pytest.mark.parametrize('sources', [
+    [{'source_name': 'F.src', 'lag_seconds': 35}],
+    [{'source_name': 'F.src', 'lag_seconds': 17.5}],
+    [{'source_name': 'F.src', 'lag_seconds': '20 + 12.5 * sin(2 * pi * t / 600)', 'max_lag_seconds': 35}],
+    [{'source_name': 'F.src', 'lag_source': 'F.lag', 'max_lag_seconds': 40}],
+    [
+        {'source_name': 'F.src', 'lag_seconds': 7.5},
+        {'source_name': 'F.src', 'lag_seconds': 'x1 * 0 + 25', 'max_lag_seconds': 25},
+    ],
+], ids=['integer', 'fractional', 'expression', 'lag_source', 'shared_source'])
+@pytest.mark.parametrize('chunk_size', [2, 3, 8, 64])
+def test_chunked_matches_one_shot(sources, chunk_size):
+    """分块生成的结果（包括跨块边界的滞后）与一次性生成逐位相同"""
+    count = 300
+    time_points = make_time_points(count)
+    other_data = {
+        'F.src': np.sin(np.arange(count) / 9.0) * 100,
+        'F.lag': np.linspace(0, 40, count),
+    }
+    expression = 'x1 + x2' if len(sources) > 1 else 'x1'
+    template = make_template(*sources, expression=expression)
+    
+    one_shot = template.generate(time_points, other_data)
+    chunked = generate_in_chunks(template, time_points, other_data, chunk_size)
+    
+    assert one_shot.tobytes() == chunked.tobytes()
+
+
+def test_lag_exceeding_max_lag_seconds_raises():
+    """分块生成时，时变滞后超过max_lag_seconds保留的历史长度时报错"""
+    time_points = make_time_points(100)
+    other_data = {'F.src': np.arange(100, dtype=float)}
+    template = make_template({'source_name': 'F.src', 'lag_seconds': '30 + 0 * t', 'max_lag_seconds': 10})
+    
+    # 一次性生成不需要跨块历史
+    template.generate(time_points, other_data)
+    
+    with pytest.raises(ValueError, match='max_lag_seconds'):
+        generate_in_chunks(template, time_points, other_data, chunk_size=20)
+
+
+def test_lag_without_max_lag_seconds_raises():
+    """时变滞后未配置max_lag_seconds时无法跨块，分块生成报错"""
+    time_points = make_time_points(100)
+    other_data = {'F.src': np.arange(100, dtype=float)}
+    template = make_template({'source_name': 'F.src', 'lag_seconds': '10 + 0 * t'})
+    
+    with pytest.raises(ValueError, match='max_lag_seconds'):
+        generate_in_chunks(template, time_points, other_data, chunk_size=20)
+
+
+def test_negative_max_lag_seconds_rejected():
+    """max_lag_seconds必须是非负数"""
+    with pytest.raises(ValueError, match='max_lag_seconds'):
+        make_template({'source_name': 'F.src', 'lag_seconds': 'x1', 'max_lag_seconds': -1})
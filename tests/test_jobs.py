@@ -0,0 +1,111 @@
+"""
+后台生成任务测试
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import webserver.jobs as jobs
+from webserver.jobs import JobManager
+from webserver.models import Base, Job
+
+
+@pytest.fixture
+def job_env(tmp_path, monkeypatch):
+    """使用临时数据库和临时结果目录"""
+    engine = create_engine(f'sqlite:///{tmp_path / "jobs.db"}')
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    result_dir = tmp_path / 'results'
+    result_dir.mkdir()
+    monkeypatch.setattr(jobs, 'SessionLocal', session_factory)
+    monkeypatch.setattr(jobs, 'JOB_RESULT_DIR', result_dir)
+    yield session_factory, result_dir
+    engine.dispose()
+
+
+def add_job(session_factory, result_dir, status: str, finished_at=None) -> int:
+    """添加任务记录（已完成的任务同时创建结果文件）"""
+    db = session_factory()
+    try:
+        job = Job(name='test', config_yaml='generator: {}', status=status, finished_at=finished_at)
+        db.add(job)
+        db.commit()
+        if status == Job.STATUS_COMPLETED:
+            result_file = result_dir / f'job_{job.id}.csv'
+            result_file.write_text('timeStamp\n', encoding='utf-8')
+            job.result_path = str(result_file)
+            db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def job_ids(session_factory):
+    """剩余的任务ID"""
+    db = session_factory()
+    try:
+        return sorted(job_id for (job_id,) in db.query(Job.id))
+    finally:
+        db.close()
+
+
+def test_pool_size(monkeypatch):
+    """任务进程池默认使用一半CPU核数（至少1个进程），也可以指定进程数"""
+    monkeypatch.setattr(jobs.os, 'cpu_count', lambda: 8)
+    assert JobManager().pool.max_workers == 4
+    monkeypatch.setattr(jobs.os, 'cpu_count', lambda: 1)
+    assert JobManager().pool.max_workers == 1
+    assert JobManager(max_workers=3).pool.max_workers == 3
+    assert JobManager().pool.max_pending == JobManager.MAX_QUEUED_JOBS
+
+
+def test_cleanup_expired_jobs(job_env):
+    """超过保留时间的已结束任务被删除，未结束的任务保留"""
+    session_factory, result_dir = job_env
+    now = datetime.now()
+    old = now - timedelta(seconds=JobManager.RESULT_TTL_SECONDS + 60)
+    
+    expired_completed = add_job(session_factory, result_dir, Job.STATUS_COMPLETED, old)
+    expired_failed = add_job(session_factory, result_dir, Job.STATUS_FAILED, old)
+    recent = add_job(session_factory, result_dir, Job.STATUS_COMPLETED, now)
+    running = add_job(session_factory, result_dir, Job.STATUS_RUNNING)
+    
+    assert JobManager().cleanup() == 2
+    assert job_ids(session_factory) == [recent, running]
+    assert not (result_dir / f'job_{expired_completed}.csv').exists()
+    assert (result_dir / f'job_{recent}.csv').exists()
+    assert expired_failed not in job_ids(session_factory)
+
+
+def test_cleanup_keeps_latest_jobs(job_env, monkeypatch):
+    """已结束任务超过MAX_FINISHED_JOBS时只保留最近的任务"""
+    session_factory, result_dir = job_env
+    monkeypatch.setattr(JobManager, 'MAX_FINISHED_JOBS', 3)
+    ids = [add_job(session_factory, result_dir, Job.STATUS_COMPLETED, datetime.now()) for _ in range(5)]
+    running = add_job(session_factory, result_dir, Job.STATUS_PENDING)
+    
+    assert JobManager().cleanup() == 2
+    assert job_ids(session_factory) == ids[2:] + [running]
+    assert sorted(path.name for path in result_dir.iterdir()) == [f'job_{job_id}.csv' for job_id in ids[2:]]
+
+
+def test_cleanup_orphan_files(job_env):
+    """结果目录中不属于任何任务的过期文件被删除，新文件保留（可能是运行中任务正在写入的文件）"""
+    session_factory, result_dir = job_env
+    old_file = result_dir / 'job_999.csv'
+    old_file.write_text('timeStamp\n', encoding='utf-8')
+    old_timestamp = time.time() - JobManager.RESULT_TTL_SECONDS - 60
+    os.utime(old_file, (old_timestamp, old_timestamp))
+    new_file = result_dir / 'job_1000.csv'
+    new_file.write_text('timeStamp\n', encoding='utf-8')
+    
+    JobManager().cleanup()
+    
+    assert not old_file.exists()
+    assert new_file.exists()
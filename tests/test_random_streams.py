@@ -0,0 +1,121 @@
+"""
+随机数流测试
+
+指定种子后，每个模板的随机数只由种子和模板名称决定：
+与模板在配置中的顺序、串行/并行生成和分块方式都无关，结果逐位相同。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.generators.data_generator import DataGenerator
+from core.relationships import RandomStreams
+
+TEMPLATES = [
+    {
+        'type': 'ExpressionTemplate',
+        'name': 'walk',
+        'config': {
+            'output_name': 'F.walk',
+            'calculation': {'expression': '50 + 10 * random() + random_normal(0, 2)'},
+            'noise_level': 0.05,
+        },
+    },
+    {
+        'type': 'ExpressionTemplate',
+        'name': 'noisy',
+        'config': {
+            'output_name': 'F.noisy',
+            'calculation': {'expression': '100 * sin(2 * pi * t / 3600.0)'},
+            'noise_level': 0.1,
+        },
+    },
+    {
+        'type': 'ExpressionTemplate',
+        'name': 'mixed',
+        'config': {
+            'output_name': 'F.mixed',
+            'sources': [
+                {'source_name': 'F.walk', 'lag_seconds': 30},
+                {'source_name': 'F.noisy', 'lag_seconds': 12.5},
+            ],
+            'calculation': {'expression': 'x1 + x2 + random()'},
+            'noise_level': 0.02,
+        },
+    },
+]
+
+
+def create_generator(templates, **overrides) -> DataGenerator:
+    """创建带种子的数据生成器"""
+    config = {
+        'time_interval': 5.0,
+        'history_points': 500,
+        'future_points': 20,
+        'start_time': '2024-01-01 00:00:00',
+        'seed': 42,
+        'templates': templates,
+    }
+    config.update(overrides)
+    return DataGenerator(config)
+
+
+def assert_bit_identical(left: pd.DataFrame, right: pd.DataFrame):
+    """按列名比较两个DataFrame，要求逐位相同"""
+    assert sorted(left.columns) == sorted(right.columns)
+    for col in left.columns:
+        assert left[col].to_numpy().tobytes() == right[col].to_numpy().tobytes(), col
+
+
+@pytest.fixture(scope='module')
+def reference() -> pd.DataFrame:
+    """串行整段生成的结果"""
+    return create_generator(TEMPLATES).generate(max_workers=1)
+
+
+def test_independent_of_template_order(reference):
+    """调换模板在配置中的顺序不改变各列的随机数"""
+    df = create_generator(list(reversed(TEMPLATES))).generate(max_workers=1)
+    assert_bit_identical(reference, df)
+
+
+def test_independent_of_parallel_generation(reference):
+    """并行生成与串行生成结果相同"""
+    df = create_generator(TEMPLATES).generate(max_workers=4)
+    assert_bit_identical(reference, df)
+
+
+@pytest.mark.parametrize('chunk_size', [2, 7, 128, 10000])
+def test_independent_of_chunking(reference, chunk_size):
+    """分块生成（串行和并行）与整段生成结果相同"""
+    for max_workers in (1, 4):
+        generator = create_generator(list(reversed(TEMPLATES)))
+        chunks = generator.generate_chunks(chunk_size=chunk_size, max_workers=max_workers)
+        df = pd.concat(list(chunks), ignore_index=True)
+        assert_bit_identical(reference, df)
+
+
+def test_different_seeds_differ(reference):
+    """不同种子得到不同的随机数"""
+    df = create_generator(TEMPLATES, seed=43).generate()
+    assert not np.array_equal(reference['F.walk'], df['F.walk'])
+
+
+def test_stream_independent_of_request_order():
+    """同名流的随机数与首次请求的先后顺序无关"""
+    first = RandomStreams(7)
+    a1 = first.get('a').random(5)
+    b1 = first.get('b').random(5)
+    
+    second = RandomStreams(7)
+    b2 = second.get('b').random(5)
+    a2 = second.get('a').random(5)
+    
+    assert np.array_equal(a1, a2)
+    assert np.array_equal(b1, b2)
+    assert not np.array_equal(a1, b1)
+    
+    # 带前缀的子视图与完整名称等价
+    assert np.array_equal(RandomStreams(7).scope('x.').get('a').random(5),
+                          RandomStreams(7).get('x.a').random(5))
@@ -0,0 +1,239 @@
+"""
+后台计算进程池和子进程生成函数测试
+"""
+
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+import yaml
+from sanic.exceptions import ServiceUnavailable
+
+import webserver.workers as workers
+from output.data_exporter import DataExporter
+from template.template_manager import TemplateManager
+from webserver.config_cache import ParsedConfig
+from webserver.result_cache import ResultCache
+from webserver.workers import WorkerPool, generate_result, get_generation_result
+
+TIMEOUT_SECONDS = 60
+
+
+@pytest.fixture
+def pool():
+    """单进程的进程池，测试结束后关闭"""
+    worker_pool = WorkerPool(max_workers=1, max_pending=2)
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+def wait_for(condition, timeout: float = TIMEOUT_SECONDS):
+    """等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.05)
+
+
+def test_submit_after_worker_crash(pool):
+    """任务执行中子进程退出时任务失败，之后的任务在重建的进程池中执行"""
+    assert pool.submit(pow, 2, 3).result(TIMEOUT_SECONDS) == 8
+    broken_executor = pool._executor
+    
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(TIMEOUT_SECONDS)
+    
+    assert pool.submit(pow, 3, 2).result(TIMEOUT_SECONDS) == 9
+    assert pool._executor is not broken_executor
+    wait_for(lambda: pool.pending == 0)
+
+
+def test_submit_after_idle_worker_killed(pool):
+    """空闲的子进程被杀死后，下一次提交重建进程池并成功执行"""
+    worker_pid = pool.submit(os.getpid).result(TIMEOUT_SECONDS)
+    broken_executor = pool._executor
+    
+    os.kill(worker_pid, signal.SIGKILL)
+    wait_for(lambda: broken_executor._broken)
+    
+    assert pool.submit(pow, 2, 10).result(TIMEOUT_SECONDS) == 1024
+    assert pool._executor is not broken_executor
+    wait_for(lambda: pool.pending == 0)
+
+
+def test_max_pending(pool):
+    """任务数达到上限时返回503并建议重试间隔"""
+    futures = [pool.submit(time.sleep, 0.5) for _ in range(pool.max_pending)]
+    
+    with pytest.raises(ServiceUnavailable) as exc_info:
+        pool.submit(time.sleep, 0)
+    assert exc_info.value.headers['Retry-After'] == str(WorkerPool.RETRY_AFTER_SECONDS)
+    
+    for future in futures:
+        future.result(TIMEOUT_SECONDS)
+    wait_for(lambda: pool.pending == 0)
+    assert pool.submit(pow, 2, 2).result(TIMEOUT_SECONDS) == 4
+
+
+GENERATOR_CONFIG = {
+    'history_points': 50,
+    'future_points': 5,
+    'seed': 1,
+    'templates': [{
+        'type': 'ExpressionTemplate',
+        'name': 'noisy',
+        'config': {
+            'output_name': 'F.noisy',
+            'calculation': {'expression': '10 + random()'},
+            'noise_level': 0.1,
+        },
+    }],
+}
+
+
+@pytest.fixture
+def counted_generators(monkeypatch):
+    """清空子进程生成器缓存，并统计DataGenerator的创建次数"""
+    created = []
+    
+    class CountingGenerator(workers.DataGenerator):
+        def __init__(self, config):
+            created.append(config)
+            super().__init__(config)
+    
+    monkeypatch.setattr(workers, 'DataGenerator', CountingGenerator)
+    monkeypatch.setattr(workers, '_generators', workers.OrderedDict())
+    return created
+
+
+def test_generate_result_reuses_generator(counted_generators):
+    """相同配置重复生成时复用已加载的生成器，结果相同"""
+    key = ResultCache.make_key(GENERATOR_CONFIG)
+    first = generate_result(key, GENERATOR_CONFIG)
+    second = generate_result(key, GENERATOR_CONFIG)
+    
+    assert len(counted_generators) == 1
+    assert first.history_points == second.history_points == 50
+    assert list(first.columns) == ['timeStamp', 'F.noisy']
+    for col in first.columns:
+        assert first.columns[col].tobytes() == second.columns[col].tobytes()
+
+
+def test_generator_cache_is_bounded(counted_generators, monkeypatch):
+    """生成器缓存超过上限时淘汰最久未使用的生成器"""
+    monkeypatch.setattr(workers, 'GENERATOR_CACHE_SIZE', 2)
+    configs = [dict(GENERATOR_CONFIG, seed=seed) for seed in range(3)]
+    keys = [ResultCache.make_key(config) for config in configs]
+    
+    generate_result(keys[0], configs[0])
+    generate_result(keys[1], configs[1])
+    generate_result(keys[0], configs[0])
+    generate_result(keys[2], configs[2])
+    
+    assert list(workers._generators) == [keys[0], keys[2]]
+    assert len(counted_generators) == 3
+
+
+class InlinePool:
+    """在当前进程中直接执行的进程池替身"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def run(self, func, *args):
+        self.calls += 1
+        return func(*args)
+
+
+@pytest.fixture
+def inline_generation(tmp_path, monkeypatch):
+    """使用当前进程执行生成，结果缓存写入临时目录"""
+    pool = InlinePool()
+    cache = ResultCache(cache_dir=tmp_path / 'cache')
+    monkeypatch.setattr(workers, 'worker_pool', pool)
+    monkeypatch.setattr(workers, 'result_cache', cache)
+    monkeypatch.setattr(workers, '_generators', workers.OrderedDict())
+    return pool, cache
+
+
+def parsed_config(generator_config) -> ParsedConfig:
+    """由生成器配置创建解析后的配置"""
+    return ParsedConfig(yaml.safe_dump({'generator': generator_config}))
+
+
+def test_seeded_result_is_cached(inline_generation):
+    """指定seed的配置只生成一次，之后从缓存返回"""
+    pool, cache = inline_generation
+    parsed = parsed_config(GENERATOR_CONFIG)
+    
+    first = asyncio.run(get_generation_result(parsed))
+    second = asyncio.run(get_generation_result(parsed))
+    
+    assert pool.calls == 1
+    assert second is first
+    assert cache.get(parsed.result_key) is not None
+
+
+def test_unseeded_result_is_not_cached(inline_generation):
+    """未指定seed的配置不写入缓存（包括磁盘层），每次请求都重新生成"""
+    pool, cache = inline_generation
+    config = {key: value for key, value in GENERATOR_CONFIG.items() if key != 'seed'}
+    parsed = parsed_config(config)
+    
+    first = asyncio.run(get_generation_result(parsed, config_id=1))
+    second = asyncio.run(get_generation_result(parsed, config_id=1))
+    
+    assert pool.calls == 2
+    assert not np.array_equal(first.columns['F.noisy'], second.columns['F.noisy'])
+    assert cache.get(parsed.result_key) is None
+    assert not (cache.cache_dir / parsed.result_key).exists()
+
+
+async def collect(stream) -> bytes:
+    """读取异步字节流的全部内容"""
+    return b''.join([block async for block in stream])
+
+
+@pytest.mark.parametrize('export_type', ['full', 'history'])
+def test_iter_generated_csv(pool, monkeypatch, export_type):
+    """进程池中流式生成的CSV与一次性生成后导出的内容相同"""
+    monkeypatch.setattr(workers, 'worker_pool', pool)
+    config = dict(GENERATOR_CONFIG, history_points=25000)
+    parsed = parsed_config(config)
+    
+    data = asyncio.run(collect(workers.iter_generated_csv(parsed, export_type)))
+    
+    generator = parsed.create_generator()
+    df = generator.get_history_data() if export_type == 'history' else generator.generate()
+    expected = ''.join(DataExporter(TemplateManager(parsed.template_config)).iter_csv([df]))
+    assert data == expected.encode('utf-8')
+    wait_for(lambda: pool.pending == 0)
+
+
+def test_iter_generated_csv_error(pool, monkeypatch):
+    """子进程中的生成错误在服务进程中原样抛出"""
+    monkeypatch.setattr(workers, 'worker_pool', pool)
+    parsed = parsed_config({'templates': [{'type': 'Nope', 'config': {}}]})
+    
+    with pytest.raises(ValueError, match='Nope'):
+        asyncio.run(collect(workers.iter_generated_csv(parsed, 'full')))
+    wait_for(lambda: pool.pending == 0)
+
+
+def test_iter_generated_csv_stops_when_closed(pool, monkeypatch):
+    """读取方提前关闭时子进程停止生成，释放进程池名额"""
+    monkeypatch.setattr(workers, 'worker_pool', pool)
+    parsed = parsed_config(dict(GENERATOR_CONFIG, history_points=5000000))
+    
+    async def read_first_block():
+        stream = workers.iter_generated_csv(parsed, 'full')
+        block = await anext(stream)
+        await stream.aclose()
+        return block
+    
+    assert asyncio.run(read_first_block())
+    wait_for(lambda: pool.pending == 0, timeout=20)
@@ -3,6 +3,10 @@
 """
 
 from utils.logger import Logger, get_logger
+from utils.downsampling import MinMaxPyramid, minmax_downsample, window_slice
+from utils.yaml_loader import load_yaml
+from utils.statistics import ColumnStats, compute_column_stats, compute_stats, stats_to_dict
 
-__all__ = ['Logger', 'get_logger']
+__all__ = ['Logger', 'get_logger', 'MinMaxPyramid', 'minmax_downsample', 'window_slice', 'load_yaml',
+           'ColumnStats', 'compute_column_stats', 'compute_stats', 'stats_to_dict']
 
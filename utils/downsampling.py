@@ -0,0 +1,186 @@
+"""
+降采样模块
+
+提供保持波形形状的降采样，用于图表显示大数据量的曲线。
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def minmax_downsample(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按桶取最小值和最大值降采样（所有列一次计算）
+    
+    把数据按行均匀分成max_points // 2个桶，每个桶输出两个点：
+    横坐标为桶内第一个和最后一个点的横坐标，
+    纵坐标为每列桶内的最小值和最大值（按出现的先后顺序排列）。
+    这样所有列共享同一个横坐标数组，且每列的峰值和谷值都会保留。
+    NaN在比较时被忽略，桶内全为NaN时输出NaN。
+    
+    Args:
+        x: 横坐标数组，形状(n,)
+        y: 数据数组，形状(n,)或(n, k)
+        max_points: 最大输出点数（至少为2）
+    
+    Returns:
+        (降采样后的横坐标, 降采样后的数据)，点数不超过max_points；
+        原始点数不超过max_points时原样返回
+    """
+    if max_points < 2:
+        raise ValueError("max_points必须大于等于2")
+    
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    
+    squeeze = y.ndim == 1
+    values = y.reshape(n, -1)
+    n_columns = values.shape[1]
+    
+    # 均匀分桶，末尾不足一个桶的部分用NaN填充
+    n_buckets = max_points // 2
+    bucket_size = -(-n // n_buckets)
+    n_buckets = -(-n // bucket_size)
+    padded = np.full((n_buckets * bucket_size, n_columns), np.nan)
+    padded[:n] = values
+    buckets = padded.reshape(n_buckets, bucket_size, n_columns)
+    
+    # 每个桶内最小值和最大值的位置（NaN不参与比较）
+    nan_mask = np.isnan(buckets)
+    min_pos = np.where(nan_mask, np.inf, buckets).argmin(axis=1)
+    max_pos = np.where(nan_mask, -np.inf, buckets).argmax(axis=1)
+    first_pos = np.minimum(min_pos, max_pos)
+    second_pos = np.maximum(min_pos, max_pos)
+    
+    bucket_index = np.arange(n_buckets)[:, None]
+    column_index = np.arange(n_columns)[None, :]
+    out_values = np.empty((n_buckets, 2, n_columns))
+    out_values[:, 0] = buckets[bucket_index, first_pos, column_index]
+    out_values[:, 1] = buckets[bucket_index, second_pos, column_index]
+    
+    # 横坐标取每个桶的首尾点
+    starts = np.arange(n_buckets) * bucket_size
+    ends = np.minimum(starts + bucket_size, n) - 1
+    out_x = np.column_stack([x[starts], x[ends]]).reshape(-1)
+    
+    out_values = out_values.reshape(n_buckets * 2, n_columns)
+    if squeeze:
+        out_values = out_values[:, 0]
+    return out_x, out_values
+
+
+def window_slice(x: np.ndarray, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+    """
+    获取横坐标在[start, end]范围内的行切片
+    
+    Args:
+        x: 递增的横坐标数组
+        start: 起始横坐标（可选，包含）
+        end: 结束横坐标（可选，包含）
+    
+    Returns:
+        行切片
+    """
+    lo = 0 if start is None else int(np.searchsorted(x, start, side='left'))
+    hi = len(x) if end is None else int(np.searchsorted(x, end, side='right'))
+    return slice(lo, max(lo, hi))
+
+
+class MinMaxPyramid:
+    """
+    最小值/最大值降采样金字塔（单列数据）
+    
+    预先按桶计算每层的最小值和最大值：第一层每桶BASE_BUCKET个点，之后每层桶大小翻倍，
+    直到只剩一个桶。显示任意窗口时选择桶数不超过max_points // 2的最细一层，
+    每个桶输出最小值和最大值两个点，峰值和谷值都会保留，且不再遍历窗口内的原始数据。
+    
+    所有层的总大小约等于原始数据的大小（最小值和最大值各约为原始数据的一半）。
+    NaN在比较时被忽略，桶内全为NaN时输出NaN。
+    """
+    
+    BASE_BUCKET = 4  # 第一层的桶大小（更细的窗口直接使用原始数据）
+    
+    def __init__(self, values: np.ndarray):
+        """
+        构建降采样金字塔
+        
+        Args:
+            values: 数据数组，形状(n,)
+        """
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.bucket_sizes = []
+        self.mins = []
+        self.maxs = []
+        
+        mins = maxs = self.values
+        factor = self.BASE_BUCKET
+        bucket_size = 1
+        while len(mins) > 1:
+            mins = self._reduce(mins, factor, np.fmin)
+            maxs = self._reduce(maxs, factor, np.fmax)
+            bucket_size *= factor
+            self.bucket_sizes.append(bucket_size)
+            self.mins.append(mins)
+            self.maxs.append(maxs)
+            factor = 2
+    
+    @staticmethod
+    def _reduce(values: np.ndarray, factor: int, func: np.ufunc) -> np.ndarray:
+        """每factor个点合并为一个桶（末尾不足一个桶的部分用NaN填充）"""
+        n_buckets = -(-len(values) // factor)
+        padded = np.full(n_buckets * factor, np.nan)
+        padded[:len(values)] = values
+        return func.reduce(padded.reshape(n_buckets, factor), axis=1)
+    
+    def value_range(self) -> Tuple[float, float]:
+        """
+        获取整列的最小值和最大值
+        
+        Returns:
+            (最小值, 最大值)；没有数据或全为NaN时为(NaN, NaN)
+        """
+        if self.mins:
+            return float(self.mins[-1][0]), float(self.maxs[-1][0])
+        if len(self.values) == 0:
+            return np.nan, np.nan
+        return float(self.values[0]), float(self.values[0])
+    
+    def window(self, start: int, end: int, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取[start, end)行范围的降采样数据
+        
+        Args:
+            start: 起始行（包含）
+            end: 结束行（不包含）
+            max_points: 最大输出点数（至少为2，窗口两端不完整的桶可能多出几个点）
+        
+        Returns:
+            (横坐标（行索引）, 数据)；窗口点数不超过max_points时返回原始数据的视图，
+            否则每个桶输出两个点（横坐标为桶起始行，纵坐标依次为最小值和最大值）
+        """
+        if max_points < 2:
+            raise ValueError("max_points必须大于等于2")
+        
+        start = max(0, start)
+        end = min(len(self.values), end)
+        if end - start <= max_points:
+            return np.arange(start, max(start, end), dtype=np.float64), self.values[start:end]
+        
+        # 选择桶数不超过max_points // 2的最细一层
+        max_buckets = max_points // 2
+        level = len(self.bucket_sizes) - 1
+        for i, bucket_size in enumerate(self.bucket_sizes):
+            if -(-(end - start) // bucket_size) <= max_buckets:
+                level = i
+                break
+        bucket_size = self.bucket_sizes[level]
+        first = start // bucket_size
+        last = -(-end // bucket_size)
+        
+        out_x = np.repeat(np.arange(first, last, dtype=np.float64) * bucket_size, 2)
+        out_values = np.empty((last - first, 2))
+        out_values[:, 0] = self.mins[level][first:last]
+        out_values[:, 1] = self.maxs[level][first:last]
+        return out_x, out_values.reshape(-1)
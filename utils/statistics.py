@@ -0,0 +1,150 @@
+"""
+列统计模块
+
+按块一次遍历计算每列的最小值、最大值、均值、标准差和NaN数，
+不展平、不复制整个数据（内存映射的数组每次只读入一块）。
+供数据查看器、导出摘要和Web预览共用。
+"""
+
+import math
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+BLOCK_SIZE = 1 << 16  # 每次处理的元素数（块内数据留在CPU缓存中）
+
+
+class ColumnStats:
+    """
+    单列统计结果
+    
+    Attributes:
+        count: 非NaN值个数
+        nan_count: NaN个数
+        min: 最小值（没有非NaN值时为NaN）
+        max: 最大值（没有非NaN值时为NaN）
+        mean: 均值（没有非NaN值时为NaN）
+        std: 总体标准差（ddof=0，没有非NaN值时为NaN）
+    """
+    
+    __slots__ = ('count', 'nan_count', 'min', 'max', 'mean', 'std')
+    
+    def __init__(self, count: int, nan_count: int,
+                 min: float, max: float, mean: float, std: float):
+        self.count = count
+        self.nan_count = nan_count
+        self.min = min
+        self.max = max
+        self.mean = mean
+        self.std = std
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典格式（NaN转换为None，可直接序列化为JSON）
+        
+        Returns:
+            统计字典
+        """
+        return {
+            name: None if isinstance(value, float) and math.isnan(value) else value
+            for name, value in ((name, getattr(self, name)) for name in self.__slots__)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'ColumnStats':
+        """
+        从字典创建统计结果（to_dict的逆操作）
+        
+        Args:
+            data: 统计字典
+        
+        Returns:
+            统计结果
+        """
+        def value(name):
+            return np.nan if data[name] is None else float(data[name])
+        
+        return cls(int(data['count']), int(data['nan_count']),
+                   value('min'), value('max'), value('mean'), value('std'))
+
+
+def compute_column_stats(values: np.ndarray, block_size: int = BLOCK_SIZE) -> ColumnStats:
+    """
+    计算单列统计（按块一次遍历，块间用Chan合并公式累计均值和方差）
+    
+    Args:
+        values: 一维数值数组
+        block_size: 每块的元素数
+    
+    Returns:
+        统计结果
+    """
+    count = 0
+    nan_count = 0
+    min_value = np.inf
+    max_value = -np.inf
+    mean = 0.0
+    m2 = 0.0  # 与均值之差的平方和
+    
+    for start in range(0, len(values), block_size):
+        block = np.asarray(values[start:start + block_size], dtype=np.float64)
+        nan_mask = np.isnan(block)
+        block_nan = int(nan_mask.sum())
+        nan_count += block_nan
+        if block_nan:
+            block = block[~nan_mask]
+        block_count = len(block)
+        if block_count == 0:
+            continue
+        
+        block_mean = float(block.mean())
+        block_m2 = float(np.square(block - block_mean).sum())
+        min_value = min(min_value, float(block.min()))
+        max_value = max(max_value, float(block.max()))
+        
+        # 合并当前块的均值和方差
+        total = count + block_count
+        delta = block_mean - mean
+        mean += delta * block_count / total
+        m2 += block_m2 + delta * delta * count * block_count / total
+        count = total
+    
+    if count == 0:
+        return ColumnStats(0, nan_count, np.nan, np.nan, np.nan, np.nan)
+    return ColumnStats(count, nan_count, min_value, max_value, mean, math.sqrt(m2 / count))
+
+
+def compute_stats(columns: Mapping[str, np.ndarray],
+                  exclude: Optional[tuple] = ('timeStamp',)) -> Dict[str, ColumnStats]:
+    """
+    计算各数值列的统计
+    
+    Args:
+        columns: 列名到数据数组的映射（也可以是DataFrame）
+        exclude: 不统计的列名（默认timeStamp列）
+    
+    Returns:
+        列名到统计结果的映射（非数值列不统计）
+    """
+    stats = {}
+    for name in columns.keys():
+        if exclude and name in exclude:
+            continue
+        values = np.asarray(columns[name])
+        if values.dtype.kind not in 'biuf':
+            continue
+        stats[name] = compute_column_stats(values)
+    return stats
+
+
+def stats_to_dict(stats: Mapping[str, ColumnStats]) -> Dict[str, Dict[str, Any]]:
+    """
+    把各列统计转换为可序列化为JSON的字典
+    
+    Args:
+        stats: 列名到统计结果的映射
+    
+    Returns:
+        列名到统计字典的映射
+    """
+    return {name: column_stats.to_dict() for name, column_stats in stats.items()}
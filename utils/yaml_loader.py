@@ -0,0 +1,29 @@
+"""
+YAML加载模块
+
+优先使用libyaml的C实现（CSafeLoader），解析速度比纯Python实现快一个数量级；
+PyYAML未编译libyaml时退回SafeLoader，解析结果相同。
+"""
+
+from typing import Any, IO, Union
+
+import yaml
+
+# 安全加载器（只构造基本类型，不执行任意代码）
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_yaml(stream: Union[str, bytes, IO]) -> Any:
+    """
+    安全解析YAML内容
+    
+    Args:
+        stream: YAML字符串、字节串或文件对象
+    
+    Returns:
+        解析结果
+    
+    Raises:
+        yaml.YAMLError: YAML格式错误
+    """
+    return yaml.load(stream, Loader=SafeLoader)
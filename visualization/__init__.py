@@ -1,8 +1,16 @@
 """
 数据可视化模块
-"""
 
-from visualization.data_viewer import DataViewer, show_data_viewer
+DataViewer和show_data_viewer依赖PyQt6和pyqtgraph，第一次访问时才导入；
+只使用visualization.data_loader时不需要图形界面依赖。
+"""
 
 __all__ = ['DataViewer', 'show_data_viewer']
 
+
+def __getattr__(name):
+    """按需导入数据查看器"""
+    if name in __all__:
+        from visualization import data_viewer
+        return getattr(data_viewer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,341 @@
+"""
+数据文件加载（不依赖Qt，可在后台线程中调用）
+
+支持的文件格式：
+- CSV：分块读取，只读取选中的列，数值列逐块转换为浮点数
+- .npy：单个文件，或每列一个.npy文件的目录（包括结果缓存目录，按meta.json中的列名；
+  选择meta.json文件时读取所在目录），
+  以内存映射方式打开，只有实际访问的部分才会读入内存
+- Arrow/Feather（.arrow/.feather）：内存映射读取（需要安装pyarrow）
+- Parquet（.parquet）：只读取选中的列（需要安装pyarrow）
+
+各列统计保存在数据文件旁的{文件名}.stats.json中（按文件大小和修改时间校验），
+再次打开同一文件时不再重新计算；结果缓存目录直接使用meta.json中的统计。
+"""
+
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.downsampling import MinMaxPyramid
+from utils.logger import get_logger
+from utils.statistics import ColumnStats, compute_stats, stats_to_dict
+
+# 进度回调，参数为0~100的整数
+ProgressCallback = Callable[[int], None]
+
+CSV_EXTENSIONS = ('.csv',)
+NPY_EXTENSIONS = ('.npy',)
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+PARQUET_EXTENSIONS = ('.parquet',)
+
+CSV_CHUNK_ROWS = 200000  # CSV分块读取的行数
+META_FILE = 'meta.json'  # 结果缓存目录中的列名文件
+STATS_SUFFIX = '.stats.json'  # 统计缓存文件的后缀
+
+
+def has_description_row(file_path: str) -> bool:
+    """
+    判断CSV文件第二行是否是描述行
+    
+    Args:
+        file_path: CSV文件路径
+    
+    Returns:
+        第二行是否是描述行
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        f.readline()
+        second_line = f.readline().strip()
+    
+    # 判断第二行是否是描述行（通常描述行包含中文或"未知工况"等关键词）
+    if not second_line:
+        return False
+    # 检查第二行是否包含常见的中文描述关键词
+    description_keywords = ['时间戳', '未知工况', '描述', '说明']
+    if any(keyword in second_line for keyword in description_keywords):
+        return True
+    # 或者检查第二行是否看起来不像数据（包含非数字字符较多）
+    first_field = second_line.split(',')[0]
+    return not any(char.isdigit() for char in first_field if first_field)
+
+
+def list_columns(file_path: str) -> List[str]:
+    """
+    读取文件的列名（不读取数据）
+    
+    Args:
+        file_path: 文件或.npy目录路径
+    
+    Returns:
+        列名列表
+    
+    Raises:
+        ValueError: 不支持的文件格式
+    """
+    path = _resolve_path(file_path)
+    if path.is_dir():
+        return list(_npy_dir_files(path))
+    
+    suffix = path.suffix.lower()
+    if suffix in CSV_EXTENSIONS:
+        with open(path, 'r', encoding='utf-8') as f:
+            header_line = f.readline().strip()
+        return [col.strip() for col in header_line.split(',')]
+    if suffix in NPY_EXTENSIONS:
+        return list(_npy_file_columns(path, None))
+    if suffix in ARROW_EXTENSIONS:
+        return list(_import_pyarrow_feather().read_table(str(path), memory_map=True).column_names)
+    if suffix in PARQUET_EXTENSIONS:
+        return list(_import_pyarrow_parquet().ParquetFile(str(path)).schema_arrow.names)
+    raise ValueError(f"不支持的文件格式: {path.suffix}")
+
+
+def load_data_file(file_path: str,
+                   columns: Optional[List[str]] = None,
+                   progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+    """
+    加载数据文件
+    
+    Args:
+        file_path: 文件或.npy目录路径
+        columns: 要读取的列名（可选，不提供时读取所有列）
+        progress: 进度回调（可选）
+    
+    Returns:
+        DataFrame数据（.npy和Arrow文件的列直接引用内存映射的数组，只读）
+    
+    Raises:
+        ValueError: 不支持的文件格式
+    """
+    path = _resolve_path(file_path)
+    suffix = path.suffix.lower()
+    if path.is_dir():
+        df = load_npy_dir(path, columns)
+    elif suffix in CSV_EXTENSIONS:
+        df = load_csv(path, columns, progress)
+    elif suffix in NPY_EXTENSIONS:
+        df = pd.DataFrame(_npy_file_columns(path, columns), copy=False)
+    elif suffix in ARROW_EXTENSIONS:
+        table = _import_pyarrow_feather().read_table(str(path), columns=columns, memory_map=True)
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+    elif suffix in PARQUET_EXTENSIONS:
+        table = _import_pyarrow_parquet().read_table(str(path), columns=columns, memory_map=True)
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+    else:
+        raise ValueError(f"不支持的文件格式: {path.suffix}")
+    
+    if progress is not None:
+        progress(100)
+    return df
+
+
+def load_csv(file_path: Path,
+             columns: Optional[List[str]] = None,
+             progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+    """
+    分块读取CSV文件
+    
+    第二行是描述行时跳过该行；除timeStamp列外，各列逐块转换为数值类型（无法转换的值为NaN）。
+    
+    Args:
+        file_path: CSV文件路径
+        columns: 要读取的列名（可选，不提供时读取所有列）
+        progress: 进度回调（可选，按已读取的字节数计算）
+    
+    Returns:
+        DataFrame数据
+    """
+    skiprows = [1] if has_description_row(str(file_path)) else None
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col.strip() in wanted
+    
+    total_bytes = max(Path(file_path).stat().st_size, 1)
+    chunks = []
+    with open(file_path, 'rb') as f:
+        reader = pd.read_csv(f, encoding='utf-8', skiprows=skiprows, usecols=usecols,
+                             chunksize=CSV_CHUNK_ROWS)
+        for chunk in reader:
+            chunk.columns = [col.strip() for col in chunk.columns]
+            
+            # 检查是否有timeStamp列，如果没有，尝试解析第一列
+            if 'timeStamp' not in chunk.columns and len(chunk.columns) > 0:
+                # 假设第一列是时间戳
+                first_col = chunk.columns[0]
+                if 'time' in first_col.lower():
+                    chunk = chunk.rename(columns={first_col: 'timeStamp'})
+            
+            # 确保数值列的数据类型正确（逐块转换，不保留整个文件的字符串数据）
+            for col in chunk.columns:
+                if col != 'timeStamp':
+                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+            chunks.append(chunk)
+            
+            if progress is not None:
+                progress(min(99, int(f.tell() * 100 / total_bytes)))
+    
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_npy_dir(dir_path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    以内存映射方式加载每列一个.npy文件的目录
+    
+    目录中有meta.json（结果缓存格式）时按其中的列名读取{序号}.npy，否则列名为文件名。
+    
+    Args:
+        dir_path: 目录路径
+        columns: 要读取的列名（可选，不提供时读取所有列）
+    
+    Returns:
+        DataFrame数据
+    """
+    data = {}
+    for name, npy_file in _npy_dir_files(Path(dir_path)).items():
+        if columns is None or name in columns:
+            data[name] = np.load(npy_file, mmap_mode='r', allow_pickle=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def numeric_columns(df: pd.DataFrame) -> List[str]:
+    """
+    获取可以绘制的数值列（不包括timeStamp列）
+    
+    Args:
+        df: DataFrame数据
+    
+    Returns:
+        列名列表
+    """
+    columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    if 'timeStamp' in columns:
+        columns.remove('timeStamp')
+    return columns
+
+
+def build_pyramids(df: pd.DataFrame) -> Dict[str, MinMaxPyramid]:
+    """
+    为每个数值列构建降采样金字塔
+    
+    Args:
+        df: DataFrame数据
+    
+    Returns:
+        列名到降采样金字塔的映射
+    """
+    return {
+        col: MinMaxPyramid(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        for col in numeric_columns(df)
+    }
+
+
+def load_file_stats(file_path: str, df: pd.DataFrame) -> Dict[str, ColumnStats]:
+    """
+    获取数据文件各数值列的统计（优先使用缓存的统计，只计算缺少的列）
+    
+    Args:
+        file_path: 文件或.npy目录路径
+        df: 从该文件加载的DataFrame
+    
+    Returns:
+        列名到统计结果的映射（只包含df中的数值列，不包含timeStamp列）
+    """
+    path = _resolve_path(file_path)
+    columns = numeric_columns(df)
+    
+    # 结果缓存目录：统计保存在meta.json中
+    meta_file = path / META_FILE
+    if path.is_dir() and meta_file.exists():
+        meta = json.loads(meta_file.read_text(encoding='utf-8'))
+        cached = {name: ColumnStats.from_dict(data) for name, data in meta.get('stats', {}).items()}
+        missing = [col for col in columns if col not in cached]
+        cached.update(compute_stats({col: df[col] for col in missing}))
+        return {col: cached[col] for col in columns}
+    
+    # 其他文件：统计保存在文件旁的.stats.json中，文件大小或修改时间变化时失效
+    stats_file = path.with_name(path.name + STATS_SUFFIX)
+    stat = path.stat()
+    version = [stat.st_size, stat.st_mtime_ns]
+    cached = {}
+    try:
+        data = json.loads(stats_file.read_text(encoding='utf-8'))
+        if data.get('version') == version:
+            cached = {name: ColumnStats.from_dict(item) for name, item in data['stats'].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    missing = [col for col in columns if col not in cached]
+    if missing:
+        cached.update(compute_stats({col: df[col] for col in missing}))
+        try:
+            stats_file.write_text(
+                json.dumps({'version': version, 'stats': stats_to_dict(cached)}, ensure_ascii=False),
+                encoding='utf-8'
+            )
+        except OSError as e:
+            get_logger().warning(f"保存统计缓存失败: {e}")
+    return {col: cached[col] for col in columns}
+
+
+def _resolve_path(file_path: str) -> Path:
+    """选择的是结果缓存目录中的meta.json时，返回该目录"""
+    path = Path(file_path)
+    if path.name == META_FILE:
+        return path.parent
+    return path
+
+
+def _npy_dir_files(dir_path: Path) -> Dict[str, Path]:
+    """获取.npy目录中列名到文件的映射"""
+    meta_file = dir_path / META_FILE
+    if meta_file.exists():
+        meta = json.loads(meta_file.read_text(encoding='utf-8'))
+        return {name: dir_path / f'{index}.npy' for index, name in enumerate(meta['columns'])}
+    return {npy_file.stem: npy_file for npy_file in sorted(dir_path.glob('*.npy'))}
+
+
+def _npy_file_columns(file_path: Path, columns: Optional[List[str]]) -> Dict[str, np.ndarray]:
+    """
+    以内存映射方式打开单个.npy文件并拆分为列
+    
+    一维数组为一列（列名为文件名），结构化数组按字段拆分，二维数组按列拆分（列名为col_序号）。
+    """
+    array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+    if array.dtype.names:
+        data = {name: array[name] for name in array.dtype.names}
+    elif array.ndim == 1:
+        data = {file_path.stem: array}
+    elif array.ndim == 2:
+        data = {f'col_{index}': array[:, index] for index in range(array.shape[1])}
+    else:
+        raise ValueError(f"不支持{array.ndim}维数组")
+    if columns is not None:
+        data = {name: values for name, values in data.items() if name in columns}
+    return data
+
+
+def _import_pyarrow_feather():
+    """导入pyarrow.feather（可选依赖）"""
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ValueError("读取Arrow文件需要安装pyarrow")
+    return feather
+
+
+def _import_pyarrow_parquet():
+    """导入pyarrow.parquet（可选依赖）"""
+    try:
+        import pyarrow.parquet as parquet
+    except ImportError:
+        raise ValueError("读取Parquet文件需要安装pyarrow")
+    return parquet
@@ -13,11 +13,56 @@ from typing import Optional, Dict, List
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QFileDialog, QLabel,
                              QComboBox, QSpinBox, QDoubleSpinBox, QGroupBox,
-                             QCheckBox, QScrollArea)
-from PyQt6.QtCore import Qt, QTimer
+                             QCheckBox, QScrollArea, QProgressBar, QDialog,
+                             QDialogButtonBox, QListWidget, QListWidgetItem)
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt6.QtGui import QColor
 import pyqtgraph as pg
 from utils.logger import get_logger
+from utils.downsampling import MinMaxPyramid
+from utils.statistics import ColumnStats, compute_stats
+from visualization.data_loader import (list_columns, load_data_file, load_file_stats,
+                                       numeric_columns, build_pyramids)
+
+
+class DataLoadWorker(QThread):
+    """
+    数据文件加载线程
+    
+    在后台读取文件、获取各列统计并构建降采样金字塔，避免界面卡顿。
+    """
+    
+    progress = pyqtSignal(int)  # 加载进度（0~100）
+    loaded = pyqtSignal(object, object, object)  # 加载完成（DataFrame, 降采样金字塔, 各列统计）
+    failed = pyqtSignal(str)  # 加载失败（错误信息）
+    
+    def __init__(self, file_path: str, columns: Optional[List[str]] = None, parent=None):
+        """
+        初始化加载线程
+        
+        Args:
+            file_path: 文件路径
+            columns: 要读取的列名（可选，不提供时读取所有列）
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.file_path = file_path
+        self.columns = columns
+        self.logger = get_logger()
+    
+    def run(self):
+        """读取文件、获取各列统计并构建降采样金字塔"""
+        try:
+            df = load_data_file(self.file_path, self.columns, self.progress.emit)
+            stats = load_file_stats(self.file_path, df)
+            pyramids = build_pyramids(df)
+        except Exception as e:
+            self.logger.error(f"加载数据文件失败: {e}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(df, pyramids, stats)
 
 
 class DataViewer(QMainWindow):
@@ -25,13 +70,27 @@ class DataViewer(QMainWindow):
     数据查看器主窗口
     
     支持：
-    - 加载和显示CSV数据文件
+    - 加载和显示CSV数据文件（后台线程读取，支持内存映射的.npy/Arrow文件和Parquet文件）
     - 显示DataFrame数据
     - 时间窗口拖拽
     - 缩放显示
     - 多曲线显示
+    
+    曲线对象在加载数据后保持不变，窗口变化时只用setData更新数据；
+    加载数据时为每列构建最小值/最大值金字塔，任意缩放级别下每条曲线
+    最多绘制约2倍图表像素宽度的点，并保留峰值。
     """
     
+    REDRAW_DELAY_MS = 30  # 拖动起始索引时的重绘延迟（毫秒），连续变化只重绘一次
+    MIN_PLOT_WIDTH = 200  # 计算绘制点数时使用的最小图表宽度（像素）
+    COLUMN_SELECT_MIN = 10  # 文件列数超过该值时先选择要读取的列
+    FILE_FILTER = ('Data Files (*.csv *.npy *.arrow *.feather *.parquet meta.json);;'
+                   'CSV Files (*.csv);;All Files (*)')
+    
+    # 曲线颜色列表（支持多条曲线，循环使用）
+    COLORS = ['blue', 'red', 'green', 'orange', 'purple', 'brown', 'pink', 'gray',
+              'olive', 'cyan', 'magenta', 'yellow', 'navy', 'teal', 'coral', 'lime']
+    
     def __init__(self):
         """初始化数据查看器"""
         super().__init__()
@@ -42,6 +101,18 @@ class DataViewer(QMainWindow):
         self.y_min = None  # Y轴最小值
         self.y_max = None  # Y轴最大值
         self.column_checkboxes: Dict[str, QCheckBox] = {}  # 列复选框字典
+        self.pyramids: Dict[str, MinMaxPyramid] = {}  # 各数值列的降采样金字塔
+        self.stats: Dict[str, ColumnStats] = {}  # 各数值列的统计
+        self.curves: Dict[str, pg.PlotDataItem] = {}  # 各列的曲线对象（首次显示时创建）
+        self.curve_colors: Dict[str, int] = {}  # 各曲线当前使用的颜色序号
+        self.pens = [pg.mkPen(color=color, width=2) for color in self.COLORS]
+        self.load_worker: Optional[DataLoadWorker] = None  # 文件加载线程
+        
+        # 重绘定时器（合并连续的窗口变化）
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(self.REDRAW_DELAY_MS)
+        self.redraw_timer.timeout.connect(self.update_plot)
         
         self.init_ui()
     
@@ -65,7 +136,12 @@ class DataViewer(QMainWindow):
         chart_widget = self.create_chart_widget()
         main_layout.addWidget(chart_widget, 4)
         
-        # 状态栏
+        # 状态栏（加载文件时显示进度条）
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
         self.statusBar().showMessage('就绪')
     
     def create_control_panel(self) -> QWidget:
@@ -77,7 +153,7 @@ class DataViewer(QMainWindow):
         file_group = QGroupBox('文件操作')
         file_layout = QVBoxLayout()
         
-        btn_load = QPushButton('加载CSV文件')
+        btn_load = QPushButton('加载数据文件')
         btn_load.clicked.connect(self.load_csv_file)
         file_layout.addWidget(btn_load)
         
@@ -166,82 +242,121 @@ class DataViewer(QMainWindow):
         self.plot_widget.enableAutoRange(axis='x')  # 只允许X轴自动范围
         self.plot_widget.enableAutoRange(axis='y', enable=False)  # 禁用Y轴自动范围
         
+        # 只绘制可见范围内的点，并自动按峰值降采样（保留每个像素内的最大最小值）
+        self.plot_widget.setClipToView(True)
+        self.plot_widget.setDownsampling(auto=True, mode='peak')
+        
         layout.addWidget(self.plot_widget)
         
         return widget
     
     def load_csv_file(self):
-        """加载CSV文件"""
+        """加载数据文件（CSV、.npy、Arrow、Parquet或结果缓存目录中的meta.json），在后台线程中读取"""
+        if self.load_worker is not None and self.load_worker.isRunning():
+            self.statusBar().showMessage('正在加载文件，请稍候')
+            return
+        
         file_path, _ = QFileDialog.getOpenFileName(
-            self, '选择CSV文件', '', 'CSV Files (*.csv);;All Files (*)'
+            self, '选择数据文件', '', self.FILE_FILTER
         )
         
         if file_path:
             try:
-                # 先读取前两行，判断是否有描述行
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    first_line = f.readline().strip()
-                    second_line = f.readline().strip()
-                
-                # 判断第二行是否是描述行（通常描述行包含中文或"未知工况"等关键词）
-                has_description_row = False
-                if second_line:
-                    # 检查第二行是否包含常见的中文描述关键词
-                    description_keywords = ['时间戳', '未知工况', '描述', '说明']
-                    if any(keyword in second_line for keyword in description_keywords):
-                        has_description_row = True
-                    # 或者检查第二行是否看起来不像数据（包含非数字字符较多）
-                    elif not any(char.isdigit() for char in second_line.split(',')[0] if second_line.split(',')[0]):
-                        has_description_row = True
-                
-                # 根据是否有描述行决定跳过行数
-                skiprows = 1 if has_description_row else 0  # 跳过标题行，如果有描述行则再跳过一行
-                
-                # 读取CSV文件
-                df = pd.read_csv(file_path, skiprows=skiprows)
-                
-                # 如果跳过了描述行，需要手动设置列名（从第一行读取）
-                if has_description_row:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        header_line = f.readline().strip()
-                        column_names = [col.strip() for col in header_line.split(',')]
-                        df.columns = column_names
-                
-                # 检查是否有timeStamp列，如果没有，尝试解析第一列
-                if 'timeStamp' not in df.columns:
-                    if len(df.columns) > 0:
-                        # 假设第一列是时间戳
-                        first_col = df.columns[0]
-                        if 'time' in first_col.lower():
-                            df = df.rename(columns={first_col: 'timeStamp'})
-                
-                # 确保数值列的数据类型正确
-                for col in df.columns:
-                    if col != 'timeStamp':
-                        # 尝试转换为数值类型
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                self.set_data(df)
-                self.statusBar().showMessage(f'已加载文件: {Path(file_path).name} ({len(df)} 行)')
+                # 列较多时先选择要读取的列
+                columns = list_columns(file_path)
+                if len(columns) > self.COLUMN_SELECT_MIN:
+                    columns = self.select_columns(columns)
+                    if columns is None:
+                        return
+                else:
+                    columns = None
             except Exception as e:
-                self.logger.error(f"加载CSV文件失败: {e}")
+                self.logger.error(f"读取文件列名失败: {e}")
                 import traceback
                 self.logger.error(traceback.format_exc())
                 self.statusBar().showMessage(f'加载失败: {str(e)}')
+                return
+            
+            self.load_worker = DataLoadWorker(file_path, columns, self)
+            self.load_worker.progress.connect(self.progress_bar.setValue)
+            self.load_worker.loaded.connect(
+                lambda df, pyramids, stats: self.on_file_loaded(file_path, df, pyramids, stats)
+            )
+            self.load_worker.failed.connect(self.on_file_load_failed)
+            self.progress_bar.setValue(0)
+            self.progress_bar.show()
+            self.statusBar().showMessage(f'正在加载文件: {Path(file_path).name}')
+            self.load_worker.start()
+    
+    def select_columns(self, columns: List[str]) -> Optional[List[str]]:
+        """
+        选择要读取的列
+        
+        Args:
+            columns: 文件中的所有列名
+        
+        Returns:
+            选中的列名列表，取消时返回None
+        """
+        dialog = QDialog(self)
+        dialog.setWindowTitle('选择要读取的列')
+        layout = QVBoxLayout(dialog)
+        
+        list_widget = QListWidget()
+        for col in columns:
+            item = QListWidgetItem(col)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)  # 默认全部读取
+            list_widget.addItem(item)
+        layout.addWidget(list_widget)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        return [list_widget.item(i).text() for i in range(list_widget.count())
+                if list_widget.item(i).checkState() == Qt.CheckState.Checked]
+    
+    def on_file_loaded(self, file_path: str, df: pd.DataFrame,
+                       pyramids: Dict[str, MinMaxPyramid], stats: Dict[str, ColumnStats]):
+        """后台加载完成时的回调"""
+        self.progress_bar.hide()
+        self.set_data(df, pyramids, stats)
+        self.statusBar().showMessage(f'已加载文件: {Path(file_path).name} ({len(df)} 行)')
+    
+    def on_file_load_failed(self, message: str):
+        """后台加载失败时的回调"""
+        self.progress_bar.hide()
+        self.statusBar().showMessage(f'加载失败: {message}')
     
     def load_dataframe(self):
         """加载DataFrame（用于预览生成的数据）"""
         # 这个方法应该由外部调用，传入DataFrame
         self.statusBar().showMessage('请使用set_data方法设置DataFrame')
     
-    def set_data(self, df: pd.DataFrame):
+    def set_data(self, df: pd.DataFrame,
+                 pyramids: Optional[Dict[str, MinMaxPyramid]] = None,
+                 stats: Optional[Dict[str, ColumnStats]] = None):
         """
         设置要显示的数据
         
+        数据不会被修改，因此不再复制（内存映射的列保持映射，只读入实际访问的部分）。
+        
         Args:
             df: DataFrame数据
+            pyramids: 各数值列的降采样金字塔（可选，不提供时在此构建）
+            stats: 各数值列的统计（可选，不提供时在此计算）
         """
-        self.data = df.copy()
+        self.data = df
+        
+        # 清除旧的曲线
+        self.redraw_timer.stop()
+        self.plot_widget.clear()
+        self.curves.clear()
+        self.curve_colors.clear()
         
         # 清除旧的复选框
         for checkbox in self.column_checkboxes.values():
@@ -249,41 +364,49 @@ class DataViewer(QMainWindow):
             checkbox.deleteLater()
         self.column_checkboxes.clear()
         
-        # 获取数值列
-        numeric_columns = self.data.select_dtypes(include=[np.number]).columns.tolist()
-        # 排除timeStamp列（如果存在）
-        if 'timeStamp' in numeric_columns:
-            numeric_columns.remove('timeStamp')
+        # 获取数值列（排除timeStamp列）
+        columns = numeric_columns(self.data)
+        
+        # 各列统计（加载文件时使用缓存的统计，否则一次遍历计算）
+        self.stats = stats if stats is not None else compute_stats({col: self.data[col] for col in columns})
         
-        # 创建复选框
-        for col in numeric_columns:
+        # 创建复选框（提示中显示该列的统计）
+        for col in columns:
             checkbox = QCheckBox(col)
             checkbox.setChecked(False)  # 默认不选中
+            col_stats = self.stats[col]
+            checkbox.setToolTip(
+                f'最小值: {col_stats.min:.6g}\n最大值: {col_stats.max:.6g}\n'
+                f'均值: {col_stats.mean:.6g}\n标准差: {col_stats.std:.6g}\nNaN数: {col_stats.nan_count}'
+            )
             checkbox.stateChanged.connect(self.on_column_checkbox_changed)
             self.column_checkboxes[col] = checkbox
             self.checkbox_layout.addWidget(checkbox)
         
         # 如果没有列，添加一个占位标签
-        if len(numeric_columns) == 0:
+        if len(columns) == 0:
             label = QLabel('无数值列')
             self.checkbox_layout.addWidget(label)
         
-        # 计算所有数值列的最大最小值（用于Y轴范围）
-        if len(numeric_columns) > 0:
-            all_numeric_data = self.data[numeric_columns].values.flatten()
-            all_numeric_data = all_numeric_data[~np.isnan(all_numeric_data)]  # 排除NaN
-            if len(all_numeric_data) > 0:
-                self.y_min = float(np.min(all_numeric_data))
-                self.y_max = float(np.max(all_numeric_data))
-                # 添加一些边距（5%）
-                y_range = self.y_max - self.y_min
-                if y_range > 0:
-                    self.y_min -= y_range * 0.05
-                    self.y_max += y_range * 0.05
-                else:
-                    # 如果数据范围很小，添加固定边距
-                    self.y_min -= 1.0
-                    self.y_max += 1.0
+        # 各列的降采样金字塔
+        self.pyramids = pyramids if pyramids is not None else build_pyramids(self.data)
+        
+        # 计算所有数值列的最大最小值（用于Y轴范围，排除NaN）
+        self.y_min = None
+        self.y_max = None
+        column_stats = [self.stats[col] for col in columns if self.stats[col].count > 0]
+        if column_stats:
+            self.y_min = float(min(item.min for item in column_stats))
+            self.y_max = float(max(item.max for item in column_stats))
+            # 添加一些边距（5%）
+            y_range = self.y_max - self.y_min
+            if y_range > 0:
+                self.y_min -= y_range * 0.05
+                self.y_max += y_range * 0.05
+            else:
+                # 如果数据范围很小，添加固定边距
+                self.y_min -= 1.0
+                self.y_max += 1.0
         
         # 更新索引范围
         if len(self.data) > 0:
@@ -297,53 +420,73 @@ class DataViewer(QMainWindow):
         self.update_plot()
     
     def on_start_idx_changed(self, value: int):
-        """起始索引改变时的回调"""
+        """起始索引改变时的回调（拖动时延迟重绘）"""
         self.visible_start_idx = value
-        self.update_plot()
+        self.schedule_update()
     
     def on_points_changed(self, value: int):
-        """显示点数改变时的回调"""
+        """显示点数改变时的回调（连续变化时延迟重绘）"""
         self.visible_points = value
-        self.update_plot()
+        self.schedule_update()
     
     def on_column_checkbox_changed(self):
         """列复选框状态改变时的回调"""
         self.update_plot()
     
+    def schedule_update(self):
+        """延迟更新图表，定时器到期前的多次调用只重绘一次"""
+        self.redraw_timer.start()
+    
+    def get_curve(self, col: str) -> pg.PlotDataItem:
+        """
+        获取列对应的曲线对象（不存在时创建）
+        
+        Args:
+            col: 列名
+        
+        Returns:
+            曲线对象
+        """
+        curve = self.curves.get(col)
+        if curve is None:
+            curve = self.plot_widget.plot(name=col)
+            self.curves[col] = curve
+        return curve
+    
     def update_plot(self):
         """更新图表显示"""
+        self.redraw_timer.stop()
         if self.data is None or len(self.data) == 0:
             return
         
-        # 清除现有曲线
-        self.plot_widget.clear()
-        
         # 获取选中的列
         selected_columns = [col for col, checkbox in self.column_checkboxes.items() 
                            if checkbox.isChecked()]
         
+        # 隐藏未选中的列的曲线
+        for col, curve in self.curves.items():
+            if col not in selected_columns:
+                curve.setVisible(False)
+        
         if not selected_columns:
             # 如果没有选中的列，清空图表
             self.statusBar().showMessage('请选择要显示的列')
             return
         
-        # 计算显示范围
+        # 计算显示范围，每条曲线最多绘制约2倍图表像素宽度的点
         end_idx = min(self.visible_start_idx + self.visible_points, len(self.data))
-        visible_data = self.data.iloc[self.visible_start_idx:end_idx]
+        max_points = 2 * max(self.plot_widget.width(), self.MIN_PLOT_WIDTH)
         
-        # 获取X轴数据
-        x_data = np.arange(self.visible_start_idx, end_idx)
-        
-        # 定义颜色列表（支持多条曲线）
-        colors = ['blue', 'red', 'green', 'orange', 'purple', 'brown', 'pink', 'gray', 
-                 'olive', 'cyan', 'magenta', 'yellow', 'navy', 'teal', 'coral', 'lime']
-        
-        # 绘制所有选中的列
+        # 更新所有选中的列
         for idx, col in enumerate(selected_columns):
-            y_data = visible_data[col].values
-            color = colors[idx % len(colors)]  # 循环使用颜色
-            pen = pg.mkPen(color=color, width=2)
-            self.plot_widget.plot(x_data, y_data, pen=pen, name=col)
+            curve = self.get_curve(col)
+            color_idx = idx % len(self.pens)  # 循环使用颜色
+            if self.curve_colors.get(col) != color_idx:
+                curve.setPen(self.pens[color_idx])
+                self.curve_colors[col] = color_idx
+            x_data, y_data = self.pyramids[col].window(self.visible_start_idx, end_idx, max_points)
+            curve.setData(x_data, y_data)
+            curve.setVisible(True)
         
         # 设置Y轴范围为数据的最大最小值（固定Y轴范围）
         if self.y_min is not None and self.y_max is not None:
@@ -352,7 +495,7 @@ class DataViewer(QMainWindow):
         # 更新状态栏
         columns_str = ', '.join(selected_columns)
         self.statusBar().showMessage(
-            f'显示: {self.visible_start_idx}-{end_idx-1} ({len(visible_data)}点) | 列: {columns_str}'
+            f'显示: {self.visible_start_idx}-{end_idx-1} ({end_idx - self.visible_start_idx}点) | 列: {columns_str}'
         )
     
     def zoom_in(self):
@@ -426,4 +569,3 @@ if __name__ == '__main__':
     # 显示窗口
     viewer.show()
     sys.exit(app.exec())
-
@@ -7,8 +7,10 @@
 from sanic import Blueprint, json
 from sanic.exceptions import NotFound, BadRequest
 from sanic.response import text
-from sqlalchemy.orm import Session
-from webserver.models import get_db, Config, ConfigGroup
+from sqlalchemy.orm import Session, defer, joinedload
+from webserver.models import get_db, unique_config_name, Config, ConfigGroup
+from webserver.api.pagination import parse_pagination
+from utils.yaml_loader import load_yaml
 import yaml
 
 configs_bp = Blueprint('configs', url_prefix='/api/configs')
@@ -20,12 +22,18 @@ async def list_configs(request):
     """
     获取配置列表
     
+    列表不包含YAML配置内容（通过GET /api/configs/<id>获取）。
+    
     Query Parameters:
         group_id: 分组ID（可选，如果提供则只返回该分组的配置）
+        limit: 返回数量（可选，不提供时返回全部）
+        offset: 跳过的数量（可选，默认0）
     
     Returns:
-        配置列表（JSON格式）
+        配置列表（JSON格式），total为符合条件的配置总数
     """
+    limit, offset = parse_pagination(request)
+    
     db: Session = next(get_db())
     try:
         group_id = request.args.get('group_id')
@@ -39,10 +47,23 @@ async def list_configs(request):
             except ValueError:
                 pass
         
-        configs = query.order_by(Config.id.asc()).all()
+        total = query.count()
+        
+        # 不加载YAML内容，分组名称通过JOIN一次查询
+        query = query.options(
+            defer(Config.config_yaml),
+            joinedload(Config.group).load_only(ConfigGroup.id, ConfigGroup.name)
+        ).order_by(Config.id.asc())
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        
+        configs = query.all()
         return json({
             'success': True,
-            'data': [config.to_dict() for config in configs]
+            'data': [config.to_dict(include_yaml=False) for config in configs],
+            'total': total
         })
     except Exception as e:
         return json({
@@ -120,7 +141,7 @@ async def create_config(request):
         
         # 验证YAML格式
         try:
-            yaml.safe_load(config_yaml)
+            load_yaml(config_yaml)
         except yaml.YAMLError as e:
             return json({
                 'success': False,
@@ -231,7 +252,7 @@ async def update_config(request, config_id: int):
                 config_yaml = data['config_yaml']
                 # 验证YAML格式
                 try:
-                    yaml.safe_load(config_yaml)
+                    load_yaml(config_yaml)
                 except yaml.YAMLError as e:
                     return json({
                         'success': False,
@@ -329,16 +350,7 @@ async def copy_config(request, config_id: int):
             }, status=400)
         
         # 检查是否已存在同名配置，如果存在则自动重命名
-        final_name = name
-        counter = 1
-        
-        while True:
-            existing_config = db.query(Config).filter(Config.name == final_name).first()
-            if not existing_config:
-                break
-            # 如果存在同名配置，尝试添加后缀
-            final_name = f"{name}_{counter}"
-            counter += 1
+        final_name = unique_config_name(db, name)
         
         # 创建新配置（拷贝）
         new_config = Config(
@@ -382,16 +394,7 @@ async def check_config_name(request):
             }, status=400)
         
         # 检查是否已存在同名配置，如果存在则自动重命名
-        final_name = name
-        counter = 1
-        
-        while True:
-            existing_config = db.query(Config).filter(Config.name == final_name).first()
-            if not existing_config:
-                break
-            # 如果存在同名配置，尝试添加后缀
-            final_name = f"{name}_{counter}"
-            counter += 1
+        final_name = unique_config_name(db, name)
         
         return json({
             'success': True,
@@ -466,7 +469,7 @@ async def import_config(request):
         
         # 验证YAML格式
         try:
-            yaml.safe_load(config_yaml)
+            load_yaml(config_yaml)
         except yaml.YAMLError as e:
             return json({
                 'success': False,
@@ -476,16 +479,7 @@ async def import_config(request):
         db: Session = next(get_db())
         try:
             # 检查是否已存在同名配置，如果存在则自动重命名
-            final_name = name
-            counter = 1
-            
-            while True:
-                existing_config = db.query(Config).filter(Config.name == final_name).first()
-                if not existing_config:
-                    break
-                # 如果存在同名配置，尝试添加后缀
-                final_name = f"{name}_{counter}"
-                counter += 1
+            final_name = unique_config_name(db, name)
             
             # 创建配置
             config = Config(
@@ -1,48 +1,62 @@
 """
 数据导出API
 
-提供CSV文件导出功能。
+提供CSV文件导出和多个配置批量导出（ZIP）功能。
 """
 
 from sanic import Blueprint
-from sanic.response import file_stream
-from sanic.exceptions import NotFound, BadRequest
+from sanic.exceptions import NotFound, BadRequest, ServiceUnavailable
 from sqlalchemy.orm import Session
-from webserver.models import get_db, Config
+from webserver.models import get_db, Config, ConfigGroup
+import asyncio
 import yaml
 import sys
 from pathlib import Path
 from datetime import datetime
-import tempfile
-import os
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from core.generators.data_generator import DataGenerator
-from template.template_manager import TemplateManager
-from output.data_exporter import DataExporter
+from webserver.result_cache import ResultCache, result_cache
+from webserver.config_cache import config_cache
+from webserver.workers import worker_pool, get_generation_result, iter_generated_csv
+from webserver.csv_stream import ZipStream, iter_result_chunks, iter_csv_bytes, iterate_in_thread
 
 export_bp = Blueprint('export', url_prefix='/api/export')
 
+EXPORT_TYPES = ('history', 'full')
+
+
+def _safe_filename(name: str) -> str:
+    """去掉配置名称中不能用于文件名的字符"""
+    return "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+
 
 @export_bp.get('/<config_id:int>')
 async def export_csv(request, config_id: int):
     """
     导出CSV文件
     
+    结果已缓存时从缓存格式化；否则在进程池中边生成边格式化，
+    编码后的字节块传回后立即发送，不写临时文件，也不等待全部数据生成完成。
+    
     Args:
         config_id: 配置ID
     
     Query Parameters:
         type: 导出类型（'history'或'full'，默认'full'）
+        compress: 压缩方式（可选，'gzip'表示下载.csv.gz文件）
     
     Returns:
-        CSV文件流
+        CSV文件流（分块传输）；进程池任务数已达上限时返回503
     """
     try:
         export_type = request.args.get('type', 'full')  # 'history' 或 'full'
+        compress = request.args.get('compress')
+        if compress not in (None, '', 'gzip'):
+            raise BadRequest(f'不支持的压缩方式: {compress}')
+        compress = compress == 'gzip'
         
         db: Session = next(get_db())
         try:
@@ -51,59 +65,186 @@ async def export_csv(request, config_id: int):
                 raise NotFound(f'配置 {config_id} 不存在')
             config_yaml = config.config_yaml
             config_name = config.name
+            updated_at = config.updated_at
         finally:
             db.close()
         
-        # 解析YAML配置
+        # 解析YAML配置（配置未变化时使用缓存）
         try:
-            config_dict = yaml.safe_load(config_yaml)
+            parsed = config_cache.load(config_yaml, config_id, updated_at)
         except yaml.YAMLError as e:
             raise BadRequest(f'YAML格式错误: {str(e)}')
         
-        # 创建数据生成器
-        generator_config = config_dict.get('generator', {})
-        generator = DataGenerator(generator_config)
-        
-        # 获取数据
-        if export_type == 'history':
-            df = generator.get_history_data()
-            suffix = '_history'
-        else:
-            df = generator.generate()
-            suffix = ''
-        
-        # 创建模板管理器
-        template_config = config_dict.get('template', {})
-        template_manager = TemplateManager(template_config)
-        
-        # 创建数据导出器
-        exporter = DataExporter(template_manager)
+        suffix = '_history' if export_type == 'history' else ''
         
-        # 创建临时文件
+        # 文件名
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_name = "".join(c for c in config_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        safe_name = _safe_filename(config_name)
         filename = f"{safe_name}_{timestamp}{suffix}.csv"
+        if compress:
+            filename += '.gz'
         
-        # 创建临时目录
-        temp_dir = Path(tempfile.gettempdir()) / 'data_factory_export'
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        temp_file = temp_dir / filename
-        
-        # 导出数据
-        exporter.export(df, str(temp_file), add_timestamp=False)
+        # 结果已缓存时直接格式化，否则在进程池中流式生成
+        result = None
+        if ResultCache.is_cacheable(parsed.generator_config):
+            key = parsed.result_key
+            result_cache.track_config(config_id, updated_at, key)
+            result = await asyncio.to_thread(result_cache.get, key)
+        if result is not None:
+            chunks = iter_result_chunks(result, export_type)
+            stream = iterate_in_thread(iter_csv_bytes(chunks, parsed.template_config, compress))
+        else:
+            stream = iter_generated_csv(parsed, export_type, compress)
         
-        # 返回文件流
-        return await file_stream(
-            str(temp_file),
-            mime_type='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"'
-            }
-        )
-    except (BadRequest, NotFound) as e:
+        # 先取得第一块数据，配置错误时仍可返回错误响应
+        try:
+            first_block = await anext(stream, b'')
+            
+            response = await request.respond(
+                content_type='application/gzip' if compress else 'text/csv',
+                headers={
+                    'Content-Disposition': f'attachment; filename="{filename}"'
+                }
+            )
+            await response.send(first_block)
+            async for block in stream:
+                await response.send(block)
+            await response.eof()
+        finally:
+            # 客户端断开时立即停止生成
+            await stream.aclose()
+    except (BadRequest, NotFound, ServiceUnavailable) as e:
         raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise BadRequest(f'导出数据失败: {str(e)}')
 
+
+
+async def _generate_for_batch(item: dict, semaphore: asyncio.Semaphore):
+    """
+    获取批量导出中一个配置的生成结果
+    
+    进程池繁忙时等待后重试，不中断已经开始发送的ZIP文件。
+    
+    Args:
+        item: 配置信息（id、name、updated_at、parsed）
+        semaphore: 限制同时生成的配置数
+    
+    Returns:
+        (配置信息, 生成结果, 错误信息)，成功时错误信息为None
+    """
+    async with semaphore:
+        while True:
+            try:
+                result = await get_generation_result(item['parsed'], item['id'], item['updated_at'])
+                return item, result, None
+            except ServiceUnavailable:
+                await asyncio.sleep(worker_pool.RETRY_AFTER_SECONDS)
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                return item, None, str(e)
+
+
+@export_bp.post('/batch')
+async def export_batch(request):
+    """
+    批量导出多个配置的CSV文件（ZIP）
+    
+    各配置在进程池中并行生成，哪个先完成就先写入ZIP文件并发送。
+    每个配置按types输出一个或多个CSV成员文件；生成失败的配置输出一个.error.txt文件。
+    
+    Request Body:
+        {
+            "config_ids": [配置ID, ...]（可选）
+            或
+            "group_id": 分组ID（可选，导出分组内的所有配置）,
+            "types": 导出类型列表（可选，默认["history", "full"]）
+        }
+    
+    Returns:
+        ZIP文件流（分块传输）
+    """
+    data = request.json or {}
+    types = data.get('types', list(EXPORT_TYPES))
+    if not isinstance(types, list) or not types or any(t not in EXPORT_TYPES for t in types):
+        raise BadRequest(f"types必须是非空列表，可选值: {', '.join(EXPORT_TYPES)}")
+    
+    db: Session = next(get_db())
+    try:
+        if 'config_ids' in data:
+            config_ids = data['config_ids']
+            if not isinstance(config_ids, list) or not all(isinstance(i, int) for i in config_ids):
+                raise BadRequest('config_ids必须是整数列表')
+            configs = db.query(Config).filter(Config.id.in_(config_ids)).all()
+            missing = set(config_ids) - {config.id for config in configs}
+            if missing:
+                raise NotFound(f"配置 {', '.join(str(i) for i in sorted(missing))} 不存在")
+            # 保持请求中的顺序
+            order = {config_id: index for index, config_id in enumerate(config_ids)}
+            configs.sort(key=lambda config: order[config.id])
+            archive_name = 'configs'
+        elif 'group_id' in data:
+            group = db.query(ConfigGroup).filter(ConfigGroup.id == data['group_id']).first()
+            if not group:
+                raise NotFound(f"分组 {data['group_id']} 不存在")
+            configs = db.query(Config).filter(Config.group_id == group.id).order_by(Config.name).all()
+            archive_name = _safe_filename(group.name) or 'group'
+        else:
+            raise BadRequest('必须提供config_ids或group_id')
+        
+        if not configs:
+            raise BadRequest('没有可导出的配置')
+        
+        items = []
+        for config in configs:
+            try:
+                parsed = config_cache.load(config.config_yaml, config.id, config.updated_at)
+            except yaml.YAMLError as e:
+                raise BadRequest(f'配置 {config.id} YAML格式错误: {str(e)}')
+            items.append({
+                'id': config.id,
+                'name': f'{config.id}_{_safe_filename(config.name)}',
+                'updated_at': config.updated_at,
+                'parsed': parsed
+            })
+    finally:
+        db.close()
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'{archive_name}_{timestamp}.zip'
+    
+    # 同时生成的配置数不超过进程数，避免占满进程池的排队名额
+    semaphore = asyncio.Semaphore(worker_pool.max_workers)
+    tasks = [asyncio.ensure_future(_generate_for_batch(item, semaphore)) for item in items]
+    
+    try:
+        response = await request.respond(
+            content_type='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"'
+            }
+        )
+        zip_stream = ZipStream()
+        for task in asyncio.as_completed(tasks):
+            item, result, error = await task
+            members = []
+            if error is not None:
+                members.append((f"{item['name']}.error.txt", iter([error.encode('utf-8')])))
+            else:
+                template_config = item['parsed'].template_config
+                for export_type in types:
+                    suffix = '_history' if export_type == 'history' else ''
+                    chunks = iter_result_chunks(result, export_type)
+                    members.append((f"{item['name']}{suffix}.csv", iter_csv_bytes(chunks, template_config)))
+            for name, blocks in members:
+                async for block in iterate_in_thread(zip_stream.iter_member(name, blocks)):
+                    await response.send(block)
+        await response.send(zip_stream.close())
+        await response.eof()
+    finally:
+        # 客户端断开时取消尚未完成的生成
+        for task in tasks:
+            task.cancel()
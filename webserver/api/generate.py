@@ -4,8 +4,8 @@
 提供数据生成和预览功能。
 """
 
-from sanic import Blueprint, json
-from sanic.exceptions import NotFound, BadRequest
+from sanic import Blueprint, json, raw
+from sanic.exceptions import NotFound, BadRequest, ServiceUnavailable
 from sqlalchemy.orm import Session
 from webserver.models import get_db, Config
 import yaml
@@ -16,7 +16,10 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from core.generators.data_generator import DataGenerator
+from webserver.workers import get_generation_result, get_preview_data, get_chart_data, select_chart_columns
+from utils.statistics import stats_to_dict
+from webserver.config_cache import config_cache
+from webserver import columnar
 
 generate_bp = Blueprint('generate', url_prefix='/api/generate')
 
@@ -30,15 +33,31 @@ async def generate_data(request):
         {
             "config_id": 配置ID（可选，如果提供则使用数据库中的配置）
             或
-            "config_yaml": "YAML配置内容"（可选，如果提供则直接使用）
+            "config_yaml": "YAML配置内容"（可选，如果提供则直接使用）,
+            "preview_rows": 返回的行数（可选，正整数，默认1000）,
+            "format": "json"或"binary"（可选，也可通过Accept请求头指定列式二进制格式）,
+            "precision": 二进制格式的数值精度，"float64"或"float32"（可选，默认float64）
         }
     
     Returns:
-        生成的数据（JSON格式，包含历史数据和完整数据）
+        生成的数据（JSON格式，包含历史数据、完整数据和各列统计）；
+        二进制格式时返回前preview_rows行的列数据，行数统计和各列统计在头部metadata中
     """
     try:
         data = request.json or {}
         config_yaml = None
+        config_id = None
+        updated_at = None
+        
+        try:
+            preview_rows = int(data.get('preview_rows', 1000))
+        except (TypeError, ValueError):
+            raise BadRequest('preview_rows必须是整数')
+        if preview_rows <= 0:
+            raise BadRequest('preview_rows必须大于0')
+        precision = data.get('precision', 'float64')
+        if precision not in columnar.DTYPES:
+            raise BadRequest(f'不支持的精度: {precision}')
         
         # 如果提供了config_id，从数据库加载配置
         if 'config_id' in data:
@@ -49,6 +68,7 @@ async def generate_data(request):
                 if not config:
                     raise NotFound(f'配置 {config_id} 不存在')
                 config_yaml = config.config_yaml
+                updated_at = config.updated_at
             finally:
                 db.close()
         # 如果提供了config_yaml，直接使用
@@ -57,40 +77,36 @@ async def generate_data(request):
         else:
             raise BadRequest('必须提供config_id或config_yaml')
         
-        # 解析YAML配置
+        # 解析YAML配置（配置未变化时使用缓存）
         try:
-            config_dict = yaml.safe_load(config_yaml)
+            parsed = config_cache.load(config_yaml, config_id, updated_at)
         except yaml.YAMLError as e:
             raise BadRequest(f'YAML格式错误: {str(e)}')
         
-        # 创建数据生成器
-        generator_config = config_dict.get('generator', {})
-        generator = DataGenerator(generator_config)
-        
-        # 生成数据
-        full_df = generator.generate()
-        history_df = generator.get_history_data()
+        # 获取生成结果（配置未变化时使用缓存，否则在后台进程中生成）
+        result = await get_generation_result(parsed, config_id, updated_at)
         
-        # 转换为JSON格式（只返回前1000行用于预览，避免数据过大）
-        preview_rows = 1000
-        full_preview = full_df.head(preview_rows).to_dict('records')
-        history_preview = history_df.head(preview_rows).to_dict('records')
-        
-        # 获取列名
-        columns = list(full_df.columns)
+        # 列式二进制格式
+        if columnar.wants_columnar(request, data.get('format')):
+            total_rows = len(result.columns['timeStamp'])
+            body = columnar.encode_columns(
+                {col: values[:preview_rows] for col, values in result.columns.items()},
+                metadata={
+                    'total_rows': total_rows,
+                    'history_rows': result.history_points,
+                    'future_rows': total_rows - result.history_points,
+                    'stats': stats_to_dict(result.stats)
+                },
+                precision=precision
+            )
+            return raw(body, content_type=columnar.MIME_TYPE)
         
+        # 只返回前preview_rows行用于预览，避免数据过大
         return json({
             'success': True,
-            'data': {
-                'full_data': full_preview,
-                'history_data': history_preview,
-                'columns': columns,
-                'total_rows': len(full_df),
-                'history_rows': len(history_df),
-                'future_rows': len(full_df) - len(history_df)
-            }
+            'data': get_preview_data(result, preview_rows)
         })
-    except (BadRequest, NotFound) as e:
+    except (BadRequest, NotFound, ServiceUnavailable) as e:
         raise
     except Exception as e:
         import traceback
@@ -106,51 +122,72 @@ async def preview_data(request, config_id: int):
     Args:
         config_id: 配置ID
     
+    Query Parameters:
+        max_points: 最大点数（可选），超过时在服务端按桶取最小值和最大值降采样
+        start: 起始时间戳（秒，可选），只返回该时间之后的数据
+        end: 结束时间戳（秒，可选），只返回该时间之前的数据
+        format: 'json'或'binary'（可选，也可通过Accept请求头指定列式二进制格式）
+        precision: 二进制格式的数值精度，'float64'或'float32'（可选，默认float64）
+    
     Returns:
-        预览数据（JSON格式，返回所有数据点，但只包含数值列）
+        预览数据（JSON格式，默认返回所有数据点，但只包含数值列，附带各列统计）；
+        二进制格式时返回timeStamp列和各数值列，点数统计和各列统计在头部metadata中
     """
     try:
+        # 解析查询参数
+        try:
+            max_points = request.args.get('max_points')
+            max_points = int(max_points) if max_points else None
+            start = request.args.get('start')
+            start = float(start) if start else None
+            end = request.args.get('end')
+            end = float(end) if end else None
+        except ValueError:
+            raise BadRequest('max_points、start和end必须是数字')
+        if max_points is not None and max_points < 2:
+            raise BadRequest('max_points必须大于等于2')
+        precision = request.args.get('precision', 'float64')
+        if precision not in columnar.DTYPES:
+            raise BadRequest(f'不支持的精度: {precision}')
+        
         db: Session = next(get_db())
         try:
             config = db.query(Config).filter(Config.id == config_id).first()
             if not config:
                 raise NotFound(f'配置 {config_id} 不存在')
             config_yaml = config.config_yaml
+            updated_at = config.updated_at
         finally:
             db.close()
         
-        # 解析YAML配置
+        # 解析YAML配置（配置未变化时使用缓存）
         try:
-            config_dict = yaml.safe_load(config_yaml)
+            parsed = config_cache.load(config_yaml, config_id, updated_at)
         except yaml.YAMLError as e:
             raise BadRequest(f'YAML格式错误: {str(e)}')
         
-        # 创建数据生成器
-        generator_config = config_dict.get('generator', {})
-        generator = DataGenerator(generator_config)
-        
-        # 生成数据
-        df = generator.generate()
-        
-        # 转换为图表数据格式
-        # 时间戳列
-        timestamps = df['timeStamp'].tolist()
+        # 获取生成结果（配置未变化时使用缓存，否则在后台进程中生成）
+        result = await get_generation_result(parsed, config_id, updated_at)
         
-        # 数值列数据
-        numeric_columns = [col for col in df.columns if col != 'timeStamp']
-        series_data = {}
-        for col in numeric_columns:
-            series_data[col] = df[col].tolist()
+        # 列式二进制格式
+        if columnar.wants_columnar(request):
+            columns, window_points = select_chart_columns(result, max_points, start, end)
+            body = columnar.encode_columns(
+                columns,
+                metadata={
+                    'total_points': len(result.columns['timeStamp']),
+                    'window_points': window_points,
+                    'stats': stats_to_dict(result.stats)
+                },
+                precision=precision
+            )
+            return raw(body, content_type=columnar.MIME_TYPE)
         
         return json({
             'success': True,
-            'data': {
-                'timestamps': timestamps,
-                'series': series_data,
-                'columns': list(df.columns)
-            }
+            'data': get_chart_data(result, max_points, start, end)
         })
-    except (BadRequest, NotFound) as e:
+    except (BadRequest, NotFound, ServiceUnavailable) as e:
         raise
     except Exception as e:
         import traceback
@@ -7,7 +7,8 @@
 from sanic import Blueprint, json
 from sanic.exceptions import NotFound, BadRequest
 from sqlalchemy.orm import Session
-from webserver.models import get_db, ConfigGroup, Config
+from webserver.models import get_db, ConfigGroup, Config, count_configs
+from webserver.api.pagination import parse_pagination
 import yaml
 
 groups_bp = Blueprint('groups', url_prefix='/api/groups')
@@ -18,15 +19,33 @@ async def list_groups(request):
     """
     获取分组列表
     
+    Query Parameters:
+        limit: 返回数量（可选，不提供时返回全部）
+        offset: 跳过的数量（可选，默认0）
+    
     Returns:
-        分组列表（JSON格式）
+        分组列表（JSON格式），total为分组总数
     """
+    limit, offset = parse_pagination(request)
+    
     db: Session = next(get_db())
     try:
-        groups = db.query(ConfigGroup).order_by(ConfigGroup.created_at.desc()).all()
+        query = db.query(ConfigGroup)
+        total = query.count()
+        
+        query = query.order_by(ConfigGroup.created_at.desc())
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        groups = query.all()
+        
+        # 各分组的配置数用一次GROUP BY查询统计
+        counts = count_configs(db, [group.id for group in groups])
         return json({
             'success': True,
-            'data': [group.to_dict() for group in groups]
+            'data': [group.to_dict(counts.get(group.id, 0)) for group in groups],
+            'total': total
         })
     except Exception as e:
         return json({
@@ -59,7 +78,7 @@ async def get_group(request, group_id: int):
         
         return json({
             'success': True,
-            'data': group.to_dict()
+            'data': group.to_dict(count_configs(db, [group.id]).get(group.id, 0))
         })
     finally:
         db.close()
@@ -113,7 +132,7 @@ async def create_group(request):
             
             return json({
                 'success': True,
-                'data': group.to_dict()
+                'data': group.to_dict(0)
             }, status=201)
         except Exception as e:
             db.rollback()
@@ -193,7 +212,7 @@ async def update_group(request, group_id: int):
             
             return json({
                 'success': True,
-                'data': group.to_dict()
+                'data': group.to_dict(count_configs(db, [group.id]).get(group.id, 0))
             })
         except Exception as e:
             db.rollback()
@@ -0,0 +1,223 @@
+"""
+生成任务API
+
+提供后台数据生成任务的提交、查询、取消和结果下载功能。
+"""
+
+from sanic import Blueprint, json
+from sanic.response import file_stream
+from sanic.exceptions import NotFound, BadRequest
+from sqlalchemy.orm import Session
+from webserver.models import get_db, Config, Job
+from webserver.jobs import job_manager
+from pathlib import Path
+from datetime import datetime
+from utils.yaml_loader import load_yaml
+import yaml
+
+jobs_bp = Blueprint('jobs', url_prefix='/api/jobs')
+
+
+@jobs_bp.post('/')
+async def create_job(request):
+    """
+    提交生成任务
+    
+    Request Body:
+        {
+            "config_id": 配置ID（可选，如果提供则使用数据库中的配置）
+            或
+            "config_yaml": "YAML配置内容"（可选，如果提供则直接使用）,
+            "type": 导出类型（'history'或'full'，默认'full'）
+        }
+    
+    Returns:
+        创建的任务（JSON格式），状态为pending
+    """
+    data = request.json or {}
+    export_type = data.get('type', 'full')
+    if export_type not in ('history', 'full'):
+        raise BadRequest(f'不支持的导出类型: {export_type}')
+    
+    db: Session = next(get_db())
+    try:
+        # 如果提供了config_id，从数据库加载配置
+        if 'config_id' in data:
+            config_id = data['config_id']
+            config = db.query(Config).filter(Config.id == config_id).first()
+            if not config:
+                raise NotFound(f'配置 {config_id} 不存在')
+            config_yaml = config.config_yaml
+            name = config.name
+        # 如果提供了config_yaml，直接使用
+        elif 'config_yaml' in data:
+            config_id = None
+            config_yaml = data['config_yaml']
+            name = data.get('name') or 'config'
+        else:
+            raise BadRequest('必须提供config_id或config_yaml')
+        
+        # 提交前检查YAML格式
+        try:
+            load_yaml(config_yaml)
+        except yaml.YAMLError as e:
+            raise BadRequest(f'YAML格式错误: {str(e)}')
+        
+        job = Job(
+            name=name,
+            config_id=config_id,
+            config_yaml=config_yaml,
+            export_type=export_type
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        
+        try:
+            job_manager.submit(job.id)
+        except Exception:
+            # 提交失败（如排队已满）时不保留任务记录
+            db.delete(job)
+            db.commit()
+            raise
+        
+        return json({
+            'success': True,
+            'data': job.to_dict()
+        }, status=202)
+    finally:
+        db.close()
+
+
+@jobs_bp.get('/')
+async def list_jobs(request):
+    """
+    获取任务列表（按创建时间倒序）
+    
+    Query Parameters:
+        status: 任务状态（可选）
+        limit: 返回数量（默认100）
+    
+    Returns:
+        任务列表（JSON格式）
+    """
+    status = request.args.get('status')
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        raise BadRequest('limit必须是整数')
+    
+    db: Session = next(get_db())
+    try:
+        query = db.query(Job)
+        if status:
+            query = query.filter(Job.status == status)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        return json({
+            'success': True,
+            'data': [job.to_dict() for job in jobs]
+        })
+    finally:
+        db.close()
+
+
+@jobs_bp.get('/<job_id:int>')
+async def get_job(request, job_id: int):
+    """
+    获取任务状态和进度
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        任务详情（JSON格式），包括总进度、各模板进度，完成后包括下载地址
+    """
+    db: Session = next(get_db())
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise NotFound(f'任务 {job_id} 不存在')
+        return json({
+            'success': True,
+            'data': job.to_dict()
+        })
+    finally:
+        db.close()
+
+
+@jobs_bp.delete('/<job_id:int>')
+async def delete_job(request, job_id: int):
+    """
+    取消或删除任务
+    
+    排队中或运行中的任务会被取消；已结束的任务会删除任务记录和结果文件。
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        操作结果（JSON格式）
+    """
+    db: Session = next(get_db())
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise NotFound(f'任务 {job_id} 不存在')
+        
+        if job.status in Job.ACTIVE_STATUSES and job_manager.cancel(job_id):
+            return json({
+                'success': True,
+                'message': '任务已取消'
+            })
+        
+        if job.result_path:
+            Path(job.result_path).unlink(missing_ok=True)
+        db.delete(job)
+        db.commit()
+        return json({
+            'success': True,
+            'message': '任务已删除'
+        })
+    finally:
+        db.close()
+
+
+@jobs_bp.get('/<job_id:int>/download')
+async def download_job_result(request, job_id: int):
+    """
+    下载任务结果CSV文件
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        CSV文件流
+    """
+    db: Session = next(get_db())
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise NotFound(f'任务 {job_id} 不存在')
+        if job.status != Job.STATUS_COMPLETED:
+            raise BadRequest(f'任务 {job_id} 尚未完成（状态: {job.status}）')
+        result_path = job.result_path
+        name = job.name
+        suffix = '_history' if job.export_type == 'history' else ''
+        finished_at = job.finished_at or datetime.now()
+    finally:
+        db.close()
+    
+    if not result_path or not Path(result_path).exists():
+        raise NotFound(f'任务 {job_id} 的结果文件不存在')
+    
+    timestamp = finished_at.strftime('%Y%m%d_%H%M%S')
+    safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    filename = f"{safe_name}_{timestamp}{suffix}.csv"
+    
+    return await file_stream(
+        result_path,
+        mime_type='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        }
+    )
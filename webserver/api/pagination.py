@@ -0,0 +1,41 @@
+"""
+列表分页参数
+
+列表接口通过limit/offset查询参数分页。
+"""
+
+from typing import Optional, Tuple
+
+from sanic.exceptions import BadRequest
+
+MAX_LIMIT = 1000  # 单次最多返回的条数
+
+
+def parse_pagination(request) -> Tuple[Optional[int], int]:
+    """
+    解析分页查询参数
+    
+    Query Parameters:
+        limit: 返回数量（可选，不提供时返回全部，最大MAX_LIMIT）
+        offset: 跳过的数量（可选，默认0）
+    
+    Args:
+        request: Sanic请求对象
+    
+    Returns:
+        (limit, offset)，未指定limit时为None
+    
+    Raises:
+        BadRequest: 参数不是非负整数
+    """
+    try:
+        limit = request.args.get('limit')
+        limit = None if limit in (None, '') else int(limit)
+        offset = int(request.args.get('offset') or 0)
+    except ValueError:
+        raise BadRequest('limit和offset必须是整数')
+    if (limit is not None and limit < 0) or offset < 0:
+        raise BadRequest('limit和offset不能为负数')
+    if limit is not None:
+        limit = min(limit, MAX_LIMIT)
+    return limit, offset
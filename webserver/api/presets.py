@@ -9,13 +9,14 @@ from sanic.exceptions import NotFound, BadRequest
 from sqlalchemy.orm import Session
 from webserver.models import get_db, Config, ConfigGroup
 from pathlib import Path
-import yaml
 import sys
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from webserver.config_cache import config_cache
+
 presets_bp = Blueprint('presets', url_prefix='/api/presets')
 
 
@@ -34,15 +35,13 @@ async def list_preset_files(request):
         if config_dir.exists():
             for file_path in config_dir.glob('*.yaml'):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        # 尝试解析YAML以验证格式
-                        yaml.load(content, Loader=yaml.FullLoader)
-                        
-                        yaml_files.append({
-                            'filename': file_path.name,
-                            'path': str(file_path.relative_to(project_root)),
-                        })
+                    # 尝试解析YAML以验证格式（文件未修改时使用缓存的解析结果）
+                    config_cache.load_file(file_path)
+                    
+                    yaml_files.append({
+                        'filename': file_path.name,
+                        'path': str(file_path.relative_to(project_root)),
+                    })
                 except Exception as e:
                     # 跳过无法解析的文件
                     continue
@@ -105,13 +104,9 @@ async def import_presets(request):
                         skipped_count += 1
                         continue
                     
-                    # 读取YAML文件内容
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        yaml_content = f.read()
-                    
-                    # 验证YAML格式
+                    # 读取并验证YAML文件（列表接口已解析过时直接使用缓存）
                     try:
-                        yaml.load(yaml_content, Loader=yaml.FullLoader)
+                        yaml_content = config_cache.load_file(file_path).yaml_text
                     except Exception as e:
                         errors.append(f'{file_path.name}: YAML格式错误 - {str(e)}')
                         continue
@@ -6,15 +6,20 @@ Sanic Web应用入口
 
 from sanic import Sanic
 from sanic.response import file, json
+from sanic.exceptions import SanicException, ServiceUnavailable
 from pathlib import Path
+import asyncio
 import sys
+import traceback
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from webserver.models import init_db
-from webserver.api import configs, generate, export, groups, presets
+from webserver.workers import worker_pool
+from webserver.jobs import job_manager
+from webserver.api import configs, generate, export, groups, presets, jobs
 
 # 创建Sanic应用
 app = Sanic('DataFactory', strict_slashes=False)
@@ -50,6 +55,7 @@ app.blueprint(generate.generate_bp)
 app.blueprint(export.export_bp)
 app.blueprint(groups.groups_bp)
 app.blueprint(presets.presets_bp)
+app.blueprint(jobs.jobs_bp)
 
 # 调试：打印所有注册的路由
 if __name__ == '__main__':
@@ -102,21 +108,64 @@ async def serve_static(request, path: str):
     return json({'error': '文件不存在'}, status=404)
 
 
+@app.after_server_start
+async def start_job_cleanup(app):
+    """
+    服务器启动后定期删除过期的已结束任务及其结果文件
+    """
+    async def cleanup_jobs():
+        while True:
+            await asyncio.sleep(job_manager.CLEANUP_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(job_manager.cleanup)
+            except Exception:
+                traceback.print_exc()
+    
+    app.add_task(cleanup_jobs(), name='job_cleanup')
+
+
+@app.after_server_stop
+async def shutdown_worker_pool(app):
+    """
+    服务器停止时关闭后台计算进程池
+    """
+    worker_pool.shutdown()
+    job_manager.shutdown()
+
+
+@app.exception(ServiceUnavailable)
+async def handle_service_unavailable(request, exception):
+    """
+    后台计算进程池已满时返回503，客户端应稍后重试
+    
+    Args:
+        request: 请求对象
+        exception: 异常对象
+    """
+    return json({
+        'success': False,
+        'error': str(exception)
+    }, status=503, headers=exception.headers)
+
+
 @app.exception(Exception)
 async def handle_exception(request, exception):
     """
     全局异常处理
     
+    参数错误（BadRequest）、资源不存在（NotFound）等Sanic异常使用其自身的状态码，其他异常返回500。
+    
     Args:
         request: 请求对象
         exception: 异常对象
     """
     import traceback
     traceback.print_exc()
+    status = exception.status_code if isinstance(exception, SanicException) else 500
     return json({
         'success': False,
         'error': str(exception)
-    }, status=500)
+    }, status=status)
 
 
 def run_server(host='0.0.0.0', port=8000, debug=False):
@@ -131,6 +180,9 @@ def run_server(host='0.0.0.0', port=8000, debug=False):
     # 初始化数据库
     init_db()
     
+    # 上次运行中未结束的任务已无法继续，标记为失败
+    job_manager.recover()
+    
     # 运行服务器（Windows上使用单进程模式）
     app.run(host=host, port=port, debug=debug, single_process=True)
 
@@ -0,0 +1,181 @@
+"""
+解析后的配置缓存
+
+配置内容不变时不再重复解析YAML和加载模板（模板加载时会验证配置、编译表达式）：
+- 数据库中的配置按(配置ID, updated_at)缓存
+- 配置文件按(路径, 修改时间, 文件大小)缓存
+- 直接提交的YAML内容按内容哈希缓存
+
+缓存的配置字典在多个请求之间共享，使用时不要修改。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import sys
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.generators.data_generator import DataGenerator
+from utils.yaml_loader import load_yaml
+from webserver.result_cache import ResultCache
+
+
+class ParsedConfig:
+    """
+    解析后的配置
+    
+    Attributes:
+        yaml_text: YAML配置内容
+        config: 配置字典
+    """
+    
+    def __init__(self, yaml_text: str):
+        """
+        解析YAML配置
+        
+        Args:
+            yaml_text: YAML配置内容
+        
+        Raises:
+            yaml.YAMLError: YAML格式错误
+            ValueError: 配置内容不是字典
+        """
+        config = load_yaml(yaml_text)
+        if config is None:
+            config = {}
+        if not isinstance(config, dict):
+            raise ValueError("配置内容必须是YAML字典")
+        
+        self.yaml_text = yaml_text
+        self.config = config
+        self._result_key: Optional[str] = None
+        self._generator: Optional[DataGenerator] = None
+    
+    @property
+    def generator_config(self) -> Dict[str, Any]:
+        """生成器配置字典"""
+        return self.config.get('generator', {})
+    
+    @property
+    def template_config(self) -> Dict[str, Any]:
+        """输出模板配置字典"""
+        return self.config.get('template', {})
+    
+    @property
+    def result_key(self) -> str:
+        """生成结果的缓存键"""
+        if self._result_key is None:
+            self._result_key = ResultCache.make_key(self.generator_config)
+        return self._result_key
+    
+    def create_generator(self) -> DataGenerator:
+        """
+        创建数据生成器
+        
+        第一次调用时加载（并验证）模板，之后的生成器共享已加载的模板。
+        
+        Returns:
+            新的数据生成器
+        
+        Raises:
+            ValueError: 生成器配置无效
+        """
+        if self._generator is None:
+            self._generator = DataGenerator(self.generator_config)
+        return self._generator.copy()
+
+
+class ConfigCache:
+    """
+    解析后的配置缓存（LRU）
+    """
+    
+    DEFAULT_MAX_ENTRIES = 256  # 默认最多缓存的配置数
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        初始化配置缓存
+        
+        Args:
+            max_entries: 最多缓存的配置数（可选）
+        """
+        self.max_entries = max_entries or self.DEFAULT_MAX_ENTRIES
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, ParsedConfig]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def load(self, yaml_text: str,
+             config_id: Optional[int] = None,
+             updated_at: Optional[datetime] = None) -> ParsedConfig:
+        """
+        获取解析后的配置
+        
+        Args:
+            yaml_text: YAML配置内容
+            config_id: 配置ID（可选，提供时按配置ID和更新时间缓存）
+            updated_at: 配置更新时间（可选）
+        
+        Returns:
+            解析后的配置
+        
+        Raises:
+            yaml.YAMLError: YAML格式错误
+            ValueError: 配置内容不是字典
+        """
+        if config_id is not None:
+            # 同时比较内容，避免更新时间相同但内容不同时使用旧配置
+            key, version = ('config', config_id), (updated_at, yaml_text)
+        else:
+            key, version = ('yaml', hashlib.sha256(yaml_text.encode('utf-8')).hexdigest()), None
+        return self._lookup(key, version, lambda: ParsedConfig(yaml_text))
+    
+    def load_file(self, path: Path) -> ParsedConfig:
+        """
+        获取解析后的配置文件
+        
+        Args:
+            path: YAML配置文件路径
+        
+        Returns:
+            解析后的配置
+        
+        Raises:
+            OSError: 文件读取失败
+            yaml.YAMLError: YAML格式错误
+            ValueError: 配置内容不是字典
+        """
+        path = Path(path)
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        return self._lookup(('file', str(path.resolve())), version,
+                            lambda: ParsedConfig(path.read_text(encoding='utf-8')))
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def _lookup(self, key: Hashable, version: Any, parse: Callable[[], ParsedConfig]) -> ParsedConfig:
+        """版本相同时返回缓存的配置，否则重新解析并替换旧版本"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        
+        parsed = parse()
+        with self._lock:
+            self._entries[key] = (version, parsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return parsed
+
+
+# 全局配置缓存
+config_cache = ConfigCache()
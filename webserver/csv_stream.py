@@ -0,0 +1,182 @@
+"""
+CSV流式输出
+
+导出时边生成边格式化边发送，不写临时文件：
+表头行先发送，之后每块数据格式化后立即发送，可选实时gzip压缩。
+
+- 结果已缓存时，从缓存的列数据逐块格式化
+- 未缓存时，在后台进程中使用DataGenerator.generate_chunks流式生成并格式化，
+  编码后的字节块通过管道传回服务进程发送（见workers.iter_generated_csv）
+- 批量导出时多个CSV写入同一个流式ZIP文件
+"""
+
+import asyncio
+import zipfile
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import pandas as pd
+
+from core.generators.data_generator import DataGenerator
+from template.template_manager import TemplateManager
+from output.data_exporter import DataExporter
+from webserver.result_cache import CachedResult
+
+STREAM_CHUNK_SIZE = 10000  # 每次格式化和发送的行数
+GZIP_WBITS = 31  # zlib输出gzip格式
+GZIP_LEVEL = 6
+
+
+def iter_result_chunks(result: CachedResult, export_type: str) -> Iterator[pd.DataFrame]:
+    """
+    从缓存的生成结果逐块读取数据
+    
+    Args:
+        result: 生成结果
+        export_type: 导出类型（'history'或'full'）
+    
+    Yields:
+        DataFrame块
+    """
+    df = pd.DataFrame(result.columns, copy=False)
+    if export_type == 'history':
+        df = df.iloc[:result.history_points]
+    for start in range(0, max(len(df), 1), STREAM_CHUNK_SIZE):
+        yield df.iloc[start:start + STREAM_CHUNK_SIZE]
+
+
+def iter_generated_chunks(generator: DataGenerator, export_type: str) -> Iterator[pd.DataFrame]:
+    """
+    流式生成数据并逐块返回
+    
+    Args:
+        generator: 数据生成器
+        export_type: 导出类型（'history'或'full'）
+    
+    Yields:
+        DataFrame块
+    """
+    output_points = generator.history_points if export_type == 'history' else generator.total_points
+    written = 0
+    for chunk in generator.generate_chunks(chunk_size=STREAM_CHUNK_SIZE):
+        chunk = chunk.iloc[:output_points - written]
+        written += len(chunk)
+        yield chunk
+        if written >= output_points:
+            break
+
+
+def iter_csv_bytes(chunks: Iterator[pd.DataFrame], template_config: Dict[str, Any],
+                   compress: bool = False) -> Iterator[bytes]:
+    """
+    把数据块格式化为CSV字节流
+    
+    Args:
+        chunks: DataFrame块
+        template_config: 输出模板配置字典
+        compress: 是否gzip压缩
+    
+    Yields:
+        CSV字节（压缩时为gzip字节）
+    """
+    exporter = DataExporter(TemplateManager(template_config))
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS) if compress else None
+    
+    for text in exporter.iter_csv(chunks):
+        data = text.encode('utf-8')
+        if compressor is not None:
+            # 每块都刷新压缩缓冲区，保证客户端能持续收到数据
+            data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    
+    if compressor is not None:
+        yield compressor.flush()
+
+
+class _StreamBuffer:
+    """
+    只写缓冲区，供ZipFile写入，调用方随时取出已写入的字节
+    
+    不支持seek和tell，ZipFile会按不可定位的流写入（文件大小记录在数据描述符中）。
+    """
+    
+    def __init__(self):
+        self._parts: List[bytes] = []
+    
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def take(self) -> bytes:
+        """取出并清空已写入的字节"""
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ZipStream:
+    """
+    流式ZIP写入器
+    
+    成员文件逐块压缩写入，每写入一块即可取出压缩后的字节发送，
+    整个ZIP文件不需要保存在内存或磁盘中。
+    """
+    
+    def __init__(self):
+        self._buffer = _StreamBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, 'w', compression=zipfile.ZIP_DEFLATED,
+                                    compresslevel=GZIP_LEVEL)
+    
+    def iter_member(self, name: str, blocks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        写入一个成员文件
+        
+        Args:
+            name: 成员文件名
+            blocks: 成员文件内容（字节块）
+        
+        Yields:
+            ZIP文件字节
+        """
+        # 写入前不知道文件大小，使用ZIP64避免超过4GB时出错
+        with self._zip.open(name, 'w', force_zip64=True) as member:
+            for block in blocks:
+                member.write(block)
+                data = self._buffer.take()
+                if data:
+                    yield data
+        data = self._buffer.take()
+        if data:
+            yield data
+    
+    def close(self) -> bytes:
+        """
+        写入ZIP目录并结束
+        
+        Returns:
+            剩余的ZIP文件字节
+        """
+        self._zip.close()
+        return self._buffer.take()
+
+
+async def iterate_in_thread(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """
+    在线程中逐项执行同步迭代器，避免格式化和生成阻塞事件循环
+    
+    Args:
+        iterator: 同步迭代器
+    
+    Yields:
+        迭代器的每一项
+    """
+    finished = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, finished)
+        if item is finished:
+            return
+        yield item
@@ -0,0 +1,343 @@
+"""
+后台生成任务
+
+大数据量的生成和导出以任务方式提交：任务记录保存在jobs表中，
+在独立的进程池中执行，执行过程中把进度写回数据库，
+结束后结果CSV文件可通过下载接口获取。
+已结束的任务超过保留时间或数量上限后自动删除记录和结果文件。
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from template.template_manager import TemplateManager
+from output.data_exporter import DataExporter
+from webserver.models import SessionLocal, Job
+from webserver.workers import WorkerPool
+from webserver.config_cache import config_cache
+from utils.logger import get_logger
+
+# 任务结果文件目录
+JOB_RESULT_DIR = Path(tempfile.gettempdir()) / 'data_factory_jobs'
+
+
+class JobCancelled(Exception):
+    """任务在执行过程中被取消"""
+
+
+class JobProgressReporter:
+    """
+    任务进度记录器（在子进程中使用）
+    
+    按时间间隔把各模板进度写回数据库，同时检查任务是否已被取消。
+    """
+    
+    REPORT_INTERVAL = 0.5  # 写回进度的最小时间间隔（秒）
+    
+    def __init__(self, job_id: int, output_points: int):
+        """
+        初始化进度记录器
+        
+        Args:
+            job_id: 任务ID
+            output_points: 实际输出的点数（历史数据任务小于生成的总点数）
+        """
+        self.job_id = job_id
+        self.output_points = output_points
+        self.template_progress: Dict[str, float] = {}
+        self._last_report = 0.0
+    
+    def update(self, template_name: str, generated_points: int, total_points: int) -> None:
+        """
+        更新模板进度（DataGenerator.generate_chunks的进度回调）
+        
+        Args:
+            template_name: 模板名称
+            generated_points: 该模板已生成点数
+            total_points: 总点数
+        
+        Raises:
+            JobCancelled: 任务已被取消
+        """
+        self.template_progress[template_name] = min(generated_points / self.output_points, 1.0)
+        now = time.monotonic()
+        if now - self._last_report >= self.REPORT_INTERVAL:
+            self._last_report = now
+            self.report()
+    
+    def report(self) -> None:
+        """
+        把当前进度写回数据库
+        
+        Raises:
+            JobCancelled: 任务已被取消
+        """
+        progress = min(self.template_progress.values()) if self.template_progress else 0.0
+        db = SessionLocal()
+        try:
+            updated = db.query(Job).filter(
+                Job.id == self.job_id,
+                Job.status == Job.STATUS_RUNNING
+            ).update({
+                'progress': progress,
+                'template_progress': json.dumps(self.template_progress, ensure_ascii=False)
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        
+        if not updated:
+            raise JobCancelled()
+
+
+def _finish_job(job_id: int, values: Dict, from_statuses=Job.ACTIVE_STATUSES) -> bool:
+    """
+    结束任务（只更新仍处于指定状态的任务，避免覆盖取消操作）
+    
+    Args:
+        job_id: 任务ID
+        values: 要更新的字段
+        from_statuses: 允许更新的原状态
+    
+    Returns:
+        是否更新成功
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(Job).filter(
+            Job.id == job_id,
+            Job.status.in_(from_statuses)
+        ).update(dict(values, finished_at=datetime.now()), synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def run_generation_job(job_id: int) -> None:
+    """
+    执行生成任务（在子进程中执行）
+    
+    流式生成数据并逐块写入结果文件，任务被取消时删除未完成的文件。
+    
+    Args:
+        job_id: 任务ID
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(Job).filter(
+            Job.id == job_id,
+            Job.status == Job.STATUS_PENDING
+        ).update({'status': Job.STATUS_RUNNING, 'started_at': datetime.now()}, synchronize_session=False)
+        db.commit()
+        if not updated:
+            # 任务已被取消或删除
+            return
+        job = db.query(Job).filter(Job.id == job_id).first()
+        config_yaml = job.config_yaml
+        export_type = job.export_type
+    finally:
+        db.close()
+    
+    result_file = JOB_RESULT_DIR / f'job_{job_id}.csv'
+    try:
+        # 子进程会执行多个任务，相同配置的任务复用解析结果和已加载的模板
+        parsed = config_cache.load(config_yaml)
+        generator = parsed.create_generator()
+        output_points = generator.history_points if export_type == 'history' else generator.total_points
+        reporter = JobProgressReporter(job_id, max(output_points, 1))
+        
+        def output_chunks():
+            written = 0
+            for chunk in generator.generate_chunks(progress_callback=reporter.update):
+                chunk = chunk.iloc[:output_points - written]
+                written += len(chunk)
+                yield chunk
+                if written >= output_points:
+                    break
+        
+        exporter = DataExporter(TemplateManager(parsed.template_config))
+        exporter.export_chunks(output_chunks(), str(result_file), add_timestamp=False)
+    except JobCancelled:
+        result_file.unlink(missing_ok=True)
+        return
+    except Exception as e:
+        result_file.unlink(missing_ok=True)
+        _finish_job(job_id, {'status': Job.STATUS_FAILED, 'error': str(e)}, (Job.STATUS_RUNNING,))
+        return
+    
+    template_progress = {name: 1.0 for name in reporter.template_progress}
+    if not _finish_job(job_id, {
+        'status': Job.STATUS_COMPLETED,
+        'progress': 1.0,
+        'template_progress': json.dumps(template_progress, ensure_ascii=False),
+        'total_rows': output_points,
+        'result_path': str(result_file)
+    }, (Job.STATUS_RUNNING,)):
+        # 完成前已被取消
+        result_file.unlink(missing_ok=True)
+
+
+class JobManager:
+    """
+    任务管理器（在服务进程中使用）
+    
+    负责提交、取消任务，以及处理子进程异常退出等无法在子进程中记录的失败。
+    """
+    
+    MAX_QUEUED_JOBS = 256  # 最多同时排队和运行的任务数
+    RESULT_TTL_SECONDS = 24 * 3600  # 已结束任务的保留时间（秒）
+    MAX_FINISHED_JOBS = 100  # 最多保留的已结束任务数
+    CLEANUP_INTERVAL_SECONDS = 3600  # 定期清理过期任务的间隔（秒）
+    
+    def __init__(self, pool: Optional[WorkerPool] = None, max_workers: Optional[int] = None):
+        """
+        初始化任务管理器
+        
+        Args:
+            pool: 执行任务的进程池（可选，默认创建独立的进程池）
+            max_workers: 独立进程池的进程数（可选，默认CPU核数的一半，至少为1；
+                其余CPU留给预览和导出使用的进程池）
+        """
+        if pool is None:
+            max_workers = max_workers or self.default_max_workers()
+            pool = WorkerPool(max_workers=max_workers, max_pending=self.MAX_QUEUED_JOBS)
+        self.pool = pool
+        self.logger = get_logger()
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, job_id: int) -> None:
+        """
+        提交任务到进程池
+        
+        Args:
+            job_id: 任务ID（任务记录需已创建，状态为pending）
+        
+        Raises:
+            ServiceUnavailable: 排队任务数已达上限
+        """
+        JOB_RESULT_DIR.mkdir(parents=True, exist_ok=True)
+        future = self.pool.submit(run_generation_job, job_id)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+    
+    @staticmethod
+    def default_max_workers() -> int:
+        """默认任务进程数（CPU核数的一半，至少为1）"""
+        return max((os.cpu_count() or 1) // 2, 1)
+    
+    def cancel(self, job_id: int) -> bool:
+        """
+        取消任务
+        
+        排队中的任务直接从进程池中移除；运行中的任务在下一次写回进度时停止。
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            任务是否处于排队或运行状态（即取消是否生效）
+        """
+        cancelled = _finish_job(job_id, {'status': Job.STATUS_CANCELLED})
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return cancelled
+    
+    def _on_done(self, job_id: int, future: Future) -> None:
+        """
+        任务结束回调：子进程异常退出时把任务标记为失败
+        """
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"任务 {job_id} 执行失败: {error}")
+            _finish_job(job_id, {'status': Job.STATUS_FAILED, 'error': str(error)})
+    
+    def recover(self) -> None:
+        """
+        服务启动时把上次未结束的任务标记为失败
+        """
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.status.in_(Job.ACTIVE_STATUSES)).update({
+                'status': Job.STATUS_FAILED,
+                'error': '服务重启，任务已中断',
+                'finished_at': datetime.now()
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.cleanup()
+    
+    def cleanup(self) -> int:
+        """
+        删除过期的已结束任务（会访问数据库和文件系统，不要在事件循环中直接调用）
+        
+        结束时间超过RESULT_TTL_SECONDS的任务，以及超出MAX_FINISHED_JOBS的较早任务，
+        删除任务记录和结果文件；结果目录中不属于任何任务的过期文件（如服务异常退出时遗留的文件）也一并删除。
+        
+        Returns:
+            删除的任务数
+        """
+        expire_before = datetime.now() - timedelta(seconds=self.RESULT_TTL_SECONDS)
+        db = SessionLocal()
+        try:
+            finished = db.query(Job).filter(Job.status.notin_(Job.ACTIVE_STATUSES))
+            expired = finished.filter(Job.finished_at < expire_before).all()
+            expired_ids = {job.id for job in expired}
+            expired += [
+                job for job in finished.order_by(Job.id.desc()).offset(self.MAX_FINISHED_JOBS).all()
+                if job.id not in expired_ids
+            ]
+            for job in expired:
+                if job.result_path:
+                    Path(job.result_path).unlink(missing_ok=True)
+                db.delete(job)
+            db.commit()
+            
+            # 遗留的结果文件
+            kept_files = {
+                Path(path).name for (path,) in db.query(Job.result_path).filter(Job.result_path.isnot(None))
+            }
+        finally:
+            db.close()
+        
+        if JOB_RESULT_DIR.exists():
+            expire_timestamp = expire_before.timestamp()
+            for result_file in JOB_RESULT_DIR.iterdir():
+                try:
+                    if result_file.name not in kept_files and result_file.stat().st_mtime < expire_timestamp:
+                        result_file.unlink()
+                except OSError:
+                    pass
+        
+        if expired:
+            self.logger.info(f"已删除{len(expired)}个过期任务")
+        return len(expired)
+    
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        self.pool.shutdown()
+
+
+# 全局任务管理器
+job_manager = JobManager()
@@ -5,19 +5,42 @@
 """
 
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
+import json
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event, func, Column, Index, Integer, String, Text, DateTime, Float, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
 from pathlib import Path
 
 # 数据库路径
 DB_PATH = Path(__file__).parent / 'database.db'
 DATABASE_URL = f'sqlite:///{DB_PATH}'
 
+# 每个连接建立时设置的SQLite参数
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),      # 读写互不阻塞（Web界面读取时导入脚本可以写入）
+    ('synchronous', 'NORMAL'),    # WAL模式下足够安全，写入不再每次fsync
+    ('busy_timeout', 5000),       # 数据库被锁定时等待5秒再报错
+    ('cache_size', -16000),       # 页缓存16MB
+    ('temp_store', 'MEMORY'),     # 排序等临时数据放在内存中
+)
+
 # 创建数据库引擎
 engine = create_engine(DATABASE_URL, connect_args={'check_same_thread': False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+@event.listens_for(engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """新连接建立时设置SQLite参数"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
 Base = declarative_base()
 
 
@@ -38,10 +61,13 @@ class ConfigGroup(Base):
     # 关联配置
     configs = relationship('Config', back_populates='group', cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, config_count: int):
         """
         转换为字典格式
         
+        Args:
+            config_count: 分组内的配置数（由调用方通过count_configs一次查询所有分组的数量）
+        
         Returns:
             分组字典
         """
@@ -51,7 +77,7 @@ class ConfigGroup(Base):
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'config_count': len(self.configs) if self.configs else 0
+            'config_count': config_count
         }
 
 
@@ -62,9 +88,12 @@ class Config(Base):
     存储数据生成的YAML配置。
     """
     __tablename__ = 'configs'
+    __table_args__ = (
+        Index('ix_configs_group_id_name', 'group_id', 'name'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False, comment='配置名称')
+    name = Column(String(255), nullable=False, index=True, comment='配置名称')
     description = Column(Text, comment='配置描述')
     config_yaml = Column(Text, nullable=False, comment='YAML配置内容')
     group_id = Column(Integer, ForeignKey('config_groups.id'), nullable=True, comment='分组ID')
@@ -75,34 +104,144 @@ class Config(Base):
     # 关联分组
     group = relationship('ConfigGroup', back_populates='configs')
     
-    def to_dict(self):
+    def to_dict(self, include_yaml: bool = True):
         """
         转换为字典格式
         
+        Args:
+            include_yaml: 是否包含YAML配置内容（列表接口不包含，查询时可延迟加载该列）
+        
         Returns:
             配置字典
         """
-        return {
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description or '',
-            'config_yaml': self.config_yaml,
             'group_id': self.group_id,
             'group_name': self.group.name if self.group else None,
             'user': self.user,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_yaml:
+            data['config_yaml'] = self.config_yaml
+        return data
+
+
+class Job(Base):
+    """
+    生成任务模型
+    
+    存储后台数据生成任务的状态、进度和结果文件。
+    """
+    __tablename__ = 'jobs'
+    
+    # 任务状态
+    STATUS_PENDING = 'pending'        # 排队中
+    STATUS_RUNNING = 'running'        # 运行中
+    STATUS_COMPLETED = 'completed'    # 已完成
+    STATUS_FAILED = 'failed'          # 失败
+    STATUS_CANCELLED = 'cancelled'    # 已取消
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False, comment='任务名称（配置名称）')
+    config_id = Column(Integer, nullable=True, comment='配置ID（使用YAML直接提交时为空）')
+    config_yaml = Column(Text, nullable=False, comment='提交时的YAML配置内容')
+    export_type = Column(String(20), nullable=False, default='full', comment='导出类型（history或full）')
+    status = Column(String(20), nullable=False, default=STATUS_PENDING, index=True, comment='任务状态')
+    progress = Column(Float, nullable=False, default=0.0, comment='总进度（0~1）')
+    template_progress = Column(Text, comment='各模板进度（JSON）')
+    total_rows = Column(Integer, comment='输出行数')
+    result_path = Column(String(1024), comment='结果文件路径')
+    error = Column(Text, comment='错误信息')
+    created_at = Column(DateTime, default=datetime.now, comment='创建时间')
+    started_at = Column(DateTime, comment='开始时间')
+    finished_at = Column(DateTime, comment='结束时间')
+    
+    def to_dict(self):
+        """
+        转换为字典格式
+        
+        Returns:
+            任务字典（不包含YAML配置内容）
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'config_id': self.config_id,
+            'export_type': self.export_type,
+            'status': self.status,
+            'progress': self.progress,
+            'template_progress': json.loads(self.template_progress) if self.template_progress else {},
+            'total_rows': self.total_rows,
+            'error': self.error,
+            'download_url': f'/api/jobs/{self.id}/download' if self.status == self.STATUS_COMPLETED else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+def count_configs(db: Session, group_ids: Optional[list] = None) -> Dict[int, int]:
+    """
+    统计各分组的配置数（一次GROUP BY查询）
+    
+    Args:
+        db: 数据库会话
+        group_ids: 分组ID列表（可选，不提供时统计所有分组）
+    
+    Returns:
+        分组ID到配置数的映射（没有配置的分组不在其中）
+    """
+    query = db.query(Config.group_id, func.count(Config.id)).group_by(Config.group_id)
+    if group_ids is not None:
+        query = query.filter(Config.group_id.in_(group_ids))
+    return {group_id: count for group_id, count in query if group_id is not None}
+
+
+def unique_config_name(db: Session, name: str) -> str:
+    """
+    获取不重复的配置名称
+    
+    名称已存在时依次尝试name_1、name_2……，返回第一个未被使用的名称。
+    已使用的名称用一次前缀范围查询取出（可以使用name索引），不再逐个后缀查询。
+    
+    Args:
+        db: 数据库会话
+        name: 原始配置名称
+    
+    Returns:
+        不重复的配置名称
+    """
+    prefix = f'{name}_'
+    rows = db.query(Config.name).filter(
+        (Config.name == name) | ((Config.name >= prefix) & (Config.name < prefix + '\U0010ffff'))
+    )
+    used = {row.name for row in rows}
+    
+    final_name = name
+    counter = 1
+    while final_name in used:
+        final_name = f'{prefix}{counter}'
+        counter += 1
+    return final_name
 
 
 def init_db():
     """
     初始化数据库
     
-    创建所有表结构，并创建默认分组。
+    创建所有表结构和索引，并创建默认分组。
     """
     Base.metadata.create_all(bind=engine)
     
+    # 已有数据库的表不会被create_all修改，补建后来增加的索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
     # 创建默认分组（已删除）
     db = SessionLocal()
     try:
@@ -0,0 +1,284 @@
+"""
+生成结果缓存
+
+按规范化后的生成器配置（包含seed）的哈希缓存生成结果，
+配置内容不变时预览和导出不再重复生成数据。
+
+- 内存层：LRU，按字节数淘汰
+- 磁盘层：每个结果一个目录，每列一个.npy文件，按字节数淘汰最久未使用的结果
+  （各列统计保存在meta.json中，读取缓存时不再重新计算）
+- 同一配置的updated_at变化且内容变化时，旧版本的缓存立即删除
+"""
+
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.statistics import ColumnStats, compute_stats, stats_to_dict
+
+
+class CachedResult:
+    """
+    缓存的生成结果
+    
+    Attributes:
+        columns: 列名到数据数组的映射（保持DataFrame列顺序，包含timeStamp列）
+        history_points: 历史数据点数
+        stats: 各数值列的统计（不包含timeStamp列）
+    """
+    
+    __slots__ = ('columns', 'history_points', 'stats')
+    
+    def __init__(self, columns: Dict[str, np.ndarray], history_points: int,
+                 stats: Optional[Dict[str, ColumnStats]] = None):
+        self.columns = columns
+        self.history_points = history_points
+        self.stats = stats if stats is not None else compute_stats(columns)
+    
+    @property
+    def nbytes(self) -> int:
+        """数据占用的字节数"""
+        return sum(values.nbytes for values in self.columns.values())
+
+
+class ResultCache:
+    """
+    生成结果缓存（内存LRU + 磁盘）
+    """
+    
+    CACHE_VERSION = 2  # 缓存格式版本，生成逻辑或存储格式变化时递增
+    DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024  # 内存层上限
+    DEFAULT_MAX_DISK_BYTES = 2 * 1024 * 1024 * 1024  # 磁盘层上限
+    META_FILE = 'meta.json'
+    
+    def __init__(self,
+                 cache_dir: Optional[Path] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 max_disk_bytes: Optional[int] = None):
+        """
+        初始化结果缓存
+        
+        Args:
+            cache_dir: 磁盘缓存目录（可选，默认系统临时目录下的data_factory_cache）
+            max_memory_bytes: 内存层字节数上限（可选）
+            max_disk_bytes: 磁盘层字节数上限（可选，0表示不使用磁盘层）
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(tempfile.gettempdir()) / 'data_factory_cache'
+        self.max_memory_bytes = self.DEFAULT_MAX_MEMORY_BYTES if max_memory_bytes is None else max_memory_bytes
+        self.max_disk_bytes = self.DEFAULT_MAX_DISK_BYTES if max_disk_bytes is None else max_disk_bytes
+        self.logger = get_logger()
+        
+        self._memory: 'OrderedDict[str, CachedResult]' = OrderedDict()
+        self._memory_bytes = 0
+        self._config_versions: Dict[int, Tuple[Any, str]] = {}
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def is_cacheable(generator_config: Dict[str, Any]) -> bool:
+        """
+        判断生成结果是否可以缓存
+        
+        只有指定了seed的配置结果可重复，才能缓存；未指定seed时每次生成都应得到新的随机数据，
+        缓存会让同一配置在每次请求（甚至服务重启后从磁盘层读取）时都返回同一份数据。
+        
+        Args:
+            generator_config: 生成器配置字典
+        
+        Returns:
+            是否可以缓存
+        """
+        return generator_config.get('seed') is not None
+    
+    @classmethod
+    def make_key(cls, generator_config: Dict[str, Any]) -> str:
+        """
+        计算生成器配置的缓存键
+        
+        配置按键排序后序列化，与YAML中的书写顺序、空白和注释无关。
+        未指定seed的配置也能计算缓存键（用于复用已加载的生成器），但结果不写入缓存，见is_cacheable。
+        
+        Args:
+            generator_config: 生成器配置字典（包含seed）
+        
+        Returns:
+            缓存键（十六进制哈希）
+        """
+        normalized = json.dumps(
+            {'version': cls.CACHE_VERSION, 'generator': generator_config},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def track_config(self, config_id: int, updated_at: Optional[datetime], key: str) -> None:
+        """
+        记录配置当前版本对应的缓存键
+        
+        配置的updated_at变化且缓存键变化时，删除旧版本的缓存。
+        
+        Args:
+            config_id: 配置ID
+            updated_at: 配置更新时间
+            key: 当前版本的缓存键
+        """
+        with self._lock:
+            previous = self._config_versions.get(config_id)
+            self._config_versions[config_id] = (updated_at, key)
+        if previous is not None and previous[0] != updated_at and previous[1] != key:
+            self.invalidate(previous[1])
+    
+    def get(self, key: str) -> Optional[CachedResult]:
+        """
+        获取缓存结果（先查内存层，再查磁盘层）
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            缓存结果，不存在时返回None
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                return result
+        
+        result = self._load(key)
+        if result is not None:
+            self._put_memory(key, result)
+        return result
+    
+    def put(self, key: str, result: CachedResult) -> None:
+        """
+        写入缓存（内存层和磁盘层）
+        
+        Args:
+            key: 缓存键
+            result: 生成结果
+        """
+        self._put_memory(key, result)
+        if self.max_disk_bytes > 0:
+            try:
+                self._save(key, result)
+            except OSError as e:
+                self.logger.warning(f"写入结果缓存失败: {e}")
+    
+    def invalidate(self, key: str) -> None:
+        """
+        删除缓存结果
+        
+        Args:
+            key: 缓存键
+        """
+        with self._lock:
+            result = self._memory.pop(key, None)
+            if result is not None:
+                self._memory_bytes -= result.nbytes
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+    
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._config_versions.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+    
+    def _put_memory(self, key: str, result: CachedResult) -> None:
+        """写入内存层并按字节数淘汰最久未使用的结果"""
+        nbytes = result.nbytes
+        if nbytes > self.max_memory_bytes:
+            return
+        # 缓存结果在多个请求之间共享，禁止修改
+        for values in result.columns.values():
+            values.flags.writeable = False
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.nbytes
+            self._memory[key] = result
+            self._memory_bytes += nbytes
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.nbytes
+    
+    def _load(self, key: str) -> Optional[CachedResult]:
+        """从磁盘层读取结果"""
+        result_dir = self.cache_dir / key
+        meta_file = result_dir / self.META_FILE
+        if not meta_file.exists():
+            return None
+        try:
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
+            columns = {
+                name: np.load(result_dir / f'{index}.npy', allow_pickle=False)
+                for index, name in enumerate(meta['columns'])
+            }
+            stats = None
+            if 'stats' in meta:
+                stats = {name: ColumnStats.from_dict(data) for name, data in meta['stats'].items()}
+            # 更新访问时间，用于磁盘层淘汰
+            os.utime(result_dir)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"读取结果缓存失败，已删除: {e}")
+            shutil.rmtree(result_dir, ignore_errors=True)
+            return None
+        return CachedResult(columns, meta['history_points'], stats)
+    
+    def _save(self, key: str, result: CachedResult) -> None:
+        """写入磁盘层（先写临时目录再重命名，避免读到不完整的结果）"""
+        result_dir = self.cache_dir / key
+        if result_dir.exists():
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix=f'.{key}.', dir=self.cache_dir))
+        try:
+            for index, values in enumerate(result.columns.values()):
+                np.save(temp_dir / f'{index}.npy', np.ascontiguousarray(values), allow_pickle=False)
+            meta = {
+                'columns': list(result.columns),
+                'history_points': result.history_points,
+                'stats': stats_to_dict(result.stats)
+            }
+            (temp_dir / self.META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+            os.replace(temp_dir, result_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not result_dir.exists():
+                raise
+            return
+        self._evict_disk()
+    
+    def _evict_disk(self) -> None:
+        """按字节数淘汰磁盘层中最久未使用的结果"""
+        entries = []
+        total_bytes = 0
+        for result_dir in self.cache_dir.iterdir():
+            if not result_dir.is_dir() or result_dir.name.startswith('.'):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in result_dir.iterdir())
+                entries.append((result_dir.stat().st_mtime, size, result_dir))
+            except OSError:
+                # 已被其他请求删除
+                continue
+            total_bytes += size
+        
+        for _, size, result_dir in sorted(entries):
+            if total_bytes <= self.max_disk_bytes:
+                break
+            shutil.rmtree(result_dir, ignore_errors=True)
+            total_bytes -= size
+
+
+# 全局结果缓存
+result_cache = ResultCache()
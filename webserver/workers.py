@@ -0,0 +1,422 @@
+"""
+后台计算进程池
+
+数据生成是CPU密集型任务，放在独立进程中执行，
+避免阻塞Sanic事件循环。进程池有排队上限，队列满时返回503。
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sanic.exceptions import ServiceUnavailable
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.generators.data_generator import DataGenerator
+from webserver.result_cache import CachedResult, ResultCache, result_cache
+from webserver.config_cache import ParsedConfig
+from webserver.csv_stream import iter_generated_chunks, iter_csv_bytes
+from utils.downsampling import minmax_downsample, window_slice
+from utils.statistics import stats_to_dict
+
+
+class WorkerPool:
+    """
+    后台计算进程池
+    
+    - 进程数默认等于CPU核数
+    - 同时提交（运行中+排队中）的任务数不超过max_pending，超过时抛出ServiceUnavailable
+    - 进程池在第一次提交任务时创建，进程异常退出后自动重建
+    """
+    
+    PENDING_PER_WORKER = 2  # 默认每个进程允许的任务数（运行中+排队中）
+    RETRY_AFTER_SECONDS = 5  # 503响应建议的重试间隔（秒）
+    
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        初始化进程池
+        
+        Args:
+            max_workers: 进程数（可选，默认CPU核数）
+            max_pending: 最大任务数（可选，默认max_workers * PENDING_PER_WORKER）
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * self.PENDING_PER_WORKER
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def pending(self) -> int:
+        """当前任务数（运行中+排队中）"""
+        return self._pending
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """获取进程池（不存在时创建）"""
+        with self._lock:
+            if self._executor is None:
+                # 使用spawn启动子进程，避免fork带有事件循环和线程的服务进程
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+    
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """
+        丢弃已损坏的进程池，下次提交时重建
+        
+        多个任务同时因同一个进程池损坏而失败时只替换一次；
+        进程池已被替换时不影响新的进程池。
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _release(self, executor: Optional[ProcessPoolExecutor], future: Optional[Future]) -> None:
+        """任务结束（完成、失败或取消）时释放名额"""
+        with self._lock:
+            self._pending -= 1
+        if (executor is not None and future is not None and not future.cancelled()
+                and isinstance(future.exception(), BrokenProcessPool)):
+            # 子进程异常退出
+            self._discard_executor(executor)
+    
+    def submit(self, func: Callable, *args) -> Future:
+        """
+        提交函数到进程池（不等待结果）
+        
+        进程池在空闲时已损坏（子进程异常退出）时，重建进程池后重新提交一次。
+        
+        Args:
+            func: 要执行的函数（必须是模块级函数，参数和返回值可序列化）
+            *args: 函数参数
+        
+        Returns:
+            任务的Future对象
+        
+        Raises:
+            ServiceUnavailable: 任务数已达上限
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ServiceUnavailable(
+                    '服务器繁忙，请稍后重试',
+                    headers={'Retry-After': str(self.RETRY_AFTER_SECONDS)}
+                )
+            self._pending += 1
+        
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(func, *args)
+        except BaseException:
+            self._release(None, None)
+            raise
+        future.add_done_callback(functools.partial(self._release, executor))
+        return future
+    
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        在进程池中执行函数并等待结果
+        
+        Args:
+            func: 要执行的函数（必须是模块级函数，参数和返回值可序列化）
+            *args: 函数参数
+        
+        Returns:
+            函数返回值
+        
+        Raises:
+            ServiceUnavailable: 任务数已达上限
+        """
+        return await asyncio.wrap_future(self.submit(func, *args))
+    
+    def shutdown(self) -> None:
+        """关闭进程池（取消排队中的任务）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局进程池
+worker_pool = WorkerPool()
+
+
+RECEIVE_POLL_SECONDS = 0.5  # 等待子进程输出时检查任务状态的间隔（秒）
+
+# 子进程中已加载的生成器（LRU，按结果缓存键），结果缓存未命中时不再重复验证配置和编译表达式
+GENERATOR_CACHE_SIZE = 32
+_generators: 'OrderedDict[str, DataGenerator]' = OrderedDict()
+
+
+def _get_generator(key: str, generator_config: Dict[str, Any]) -> DataGenerator:
+    """
+    获取新的数据生成器（在子进程中执行），相同配置共享已加载的模板
+    
+    Args:
+        key: 结果缓存键（由生成器配置计算）
+        generator_config: 生成器配置字典
+    
+    Returns:
+        新的数据生成器
+    
+    Raises:
+        ValueError: 生成器配置无效
+    """
+    generator = _generators.get(key)
+    if generator is None:
+        generator = DataGenerator(generator_config)
+        _generators[key] = generator
+        while len(_generators) > GENERATOR_CACHE_SIZE:
+            _generators.popitem(last=False)
+    else:
+        _generators.move_to_end(key)
+    return generator.copy()
+
+
+def generate_result(key: str, generator_config: Dict[str, Any]) -> CachedResult:
+    """
+    生成完整数据（在子进程中执行）
+    
+    Args:
+        key: 结果缓存键（由生成器配置计算）
+        generator_config: 生成器配置字典
+    
+    Returns:
+        生成结果（各列数据和历史数据点数）
+    """
+    generator = _get_generator(key, generator_config)
+    df = generator.generate()
+    columns = {col: df[col].to_numpy() for col in df.columns}
+    return CachedResult(columns, generator.history_points)
+
+
+async def get_generation_result(parsed: ParsedConfig,
+                                config_id: Optional[int] = None,
+                                updated_at: Optional[datetime] = None) -> CachedResult:
+    """
+    获取生成结果：命中缓存时直接返回，否则在进程池中生成并写入缓存
+    
+    未指定seed的配置不使用缓存，每次都重新生成。
+    
+    Args:
+        parsed: 解析后的配置
+        config_id: 配置ID（可选，提供时配置更新后删除旧版本的缓存）
+        updated_at: 配置更新时间（可选）
+    
+    Returns:
+        生成结果
+    
+    Raises:
+        ServiceUnavailable: 任务数已达上限
+    """
+    key = parsed.result_key
+    if not ResultCache.is_cacheable(parsed.generator_config):
+        return await worker_pool.run(generate_result, key, parsed.generator_config)
+    
+    if config_id is not None:
+        result_cache.track_config(config_id, updated_at, key)
+    
+    result = await asyncio.to_thread(result_cache.get, key)
+    if result is None:
+        result = await worker_pool.run(generate_result, key, parsed.generator_config)
+        await asyncio.to_thread(result_cache.put, key, result)
+    return result
+
+
+def write_generated_csv(connection: Connection, key: str, generator_config: Dict[str, Any],
+                        template_config: Dict[str, Any], export_type: str, compress: bool) -> None:
+    """
+    流式生成数据并格式化为CSV（在子进程中执行）
+    
+    编码后的字节块逐块写入管道，最后写入空字节块表示结束。
+    管道写满时阻塞，内存占用与总点数无关；服务进程关闭管道（客户端断开）时停止生成。
+    
+    Args:
+        connection: 管道的写入端
+        key: 结果缓存键（用于复用已加载的生成器）
+        generator_config: 生成器配置字典
+        template_config: 输出模板配置字典
+        export_type: 导出类型（'history'或'full'）
+        compress: 是否gzip压缩
+    """
+    try:
+        generator = _get_generator(key, generator_config)
+        chunks = iter_generated_chunks(generator, export_type)
+        for block in iter_csv_bytes(chunks, template_config, compress):
+            if block:
+                connection.send_bytes(block)
+        connection.send_bytes(b'')
+    except (BrokenPipeError, ConnectionResetError):
+        # 服务进程已关闭管道（客户端断开）
+        pass
+    finally:
+        connection.close()
+
+
+def _receive_block(connection: Connection, future: Future) -> Optional[bytes]:
+    """
+    从管道读取一个字节块（在线程中执行）
+    
+    Returns:
+        字节块；子进程结束（成功、失败或被取消）且没有更多数据时返回None
+    """
+    while not connection.poll(RECEIVE_POLL_SECONDS):
+        if future.done() and not connection.poll():
+            return None
+    return connection.recv_bytes()
+
+
+async def iter_generated_csv(parsed: ParsedConfig, export_type: str,
+                             compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    在进程池中流式生成并格式化CSV，逐块返回编码后的字节
+    
+    生成和格式化都在子进程中执行，服务进程只负责转发字节块；
+    第一块数据生成后即可开始发送，不需要等待全部数据生成完成。
+    
+    Args:
+        parsed: 解析后的配置
+        export_type: 导出类型（'history'或'full'）
+        compress: 是否gzip压缩
+    
+    Yields:
+        CSV字节（压缩时为gzip字节）
+    
+    Raises:
+        ServiceUnavailable: 任务数已达上限
+        ValueError: 生成器配置无效（子进程中的异常原样抛出）
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    future = None
+    try:
+        # 写入端在任务发送给子进程时才序列化，任务结束前服务进程不能关闭它，
+        # 因此用空字节块而不是管道关闭表示结束
+        future = worker_pool.submit(write_generated_csv, sender, parsed.result_key, parsed.generator_config,
+                                    parsed.template_config, export_type, compress)
+        while True:
+            block = await asyncio.to_thread(_receive_block, receiver, future)
+            if not block:
+                break
+            yield block
+        # 子进程异常时抛出
+        await asyncio.wrap_future(future)
+    finally:
+        # 客户端断开时关闭读取端，子进程写入失败后停止；尚未开始的任务直接取消
+        receiver.close()
+        if future is not None:
+            future.cancel()
+            future.add_done_callback(lambda _: sender.close())
+        else:
+            sender.close()
+
+
+def get_preview_data(result: CachedResult, preview_rows: int) -> Dict[str, Any]:
+    """
+    把生成结果的前preview_rows行转换为行记录格式
+    
+    Args:
+        result: 生成结果
+        preview_rows: 返回的行数
+    
+    Returns:
+        包含预览数据、行数统计和各列统计（基于全部数据）的字典
+    """
+    total_rows = len(result.columns['timeStamp'])
+    full_df = pd.DataFrame({col: values[:preview_rows] for col, values in result.columns.items()})
+    history_df = full_df.head(min(preview_rows, result.history_points))
+    
+    return {
+        'full_data': full_df.to_dict('records'),
+        'history_data': history_df.to_dict('records'),
+        'columns': list(result.columns),
+        'total_rows': total_rows,
+        'history_rows': result.history_points,
+        'future_rows': total_rows - result.history_points,
+        'stats': stats_to_dict(result.stats)
+    }
+
+
+def select_chart_columns(result: CachedResult,
+                         max_points: Optional[int] = None,
+                         start: Optional[float] = None,
+                         end: Optional[float] = None) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    截取时间窗口并降采样，得到图表使用的列数据
+    
+    Args:
+        result: 生成结果
+        max_points: 最大点数（可选），超过时按桶取最小值和最大值降采样
+        start: 起始时间戳（可选，包含），只返回该时间之后的数据
+        end: 结束时间戳（可选，包含），只返回该时间之前的数据
+    
+    Returns:
+        (列名到数据数组的映射（timeStamp列在最前）, 时间窗口内的原始点数)
+    """
+    numeric_columns = [col for col in result.columns if col != 'timeStamp']
+    timestamps = result.columns['timeStamp']
+    
+    # 截取时间窗口
+    window = window_slice(timestamps, start, end)
+    timestamps = timestamps[window]
+    window_points = len(timestamps)
+    
+    if max_points is not None and window_points > max_points and numeric_columns:
+        values = np.column_stack([result.columns[col][window] for col in numeric_columns])
+        timestamps, values = minmax_downsample(timestamps, values, max_points)
+        columns = {col: values[:, i] for i, col in enumerate(numeric_columns)}
+    else:
+        columns = {col: result.columns[col][window] for col in numeric_columns}
+    
+    return {'timeStamp': timestamps, **columns}, window_points
+
+
+def get_chart_data(result: CachedResult,
+                   max_points: Optional[int] = None,
+                   start: Optional[float] = None,
+                   end: Optional[float] = None) -> Dict[str, Any]:
+    """
+    把生成结果转换为图表数据格式
+    
+    Args:
+        result: 生成结果
+        max_points: 最大点数（可选），超过时按桶取最小值和最大值降采样
+        start: 起始时间戳（可选，包含），只返回该时间之后的数据
+        end: 结束时间戳（可选，包含），只返回该时间之前的数据
+    
+    Returns:
+        包含时间戳、各数值列数据、列名、点数统计和各列统计（基于全部数据）的字典
+    """
+    columns, window_points = select_chart_columns(result, max_points, start, end)
+    timestamps = columns.pop('timeStamp')
+    
+    return {
+        'timestamps': timestamps.tolist(),
+        'series': {col: values.tolist() for col, values in columns.items()},
+        'columns': list(result.columns),
+        'total_points': len(result.columns['timeStamp']),
+        'window_points': window_points,
+        'stats': stats_to_dict(result.stats)
+    }